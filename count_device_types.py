@@ -1,4 +1,11 @@
 import json
+import os
+import sys
+
+# 分类规则与导入脚本共用 (nextgen-network-manager/backend/app/classification.py)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'nextgen-network-manager', 'backend'))
+
+from app.classification import classify
 
 def count_device_types(input_file):
     """
@@ -18,88 +25,30 @@ def count_device_types(input_file):
     iot_devices = []
     unknown_devices = []
     
+    # 设备类型 -> 列表 (路由器按IoT设备统计)
+    groups = {
+        'phone': phones,
+        'computer': computers,
+        'tv': tvs,
+        'tablet': tablets,
+        'iot': iot_devices,
+        'unknown': unknown_devices,
+    }
+    
     for device in devices:
         mac = device.get('mac', 'N/A')
         name = device.get('name', '') or device.get('originName', '未命名设备')
-        product = device.get('product', '').lower()
-        user_specified_product = device.get('userSpecifyProduct', '').lower()
         
-        # 检查是否明确标记为IoT设备
-        if device.get('is_miot_device', False):
-            iot_devices.append({
-                'name': name,
-                'mac': mac,
-                'reason': '标记为MIoT设备'
-            })
-            continue
-            
-        # 检查产品类型
-        if product == 'phone' or user_specified_product == 'phone':
-            phones.append({
-                'name': name,
-                'mac': mac
-            })
-        elif product == 'computer' or user_specified_product == 'computer':
-            computers.append({
-                'name': name,
-                'mac': mac
-            })
-        elif product == 'tv' or user_specified_product == 'tv':
-            tvs.append({
-                'name': name,
-                'mac': mac
-            })
-        elif product == 'tablet' or user_specified_product == 'tablet':
-            tablets.append({
-                'name': name,
-                'mac': mac
-            })
-        elif product == 'router' or user_specified_product == 'router':
-            # 路由器也归类为IoT设备
-            iot_devices.append({
-                'name': name,
-                'mac': mac,
-                'reason': '网络设备归类为IoT'
-            })
-        else:
-            # 检查名称/型号中的IoT关键词
-            model = device.get('model', '').lower()
-            origin_name = device.get('originName', '').lower()
-            combined_name = name.lower() + ' ' + origin_name
-            
-            iot_keywords = [
-                'camera', 'light', 'curtain', 'speaker', 'fan', 'printer', 
-                'refrigerator', 'washer', 'dryer', 'robot', 'vacuum', 
-                'socket', 'plug', 'gateway', 'airer', 'lamp', 'bulb', 
-                'sensor', 'doorbell', 'cat eye', 'cateye', 'panel', 
-                'purifier', 'conditioner', 'ac', 'dishwasher', 'stereo', 'router'
-            ]
-            
-            found_keyword = False
-            for keyword in iot_keywords:
-                if keyword in model or keyword in combined_name:
-                    iot_devices.append({
-                        'name': name,
-                        'mac': mac,
-                        'reason': f"找到关键词'{keyword}'"
-                    })
-                    found_keyword = True
-                    break
-            
-            # 只有树莓派5和XTC_Q1A属于未知设备，其他都应该归类为IoT设备
-            if not found_keyword and (name == "树莓派5" or name == "XTC_Q1A"):
-                unknown_devices.append({
-                    'name': name,
-                    'mac': mac,
-                    'product': product or user_specified_product or '未知'
-                })
-            elif not found_keyword:
-                # 其他未明确分类的设备也归为IoT设备
-                iot_devices.append({
-                    'name': name,
-                    'mac': mac,
-                    'reason': '推断为IoT设备'
-                })
+        result = classify(device)
+        entry = {
+            'name': name,
+            'mac': mac
+        }
+        if result.device_class == 'iot':
+            entry['reason'] = result.class_reason
+        elif result.device_class == 'unknown':
+            entry['product'] = (device.get('product') or device.get('userSpecifyProduct') or '未知').lower()
+        groups[result.device_class].append(entry)
     
     print(f"设备总数: {len(devices)}")
     print(f"\n手机 ({len(phones)}):")
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+设备报告: 一次读取 devices.json，同时输出IoT设备列表、IoT设备MAC列表和设备类型统计
+
+原先需要依次运行三个脚本 (extract_iot_devices.py 写出 iot_devices.json，
+extract_mac_addresses.py 再解析一遍它写出 iot_mac_addresses.txt，
+count_device_types.py 再解析一遍 devices.json)。这里各阶段串成生成器链:
+
+    读取设备 -> 分类 (每个设备调用一次 classify) -> 分发给各输出
+
+每个输出是一个接收 (设备, 分类结果) 的生成器，边处理边写文件；
+--stream 时逐个解析导出文件中的设备，配合 --jsonl (每行一个JSON对象) 内存占用与文件大小无关。
+不带 --jsonl 时 iot_devices.json 与 extract_iot_devices.py 的输出相同。
+
+用法:
+    python device_report.py devices.json                      # 三种输出全部生成
+    python device_report.py devices.json --macs --counts      # 只输出MAC列表和类型统计
+    python device_report.py big.json --stream --jsonl --iot - | jq .mac
+"""
+
+import argparse
+import json
+import os
+import sys
+from collections import Counter
+from contextlib import ExitStack
+
+# 分类规则与导入脚本共用 (nextgen-network-manager/backend/app/classification.py)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'nextgen-network-manager', 'backend'))
+
+from app.classification import DEVICE_CLASSES, classify
+from app.router_export import iter_devices
+
+IOT_JSON_PATH = 'iot_devices.json'
+IOT_JSONL_PATH = 'iot_devices.jsonl'
+MAC_LIST_PATH = 'iot_mac_addresses.txt'
+# 类型统计的显示名称 (路由器按IoT设备统计)
+CLASS_LABELS = {
+    'phone': '手机',
+    'computer': '电脑',
+    'tv': '电视',
+    'tablet': '平板',
+    'iot': 'IoT设备',
+    'unknown': '未知/其他',
+}
+
+def read_devices(path, stream=False):
+    """逐个返回导出文件中的设备；stream=True 时边读边解析，否则整体加载"""
+    with open(path, 'r', encoding='utf-8') as f:
+        if stream:
+            yield from iter_devices(f)
+            return
+        data = json.load(f)
+    yield from (data if isinstance(data, list) else data.get('devices', []))
+
+def classify_devices(devices):
+    """为每个设备附上分类结果"""
+    for device in devices:
+        yield device, classify(device)
+
+def iot_records(fp, jsonl=False):
+    """写出IoT设备 (格式同 extract_iot_devices.py)，没有MAC的设备跳过"""
+    count = 0
+    try:
+        while True:
+            device, result = yield
+            mac = device.get('mac', '')
+            if not mac or not result.is_iot:
+                continue
+            record = {
+                'isIOTDevice': True,
+                'IOTReason': result.reason,
+                'mac': mac,
+                'name': device.get('name', ''),
+                'originName': device.get('originName', ''),
+            }
+            if jsonl:
+                fp.write(json.dumps(record, ensure_ascii=False) + '\n')
+            else:
+                # 与 json.dump(列表, indent=2) 的输出逐字节相同
+                item = json.dumps(record, ensure_ascii=False, indent=2).replace('\n', '\n  ')
+                fp.write(('[\n  ' if count == 0 else ',\n  ') + item)
+            count += 1
+    finally:
+        if not jsonl:
+            fp.write('\n]' if count else '[]')
+
+def mac_list(fp):
+    """写出IoT设备的MAC地址 (小写，每行一个，同 extract_mac_addresses.py)"""
+    while True:
+        device, result = yield
+        mac = device.get('mac')
+        if mac and result.is_iot:
+            fp.write(mac.lower() + '\n')
+
+def type_counts(counts: Counter):
+    """按设备类型计数，同时统计设备总数和IoT设备数"""
+    while True:
+        device, result = yield
+        counts['total'] += 1
+        counts[result.device_class] += 1
+        if result.is_iot and device.get('mac'):
+            counts['iot_devices'] += 1
+
+def run_pipeline(items, sinks):
+    """把每一项依次交给所有输出，结束 (或出错) 时关闭各输出"""
+    for sink in sinks:
+        next(sink)
+    try:
+        for item in items:
+            for sink in sinks:
+                sink.send(item)
+    finally:
+        for sink in sinks:
+            sink.close()
+
+def open_output(stack, path):
+    """'-' 表示标准输出"""
+    if path == '-':
+        return sys.stdout
+    return stack.enter_context(open(path, 'w', encoding='utf-8'))
+
+def print_counts(counts: Counter, out):
+    print(f"设备总数: {counts['total']}", file=out)
+    for device_class in DEVICE_CLASSES:
+        print(f"  {CLASS_LABELS[device_class]}: {counts[device_class]}", file=out)
+
+def main():
+    parser = argparse.ArgumentParser(description='一次读取 devices.json，输出IoT设备、MAC列表和设备类型统计')
+    parser.add_argument('input', nargs='?', default='devices.json', help='路由器导出的 devices.json')
+    parser.add_argument('--iot', nargs='?', const='', metavar='PATH',
+                        help=f'输出IoT设备列表 (默认 {IOT_JSON_PATH}，--jsonl 时为 {IOT_JSONL_PATH}；- 为标准输出)')
+    parser.add_argument('--macs', nargs='?', const=MAC_LIST_PATH, metavar='PATH',
+                        help=f'输出IoT设备MAC列表 (默认 {MAC_LIST_PATH}；- 为标准输出)')
+    parser.add_argument('--counts', nargs='?', const='', metavar='PATH',
+                        help='输出设备类型统计 (不指定文件时只打印；指定时另存为JSON)')
+    parser.add_argument('--jsonl', action='store_true', help='IoT设备列表每行一个JSON对象 (适合大文件)')
+    parser.add_argument('--stream', action='store_true', help='流式解析导出文件，内存占用与文件大小无关')
+    args = parser.parse_args()
+
+    # 不指定任何输出时与依次运行三个脚本相同
+    if args.iot is None and args.macs is None and args.counts is None:
+        args.iot, args.macs, args.counts = '', MAC_LIST_PATH, ''
+    if args.iot == '':
+        args.iot = IOT_JSONL_PATH if args.jsonl else IOT_JSON_PATH
+    # 数据写到标准输出时，统计信息改为打印到标准错误
+    log = sys.stderr if '-' in (args.iot, args.macs) else sys.stdout
+
+    counts = Counter()
+    with ExitStack() as stack:
+        sinks = [type_counts(counts)]
+        if args.iot is not None:
+            sinks.append(iot_records(open_output(stack, args.iot), args.jsonl))
+        if args.macs is not None:
+            sinks.append(mac_list(open_output(stack, args.macs)))
+        run_pipeline(classify_devices(read_devices(args.input, args.stream)), sinks)
+
+    print(f"处理了 {counts['total']} 个设备，找到 {counts['iot_devices']} 个IoT设备", file=log)
+    if args.iot not in (None, '-'):
+        print(f"IoT设备列表已保存到 {args.iot}", file=log)
+    if args.macs not in (None, '-'):
+        print(f"MAC地址已保存到 {args.macs}", file=log)
+    if args.counts is not None:
+        print_counts(counts, log)
+        if args.counts:
+            with open(args.counts, 'w', encoding='utf-8') as f:
+                json.dump({'total': counts['total'], **{c: counts[c] for c in DEVICE_CLASSES}}, f, ensure_ascii=False, indent=2)
+            print(f"类型统计已保存到 {args.counts}", file=log)
+
+if __name__ == "__main__":
+    main()
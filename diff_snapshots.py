@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+比较两次路由器导出 (devices.json)，输出设备上线/离线、IP/频段/Wi-Fi协议变化，
+以及新导出中新出现的路由器事件 (如 "5GHz接入"、"离线"，同一事件只输出一次)
+
+用法:
+    python diff_snapshots.py old.json new.json
+    python diff_snapshots.py old.json new.json --stream --jsonl > events.jsonl
+
+状态变化的事件时间为新导出文件的修改时间 (可用 --time 指定)，路由器事件使用其自带的时间。
+后端导入 (import_devices.py) 时使用同一个差异引擎，结果可通过 GET /api/device-events 查询。
+"""
+
+import argparse
+import json
+import os
+import sys
+from collections import Counter
+from datetime import datetime
+
+# 差异引擎与后端共用 (nextgen-network-manager/backend/app/snapshot_diff.py)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'nextgen-network-manager', 'backend'))
+
+from app.mac import int_to_mac
+from app.router_export import iter_devices
+from app.snapshot_diff import EVENT_KINDS, Snapshot, diff_snapshots
+
+EVENT_LABELS = {
+    'join': '上线',
+    'leave': '离线',
+    'ip': 'IP变化',
+    'band': '频段变化',
+    'wifiprotocol': '协议变化',
+    'router': '路由器事件',
+}
+
+def load_snapshot(path, stream=False):
+    with open(path, 'r', encoding='utf-8') as f:
+        if stream:
+            return Snapshot.from_devices(iter_devices(f))
+        data = json.load(f)
+    return Snapshot.from_devices(data if isinstance(data, list) else data.get('devices', []))
+
+def format_event(event):
+    kind = EVENT_KINDS[event.kind]
+    change = f"{event.old_value} -> {event.new_value}" if event.old_value and event.new_value else event.old_value or event.new_value
+    return f"{datetime.fromtimestamp(event.ts):%Y-%m-%d %H:%M:%S}  {int_to_mac(event.mac_int)}  {EVENT_LABELS[kind]:<8}{change}"
+
+def main():
+    parser = argparse.ArgumentParser(description='比较两次路由器导出的设备变化')
+    parser.add_argument('old', help='较早的 devices.json')
+    parser.add_argument('new', help='较新的 devices.json')
+    parser.add_argument('--time', type=int, default=None, help='状态变化的事件时间 (Unix秒，默认为新文件的修改时间)')
+    parser.add_argument('--jsonl', action='store_true', help='每行输出一个JSON事件')
+    parser.add_argument('--stream', action='store_true', help='流式解析导出文件')
+    args = parser.parse_args()
+
+    ts = args.time if args.time is not None else int(os.path.getmtime(args.new))
+    events = diff_snapshots(load_snapshot(args.old, args.stream), load_snapshot(args.new, args.stream), ts)
+
+    log = sys.stderr if args.jsonl else sys.stdout
+    for event in events:
+        if args.jsonl:
+            record = {
+                'ts': event.ts, 'mac': int_to_mac(event.mac_int), 'kind': EVENT_KINDS[event.kind],
+                'old_value': event.old_value or None, 'new_value': event.new_value or None,
+            }
+            print(json.dumps(record, ensure_ascii=False))
+        else:
+            print(format_event(event))
+
+    counts = Counter(EVENT_KINDS[event.kind] for event in events)
+    print(f"\n共 {len(events)} 个事件: " + "，".join(f"{EVENT_LABELS[kind]} {counts[kind]}" for kind in EVENT_KINDS), file=log)
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,2 @@
-# 初始化数据库
-from app.database import Base, engine
-from app import models
-
-# 创建所有表
-Base.metadata.create_all(bind=engine)
\ No newline at end of file
+# 数据库初始化在 app.main 中通过 init_db() 完成，
+# 使 app 包内的工具模块可以被导入脚本单独复用
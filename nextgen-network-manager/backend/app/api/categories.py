@@ -1,34 +1,35 @@
 from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
-from typing import List
-from app import models
-from app.database import get_db
+from typing import List, Union
+from app import models, schemas
+from app.database import get_session, run_db
 
 router = APIRouter()
 
-@router.get("/categories", response_model=List[str])
-def get_categories(db: Session = Depends(get_db)):
-    """获取所有设备类别"""
-    # 从设备表中获取所有唯一的类别
-    categories = db.query(models.Device.category).filter(models.Device.category.isnot(None)).distinct().all()
-    # 提取类别名称并返回列表
-    return [category[0] for category in categories]
+@router.get("/categories", response_model=Union[List[schemas.Category], List[str]])
+async def get_categories(counts: bool = False, db=Depends(get_session)):
+    """获取所有设备类别，counts=true 时只返回有设备的类别并附带设备数"""
+    return await run_db(db, _get_categories, counts)
+
+def _get_categories(db: Session, counts: bool):
+    # 类别和设备数都维护在 categories 表中，无需扫描设备表
+    query = db.query(models.Category).order_by(models.Category.name)
+    if counts:
+        # 计数降为 0 的类别 (含旧版示例设备留下的类别) 不出现在统计中
+        return query.filter(models.Category.device_count > 0).all()
+    return [category.name for category in query.all()]
 
 @router.post("/categories/{category}", response_model=str)
-def add_category(category: str, db: Session = Depends(get_db)):
-    """添加新类别（通过创建一个带有该类别的设备示例来实现）"""
+async def add_category(category: str, db=Depends(get_session)):
+    """添加新类别"""
+    return await run_db(db, _add_category, category)
+
+def _add_category(db: Session, category: str):
     # 检查是否已存在该类别
-    existing_category = db.query(models.Device).filter(models.Device.category == category).first()
+    existing_category = db.query(models.Category).filter(models.Category.name == category).first()
 
     if not existing_category:
-        # 创建一个示例设备来添加新类别
-        example_device = models.Device(
-            mac=f"TEMP_{category.upper()}",
-            note=f"示例设备用于添加类别: {category}",
-            category=category
-        )
-        db.add(example_device)
+        db.add(models.Category(name=category, device_count=0))
         db.commit()
-        db.refresh(example_device)
 
-    return category
\ No newline at end of file
+    return category
@@ -0,0 +1,63 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from app import models, schemas
+from app.database import get_session, run_db
+from app.mac import int_to_mac, mac_to_int
+from app.responses import FastJSONResponse
+from app.snapshot_diff import EVENT_KINDS
+
+router = APIRouter()
+
+# 单次查询返回的最大事件数
+MAX_EVENTS = 1000
+
+@router.get("/device-events", response_model=List[schemas.DeviceEvent], response_class=FastJSONResponse)
+async def get_device_events(
+    mac: Optional[str] = None,
+    kind: Optional[str] = None,
+    start: Optional[int] = Query(None, alias="from"),
+    end: Optional[int] = Query(None, alias="to"),
+    limit: int = 100,
+    db=Depends(get_session),
+):
+    """设备事件 (导入快照时比较相邻两次快照得到，并合并路由器记录的事件)，按时间倒序
+
+    mac 只返回该设备的事件；kind=join,leave 按类型过滤 (join/leave/ip/band/wifiprotocol/router)；
+    from/to 为 Unix 秒。
+    """
+    filters = []
+    if mac is not None:
+        mac_int = mac_to_int(mac)
+        if mac_int is None:
+            raise HTTPException(status_code=400, detail="无效的MAC地址")
+        filters.append(models.DeviceEvent.mac_int == mac_int)
+    if kind is not None:
+        kinds = [name.strip() for name in kind.split(",") if name.strip()]
+        unknown = [name for name in kinds if name not in EVENT_KINDS]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"未知事件类型: {', '.join(unknown)}")
+        filters.append(models.DeviceEvent.kind.in_([EVENT_KINDS.index(name) for name in kinds]))
+    if start is not None:
+        filters.append(models.DeviceEvent.ts >= start)
+    if end is not None:
+        filters.append(models.DeviceEvent.ts <= end)
+    if not 0 < limit <= MAX_EVENTS:
+        raise HTTPException(status_code=400, detail=f"limit 必须在 1 到 {MAX_EVENTS} 之间")
+    return FastJSONResponse(await run_db(db, _get_device_events, filters, limit))
+
+def _get_device_events(db: Session, filters: list, limit: int):
+    event = models.DeviceEvent
+    rows = (
+        db.query(event.id, event.ts, event.mac_int, event.kind, event.old_value, event.new_value)
+        .filter(*filters)
+        .order_by(event.ts.desc(), event.id.desc())
+        .limit(limit)
+    )
+    return [
+        {
+            "id": row.id, "ts": row.ts, "mac": int_to_mac(row.mac_int), "kind": EVENT_KINDS[row.kind],
+            "old_value": row.old_value or None, "new_value": row.new_value or None,
+        }
+        for row in rows
+    ]
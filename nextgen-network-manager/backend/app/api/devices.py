@@ -1,72 +1,410 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
+from sqlalchemy import case, func
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import Session
-from typing import List
-from app import schemas, models
-from app.database import get_db
+import time
+from collections import Counter
+from typing import List, Optional, Union
+from app import schemas, models, sync
+from app.pagination import estimate_total, keyset_page
+from app.cache import device_cache
+from app.category_counts import apply_deltas, track_change
+from app.classification import CLASSIFICATION_COLUMNS, CLASSIFICATION_INPUT_COLUMNS, DEVICE_CLASSES, classify_row
+from app.database import get_session, run_db
+from app.events import change_broker
+from app.mac import canonical_mac, mac_to_int, normalize_mac, oui_range
+from app.projection import device_columns, parse_fields, project_rows
+from app.responses import FastJSONResponse
+from app.telemetry import query_metrics
 
 router = APIRouter()
 
-@router.get("/devices", response_model=List[schemas.Device])
-def get_devices(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    """获取所有设备备注信息"""
-    devices = db.query(models.Device).offset(skip).limit(limit).all()
-    return devices
+# 单条 IN 查询的最大参数个数，避免超出SQLite的变量数限制
+LOOKUP_CHUNK_SIZE = 500
+# 批量写入时每批 executemany 的行数
+BULK_CHUNK_SIZE = 500
+
+# 遥测查询不指定 from 时默认返回最近一天
+METRICS_DEFAULT_RANGE = 86400
+
+# 批量写入会覆盖的字段 (与 DeviceCreate 一致)
+BULK_FIELDS = [name for name in schemas.DeviceCreate.model_fields if name != "mac"]
+
+def _upsert_statement(db: Session):
+    """构造 INSERT ... ON CONFLICT(mac) DO UPDATE 语句 (配合 executemany 使用)"""
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+    stmt = dialect.insert(models.Device.__table__)
+    table = models.Device.__table__
+    update_columns = {name: stmt.excluded[name] for name in BULK_FIELDS}
+    # 分类列只更新API创建的设备，导入的设备保留导入时的分类 (同 _classify)
+    update_columns.update({
+        name: case((table.c.import_hash.is_(None), stmt.excluded[name]), else_=table.c[name])
+        for name in CLASSIFICATION_COLUMNS
+    })
+    update_columns["version"] = stmt.excluded.version
+    update_columns["updated_at"] = func.now()
+    return stmt.on_conflict_do_update(index_elements=["mac"], set_=update_columns)
+
+def _find_device(db: Session, mac: str):
+    """按MAC查找设备，与大小写和分隔符无关 (走 mac_int 索引)"""
+    value = mac_to_int(mac)
+    if value is None:
+        return db.query(models.Device).filter(models.Device.mac == canonical_mac(mac)).first()
+    return db.query(models.Device).filter(models.Device.mac_int == value).first()
+
+def _classify(db_device):
+    """按设备的名称、产品、型号和类别计算分类列
+
+    导入的设备 (有 import_hash) 保留导入时用完整导出记录 (含MIoT标记) 算出的分类。
+    """
+    if db_device.import_hash is not None:
+        return
+    values = classify_row({column: getattr(db_device, column) for column in CLASSIFICATION_INPUT_COLUMNS})
+    for column, value in values.items():
+        setattr(db_device, column, value)
+
+def _publish_upsert(db_device):
+    """推送设备新增/修改事件"""
+    device = schemas.Device.model_validate(db_device)
+    change_broker.publish("upsert", device.version, mac=device.mac, device=device.model_dump(mode="json"))
+
+@router.get(
+    "/devices",
+    response_model=Union[schemas.DeviceChanges, schemas.DevicePage, List[schemas.Device]],
+    response_class=FastJSONResponse,
+)
+async def get_devices(
+    skip: int = 0,
+    limit: int = 100,
+    since: Optional[int] = None,
+    cursor: Optional[str] = None,
+    with_total: bool = False,
+    oui: Optional[str] = None,
+    is_iot: Optional[bool] = None,
+    device_class: Optional[str] = None,
+    fields: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None),
+    db=Depends(get_session),
+):
+    """获取所有设备备注信息
+
+    携带 since=<version> 时只返回该版本之后新增/修改的设备和被删除设备的MAC；
+    数据未变化时 (since 已是最新或 If-None-Match 命中) 返回 304。
+
+    携带 cursor 时按游标分页 (第一页传空字符串 cursor=)，返回 next_cursor，
+    with_total=true 时附带设备总数的估计值。
+
+    oui=xx:xx:xx 只返回该厂商前缀下的设备 (mac_int 索引上的范围查询)。
+
+    is_iot=true/false、device_class=phone|computer|tv|tablet|iot|unknown 按导入时计算的
+    设备分类过滤 (走各自的索引)，可与 oui 组合。
+
+    fields=mac,note,name,icon_url 只返回指定字段 (mac 总会返回)。
+    """
+    filters = []
+    if oui is not None:
+        try:
+            low, high = oui_range(oui)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        filters.append(models.Device.mac_int.between(low, high))
+    if is_iot is not None:
+        filters.append(models.Device.is_iot == is_iot)
+    if device_class is not None:
+        if device_class not in DEVICE_CLASSES:
+            raise HTTPException(status_code=400, detail=f"未知设备类型: {device_class}")
+        filters.append(models.Device.device_class == device_class)
+    # 按厂商前缀查询时按 mac_int 排序 (范围扫描的顺序)，其余按主键
+    order_by = models.Device.mac_int if oui is not None else models.Device.id
+    try:
+        names = parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    cache_key = (skip, limit, oui, is_iot, device_class, tuple(names))
+    snapshot = device_cache.get_list(cache_key) if cursor is None else None
+    if snapshot is not None:
+        version, devices = snapshot
+        etag = sync.make_etag(version)
+        if sync.etag_matches(if_none_match, etag) or (since is not None and since >= version):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+        if since is None:
+            return FastJSONResponse(devices, headers={"ETag": etag})
+
+    generation = device_cache.generation
+    return await run_db(
+        db, _get_devices, skip, limit, since, cursor, with_total, filters, order_by, names, cache_key,
+        if_none_match, generation,
+    )
+
+def _get_devices(
+    db: Session,
+    skip: int,
+    limit: int,
+    since: Optional[int],
+    cursor: Optional[str],
+    with_total: bool,
+    filters: list,
+    order_by,
+    names: List[str],
+    cache_key: tuple,
+    if_none_match: Optional[str],
+    generation: int,
+):
+    version = sync.current_version(db)
+    etag = sync.make_etag(version)
+    if sync.etag_matches(if_none_match, etag) or (since is not None and since >= version):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    headers = {"ETag": etag}
+    columns = device_columns(names)
+
+    if since is not None:
+        rows, deleted = sync.get_changes(db, since, columns)
+        content = {"version": version, "devices": project_rows(rows, names), "deleted": deleted}
+        return FastJSONResponse(content, headers=headers)
+
+    if cursor is not None:
+        try:
+            rows, next_cursor = keyset_page(db, cursor, limit, filters, columns)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        total = estimate_total(db) if with_total else None
+        content = {"items": project_rows(rows, names), "next_cursor": next_cursor, "total_estimate": total}
+        return FastJSONResponse(content, headers=headers)
+
+    query = db.query(*columns).filter(*filters)
+    query = query.order_by(order_by)
+    devices = project_rows(query.offset(skip).limit(limit), names)
+    device_cache.set_list(cache_key, (version, devices), generation)
+    return FastJSONResponse(devices, headers=headers)
+
+@router.get("/cache/stats")
+async def get_cache_stats():
+    """设备缓存的命中统计"""
+    return device_cache.stats()
 
 @router.get("/devices/{mac}", response_model=schemas.Device)
-def get_device(mac: str, db: Session = Depends(get_db)):
+async def get_device(mac: str, db=Depends(get_session)):
     """根据MAC地址获取设备备注信息"""
-    device = db.query(models.Device).filter(models.Device.mac == mac.upper()).first()
+    device = device_cache.get_device(canonical_mac(mac))
+    if device is not None:
+        return device
+    return await run_db(db, _get_device, mac, device_cache.generation)
+
+def _get_device(db: Session, mac: str, generation: int):
+    device = _find_device(db, mac)
     if device is None:
         raise HTTPException(status_code=404, detail="设备未找到")
+    device = schemas.Device.model_validate(device)
+    device_cache.set_device(device.mac, device, generation)
     return device
 
+@router.get("/devices/{mac}/metrics", response_class=FastJSONResponse)
+async def get_device_metrics(
+    mac: str,
+    start: Optional[int] = Query(None, alias="from"),
+    end: Optional[int] = Query(None, alias="to"),
+    step: Optional[int] = None,
+    db=Depends(get_session),
+):
+    """设备的遥测时序数据 (导入路由器导出文件时记录)
+
+    from/to 为 Unix 秒 (默认最近一天)，step 为分桶秒数 (不指定时返回存储中的点)。
+    结果按列返回: timestamps 和 metrics 中每个指标一个等长数组，缺失值为 null。
+    """
+    mac_int = mac_to_int(mac)
+    if mac_int is None:
+        raise HTTPException(status_code=400, detail="无效的MAC地址")
+    end = int(time.time()) if end is None else end
+    start = end - METRICS_DEFAULT_RANGE if start is None else start
+    if start > end:
+        raise HTTPException(status_code=400, detail="from 不能晚于 to")
+    if step is not None and step <= 0:
+        raise HTTPException(status_code=400, detail="step 必须为正整数")
+    timestamps, metrics = await run_db(db, query_metrics, mac_int, start, end, step)
+    content = {
+        "mac": canonical_mac(mac), "from": start, "to": end, "step": step,
+        "timestamps": timestamps, "metrics": metrics,
+    }
+    return FastJSONResponse(content)
+
+@router.post("/devices/lookup", response_model=List[schemas.Device], response_class=FastJSONResponse)
+async def lookup_devices(lookup: schemas.DeviceLookup, fields: Optional[str] = None, db=Depends(get_session)):
+    """根据一组MAC地址批量获取设备 (只返回存在的设备，fields 同 GET /devices)"""
+    try:
+        names = parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return FastJSONResponse(await run_db(db, _lookup_devices, lookup, names))
+
+def _lookup_devices(db: Session, lookup: schemas.DeviceLookup, names: List[str]):
+    columns = device_columns(names)
+    keys = list(dict.fromkeys(mac_to_int(mac) for mac in lookup.macs))
+    others = list(dict.fromkeys(canonical_mac(mac) for mac in lookup.macs if mac_to_int(mac) is None))
+
+    devices = []
+    for column, values in ((models.Device.mac_int, [k for k in keys if k is not None]), (models.Device.mac, others)):
+        for i in range(0, len(values), LOOKUP_CHUNK_SIZE):
+            chunk = values[i:i + LOOKUP_CHUNK_SIZE]
+            devices.extend(project_rows(db.query(*columns).filter(column.in_(chunk)), names))
+    return devices
+
 @router.post("/devices", response_model=schemas.Device, status_code=status.HTTP_201_CREATED)
-def create_device(device: schemas.DeviceCreate, db: Session = Depends(get_db)):
+async def create_device(device: schemas.DeviceCreate, db=Depends(get_session)):
     """创建或更新设备备注"""
+    try:
+        db_device = await run_db(db, _create_device, device)
+    finally:
+        device_cache.invalidate([canonical_mac(device.mac)])
+    _publish_upsert(db_device)
+    return db_device
+
+def _create_device(db: Session, device: schemas.DeviceCreate):
     # 检查设备是否已存在
-    db_device = db.query(models.Device).filter(models.Device.mac == device.mac.upper()).first()
+    db_device = _find_device(db, device.mac)
+
+    version = sync.next_version(db)
+
+    deltas = Counter()
 
     if db_device:
         # 如果设备已存在，更新所有字段
+        track_change(deltas, db_device.category, device.category)
+        apply_deltas(db, deltas)
+        db_device.version = version
         db_device.note = device.note
         db_device.brand = device.brand
         db_device.category = device.category
         db_device.icon_url = device.icon_url
         db_device.description = device.description
+        _classify(db_device)
         db.commit()
         db.refresh(db_device)
         return db_device
     else:
         # 如果设备不存在，创建新记录
         db_device = models.Device(
-            mac=device.mac.upper(),
+            mac=canonical_mac(device.mac),
+            mac_int=mac_to_int(device.mac),
             note=device.note,
             brand=device.brand,
             category=device.category,
             icon_url=device.icon_url,
-            description=device.description
+            description=device.description,
+            version=version
         )
+        _classify(db_device)
+        sync.clear_tombstone(db, db_device.mac)
+        track_change(deltas, None, device.category)
+        apply_deltas(db, deltas)
         db.add(db_device)
         db.commit()
         db.refresh(db_device)
         return db_device
 
+@router.post("/devices/bulk", response_model=schemas.DeviceBulkResult)
+async def bulk_upsert_devices(devices: List[schemas.DeviceCreate], db=Depends(get_session)):
+    """批量创建或更新设备备注
+
+    所有记录在同一个事务中按块执行 INSERT ... ON CONFLICT(mac) DO UPDATE，
+    同一MAC出现多次时以最后一条为准。
+    """
+    try:
+        result = await run_db(db, _bulk_upsert_devices, devices)
+    finally:
+        device_cache.invalidate()
+    # 批量变更不逐条推送，客户端收到后按 since 增量同步
+    change_broker.publish("bulk", result.version, created=result.created, updated=result.updated)
+    return result
+
+def _bulk_upsert_devices(db: Session, devices: List[schemas.DeviceCreate]):
+    results = []
+    rows = {}
+    for device in devices:
+        mac = normalize_mac(device.mac)
+        item = schemas.DeviceBulkItem(mac=mac or device.mac, status="invalid" if not mac else "created")
+        results.append(item)
+        if not mac:
+            continue
+        if mac in rows:
+            rows[mac][1].status = "duplicate"
+        rows[mac] = (device, item)
+
+    version = sync.next_version(db)
+    upsert = _upsert_statement(db)
+    macs = list(rows)
+    created = updated = 0
+    deltas = Counter()
+    try:
+        for i in range(0, len(macs), BULK_CHUNK_SIZE):
+            chunk = macs[i:i + BULK_CHUNK_SIZE]
+            existing = dict(
+                db.query(models.Device.mac, models.Device.category).filter(models.Device.mac.in_(chunk))
+            )
+            values = []
+            for mac in chunk:
+                device, item = rows[mac]
+                if mac in existing:
+                    item.status = "updated"
+                    updated += 1
+                    track_change(deltas, existing[mac], device.category)
+                else:
+                    created += 1
+                    track_change(deltas, None, device.category)
+                values.append({
+                    "mac": mac,
+                    "mac_int": mac_to_int(mac),
+                    "version": version,
+                    **device.model_dump(include=set(BULK_FIELDS)),
+                    **classify_row(device.model_dump()),
+                })
+            db.execute(upsert, values)
+            sync.clear_tombstones(db, chunk)
+        apply_deltas(db, deltas)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    return schemas.DeviceBulkResult(version=version, created=created, updated=updated, results=results)
+
 @router.put("/devices/{mac}", response_model=schemas.Device)
-def update_device(mac: str, device: schemas.DeviceUpdate, db: Session = Depends(get_db)):
+async def update_device(mac: str, device: schemas.DeviceUpdate, db=Depends(get_session)):
     """更新设备备注"""
-    db_device = db.query(models.Device).filter(models.Device.mac == mac.upper()).first()
+    try:
+        db_device = await run_db(db, _update_device, mac, device)
+    finally:
+        device_cache.invalidate([canonical_mac(mac)] + ([canonical_mac(device.mac)] if device.mac else []))
+    if db_device.mac != canonical_mac(mac):
+        change_broker.publish("delete", db_device.version, mac=canonical_mac(mac))
+    _publish_upsert(db_device)
+    return db_device
+
+def _update_device(db: Session, mac: str, device: schemas.DeviceUpdate):
+    db_device = _find_device(db, mac)
     if db_device is None:
         raise HTTPException(status_code=404, detail="设备未找到")
 
+    version = sync.next_version(db)
+    db_device.version = version
+
     # 更新所有提供的字段
-    if device.mac is not None:
-        db_device.mac = device.mac.upper()
+    if device.mac is not None and canonical_mac(device.mac) != db_device.mac:
+        # MAC变更相当于删除旧记录，需要为旧MAC留下墓碑
+        sync.mark_deleted(db, db_device.mac, version)
+        sync.clear_tombstone(db, canonical_mac(device.mac))
+        db_device.mac = canonical_mac(device.mac)
+        db_device.mac_int = mac_to_int(device.mac)
     if device.note is not None:
         db_device.note = device.note
     if device.brand is not None:
         db_device.brand = device.brand
     if device.category is not None:
+        deltas = Counter()
+        track_change(deltas, db_device.category, device.category)
+        apply_deltas(db, deltas)
         db_device.category = device.category
+        _classify(db_device)
     if device.icon_url is not None:
         db_device.icon_url = device.icon_url
     if device.description is not None:
@@ -77,12 +415,24 @@ def update_device(mac: str, device: schemas.DeviceUpdate, db: Session = Depends(
     return db_device
 
 @router.delete("/devices/{mac}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_device(mac: str, db: Session = Depends(get_db)):
+async def delete_device(mac: str, db=Depends(get_session)):
     """删除设备备注"""
-    db_device = db.query(models.Device).filter(models.Device.mac == mac.upper()).first()
+    try:
+        deleted_mac, version = await run_db(db, _delete_device, mac)
+    finally:
+        device_cache.invalidate([canonical_mac(mac)])
+    change_broker.publish("delete", version, mac=deleted_mac)
+
+def _delete_device(db: Session, mac: str):
+    db_device = _find_device(db, mac)
     if db_device is None:
         raise HTTPException(status_code=404, detail="设备未找到")
 
+    version = sync.next_version(db)
+    sync.mark_deleted(db, db_device.mac, version)
+    deltas = Counter()
+    track_change(deltas, db_device.category, None)
+    apply_deltas(db, deltas)
     db.delete(db_device)
     db.commit()
-    return
\ No newline at end of file
+    return db_device.mac, version
\ No newline at end of file
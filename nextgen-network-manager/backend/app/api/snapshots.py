@@ -0,0 +1,103 @@
+import json
+from fastapi import APIRouter, Depends, Header, HTTPException, Request
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from typing import List, Optional
+from app import models, schemas
+from app.database import get_session, run_db
+from app.responses import FastJSONResponse
+from app.snapshot_ingest import (
+    SNAPSHOT_STATUSES, SnapshotTooLarge, SnapshotWriter, register_snapshot, snapshot_worker,
+)
+
+router = APIRouter()
+
+# 列表接口返回的最大快照数
+MAX_SNAPSHOTS = 100
+
+def _snapshot_status(snapshot: models.RouterSnapshot, duplicate=False) -> dict:
+    progress = snapshot_worker.progress(snapshot.id) if snapshot.status == "processing" else None
+    if progress is not None:
+        processed, fraction = progress
+    else:
+        processed, fraction = snapshot.processed, 1.0 if snapshot.status == "done" else 0.0
+    return {
+        "id": snapshot.id,
+        "sha256": snapshot.sha256,
+        "status": snapshot.status,
+        "size": snapshot.size,
+        "snapshot_ts": snapshot.snapshot_ts,
+        "processed": processed,
+        "progress": round(fraction, 4),
+        "stats": json.loads(snapshot.stats) if snapshot.stats else None,
+        "error": snapshot.error,
+        "received_at": snapshot.received_at,
+        "started_at": snapshot.started_at,
+        "finished_at": snapshot.finished_at,
+        "duplicate": duplicate,
+    }
+
+@router.post("/snapshots", response_model=schemas.RouterSnapshot, status_code=202)
+async def upload_snapshot(
+    request: Request,
+    content_encoding: Optional[str] = Header(None),
+    db=Depends(get_session),
+):
+    """上传路由器设备列表接口返回的原始JSON (可用 Content-Encoding: gzip 压缩)
+
+    新快照排队后台导入，返回 202 和快照状态，之后通过 GET /api/snapshots/{id} 查询进度；
+    相同内容已上传过时返回 200 和已有快照的状态 (duplicate 为 true)，导入失败过的会重新排队。
+    """
+    try:
+        writer = await run_in_threadpool(SnapshotWriter, content_encoding)
+    except ValueError as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    try:
+        # 解压、哈希和写盘都是阻塞操作，逐块放到线程池中执行
+        async for chunk in request.stream():
+            await run_in_threadpool(writer.write, chunk)
+        sha256, size = await run_in_threadpool(writer.finish)
+        snapshot, queued = await run_db(db, _register_snapshot, sha256, size)
+        if queued:
+            await run_in_threadpool(writer.commit, sha256)
+    except SnapshotTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        await run_in_threadpool(writer.abort)
+
+    if queued:
+        snapshot_worker.schedule(snapshot["id"])
+    return FastJSONResponse(snapshot, status_code=202 if queued else 200)
+
+def _register_snapshot(db: Session, sha256: str, size: int):
+    snapshot, queued = register_snapshot(db, sha256, size)
+    return _snapshot_status(snapshot, duplicate=not queued), queued
+
+@router.get("/snapshots", response_model=List[schemas.RouterSnapshot], response_class=FastJSONResponse)
+async def get_snapshots(status: Optional[str] = None, limit: int = 20, db=Depends(get_session)):
+    """最近上传的快照 (按上传顺序倒序)，status 按状态过滤"""
+    if status is not None and status not in SNAPSHOT_STATUSES:
+        raise HTTPException(status_code=400, detail=f"未知状态: {status}")
+    if not 0 < limit <= MAX_SNAPSHOTS:
+        raise HTTPException(status_code=400, detail=f"limit 必须在 1 到 {MAX_SNAPSHOTS} 之间")
+    return FastJSONResponse(await run_db(db, _get_snapshots, status, limit))
+
+def _get_snapshots(db: Session, status: Optional[str], limit: int):
+    query = db.query(models.RouterSnapshot)
+    if status is not None:
+        query = query.filter(models.RouterSnapshot.status == status)
+    return [_snapshot_status(snapshot) for snapshot in query.order_by(models.RouterSnapshot.id.desc()).limit(limit)]
+
+@router.get("/snapshots/{snapshot_id}", response_model=schemas.RouterSnapshot, response_class=FastJSONResponse)
+async def get_snapshot(snapshot_id: int, db=Depends(get_session)):
+    """快照的导入状态和进度"""
+    snapshot = await run_db(db, _get_snapshot, snapshot_id)
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail="快照不存在")
+    return FastJSONResponse(snapshot)
+
+def _get_snapshot(db: Session, snapshot_id: int):
+    snapshot = db.get(models.RouterSnapshot, snapshot_id)
+    return _snapshot_status(snapshot) if snapshot is not None else None
@@ -0,0 +1,95 @@
+"""
+设备读缓存
+
+按MAC缓存单个设备 (LRU)，并缓存设备列表的快照。设备表的每条本地写入
+路径都会使缓存失效；导入脚本等其他进程的写入依靠TTL过期。
+
+读取方在查询数据库前记下 generation，写入时 generation 递增，
+这样与写入并发的读取不会把旧数据放回缓存。
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+DEVICE_CACHE_SIZE = int(os.getenv("DEVICE_CACHE_SIZE", "4096"))
+DEVICE_CACHE_TTL = float(os.getenv("DEVICE_CACHE_TTL", "30"))  # 秒，0 表示关闭缓存
+
+class DeviceCache:
+    def __init__(self, max_size=DEVICE_CACHE_SIZE, ttl=DEVICE_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.enabled = ttl > 0 and max_size > 0
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self._devices = OrderedDict()  # mac -> (过期时间, 设备)
+        self._lists = {}  # 查询参数 -> (过期时间, 快照)
+        self._lock = threading.Lock()
+
+    def _lookup(self, store, key):
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = store.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del store[key]
+                self.misses += 1
+                return None
+            if store is self._devices:
+                store.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def _store(self, store, key, value, generation):
+        if not self.enabled:
+            return
+        with self._lock:
+            if generation != self.generation:
+                return
+            store[key] = (time.monotonic() + self.ttl, value)
+            if store is self._devices:
+                store.move_to_end(key)
+                while len(store) > self.max_size:
+                    store.popitem(last=False)
+
+    def get_device(self, mac):
+        return self._lookup(self._devices, mac)
+
+    def set_device(self, mac, device, generation):
+        self._store(self._devices, mac, device, generation)
+
+    def get_list(self, key):
+        return self._lookup(self._lists, key)
+
+    def set_list(self, key, snapshot, generation):
+        self._store(self._lists, key, snapshot, generation)
+
+    def invalidate(self, macs=None):
+        """设备写入后调用: 清除指定MAC (None表示全部) 以及所有列表快照"""
+        with self._lock:
+            self.generation += 1
+            self._lists.clear()
+            if macs is None:
+                self._devices.clear()
+            else:
+                for mac in macs:
+                    self._devices.pop(mac, None)
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "devices": len(self._devices),
+                "lists": len(self._lists),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+            }
+
+device_cache = DeviceCache()
@@ -0,0 +1,32 @@
+"""
+类别设备数的增量维护
+
+设备写入时记录类别的变化 (旧类别 -1，新类别 +1)，在同一事务中更新 categories 表。
+"""
+
+from collections import Counter
+
+from sqlalchemy.orm import Session
+
+from app import models
+
+def track_change(deltas: Counter, old_category, new_category):
+    """记录一次设备类别变化，新建设备 old 为 None，删除设备 new 为 None"""
+    if old_category == new_category:
+        return
+    if old_category:
+        deltas[old_category] -= 1
+    if new_category:
+        deltas[new_category] += 1
+
+def apply_deltas(db: Session, deltas: Counter):
+    """把类别计数变化写入 categories 表，不存在的类别会被创建"""
+    for name, delta in deltas.items():
+        if not delta:
+            continue
+        category = db.query(models.Category).filter(models.Category.name == name).first()
+        if category is None:
+            db.add(models.Category(name=name, device_count=max(delta, 0)))
+        else:
+            category.device_count = models.Category.device_count + delta
+    db.flush()
@@ -0,0 +1,328 @@
+"""
+设备分类规则引擎 (导入脚本和根目录的 extract_iot_devices.py / count_device_types.py 共用)
+
+原先每个脚本各自维护关键词表，对每个设备的型号、名称、MIoT产品逐个关键词做 in 扫描，
+get_iot_reason 一个函数就有约50次。这里把全部关键词表编译为一个按前缀树组织的正则
+(正则引擎按首字符跳过不可能匹配的位置，命中后只沿前缀树的一条分支比较)，
+classify 对每个设备的各字段只扫描一次，同时得到 IoT 判定、原因和设备类型；
+字段的扫描结果按取值缓存，型号和MIoT产品等重复取值不再扫描。
+
+关键词表与原脚本保持一致，各入口的结果不变 (未知设备名称的比较改为不区分大小写)。
+"""
+
+import re
+from functools import lru_cache
+from typing import NamedTuple, Optional
+
+# 不属于IoT的产品类型 (路由器保留为IoT)
+NON_IOT_PRODUCTS = ('phone', 'tablet', 'computer', 'tv')
+# count_device_types 中按产品类型直接归类的设备类型 (按判断顺序)
+PRODUCT_CLASSES = ('phone', 'computer', 'tv', 'tablet')
+# 属于"未知"而不是IoT的设备名称 (小写比较)
+UNKNOWN_DEVICE_NAMES = ('树莓派5', 'xtc_q1a')
+
+# 型号中表示IoT设备的关键词
+MODEL_IOT_KEYWORDS = (
+    'camera', 'light', 'curtain', 'speaker', 'fan', 'printer', 'refrigerator', 'washer', 'dryer', 'stereo', 'router',
+)
+# 名称和MIoT产品中表示IoT设备的关键词
+IOT_KEYWORDS = (
+    'camera', 'light', 'curtain', 'speaker', 'fan', 'printer', 'refrigerator',
+    'washer', 'dryer', 'robot', 'vacuum', 'socket', 'plug', 'gateway',
+    'airer', 'lamp', 'bulb', 'sensor', 'doorbell', 'cat eye', 'cateye',
+    'panel', 'purifier', 'conditioner', 'ac', 'dishwasher', 'raspberry', 'router',
+)
+# count_device_types 按此顺序取第一个出现在型号或名称中的关键词
+COUNT_KEYWORDS = (
+    'camera', 'light', 'curtain', 'speaker', 'fan', 'printer',
+    'refrigerator', 'washer', 'dryer', 'robot', 'vacuum',
+    'socket', 'plug', 'gateway', 'airer', 'lamp', 'bulb',
+    'sensor', 'doorbell', 'cat eye', 'cateye', 'panel',
+    'purifier', 'conditioner', 'ac', 'dishwasher', 'stereo', 'router',
+)
+
+# IoT原因: (原因, 命中其中任一关键词即成立)，按输出顺序排列
+MODEL_REASONS = tuple(
+    (f"型号包含'{keyword}'", (keyword,))
+    for keyword in (
+        'camera', 'light', 'curtain', 'speaker', 'fan', 'printer', 'refrigerator',
+        'washer', 'dryer', 'stereo', 'panel', 'purifier', 'router',
+    )
+)
+NAME_REASONS = tuple(
+    (f"名称包含'{label}'", keywords)
+    for label, keywords in (
+        *((keyword, (keyword,)) for keyword in (
+            'camera', 'light', 'curtain', 'speaker', 'fan', 'printer', 'refrigerator', 'washer', 'dryer',
+            'robot', 'vacuum', 'socket', 'plug', 'gateway', 'airer', 'lamp', 'bulb', 'sensor', 'doorbell',
+        )),
+        ('cat eye', ('cat eye', 'cateye')),
+        ('panel', ('panel',)),
+        ('purifier', ('purifier',)),
+        ("conditioner'或'ac", ('conditioner', 'ac')),
+        ('dishwasher', ('dishwasher',)),
+        ('raspberry', ('raspberry',)),
+        ('router', ('router',)),
+    )
+)
+MIOT_REASONS = tuple(
+    (f"MIoT产品为'{label}'", keywords)
+    for label, keywords in (
+        *((keyword, (keyword,)) for keyword in (
+            'camera', 'light', 'curtain', 'speaker', 'fan', 'printer', 'refrigerator', 'washer', 'dryer',
+        )),
+        ('socket/plug', ('socket', 'plug')),
+        ('gateway', ('gateway',)),
+        ('airer', ('airer',)),
+        ('lamp/bulb', ('lamp', 'bulb')),
+        ('sensor', ('sensor',)),
+        ('panel', ('panel',)),
+        ('purifier', ('purifier',)),
+        ('router', ('router',)),
+    )
+)
+
+# 产品类型 -> 设备表的类别 (先精确匹配，再按顺序取第一个包含在产品类型中的关键词)
+CATEGORY_MAPPING = {
+    'phone': '手机',
+    'computer': '电脑',
+    'tablet': '平板',
+    'tv': '娱乐设备',
+    'camera': '智能家居',
+    'robot': '智能家居',
+    'gateway': '网络设备',
+    'router': '网络设备',
+    'light': '智能家居',
+    'fan': '智能家居',
+    'airconditioner': '智能家居',
+    'washer': '智能家居',
+    'dryer': '智能家居',
+    'dishwasher': '智能家居',
+    'plug': '智能家居',
+    'curtain': '智能家居',
+    'speaker': '智能家居',
+    'printer': '网络设备',
+    'nas': '网络设备',
+    'monitor': '娱乐设备',
+    'projector': '娱乐设备',
+    'game': '娱乐设备',
+    'security': '智能家居',
+    'sensor': '智能家居',
+    'switch': '智能家居',
+    'lock': '智能家居',
+    'doorbell': '智能家居',
+    'thermostat': '智能家居',
+    'vacuum': '智能家居',
+}
+DEFAULT_CATEGORY = '其他'
+# 每个字段缓存的扫描结果数 (型号、MIoT产品的取值很少，名称在多次导入之间也大量重复)
+FIELD_CACHE_SIZE = 65536
+
+# 设备表中保存的分类列 (导入和设备写入时计算)
+CLASSIFICATION_COLUMNS = ('is_iot', 'device_class', 'classification_reason')
+# device_class 的全部取值
+DEVICE_CLASSES = PRODUCT_CLASSES + ('iot', 'unknown')
+# 设备表列 -> classify 使用的导出记录字段
+DEVICE_COLUMN_FIELDS = {'name': 'name', 'origin_name': 'originName', 'product': 'product', 'model': 'model'}
+# 没有产品类型的设备 (API创建) 按用户选择的类别归类 (娱乐设备不只包含电视，不参与)
+CATEGORY_PRODUCTS = {'手机': 'phone', '电脑': 'computer', '平板': 'tablet'}
+# classify_row 读取的设备表列
+CLASSIFICATION_INPUT_COLUMNS = (*DEVICE_COLUMN_FIELDS, 'category')
+
+def _trie_pattern(keywords) -> str:
+    """把关键词组织为前缀树形式的正则 (公共前缀只比较一次)，更长的关键词优先"""
+    trie = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[''] = True
+
+    def build(node) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        if len(branches) == 1 and '' not in node:
+            return branches[0]
+        return '(?:' + '|'.join(branches) + (')?' if '' in node else ')')
+
+    return build(trie)
+
+class KeywordMatcher:
+    """一次扫描找出文本中出现的全部关键词 (包括互相重叠的，如 washer 和 dishwasher)"""
+
+    def __init__(self, keywords):
+        self.keywords = tuple(dict.fromkeys(keywords))
+        # 正则引擎按首字符跳过不可能匹配的位置；匹配成功后从下一个字符继续搜索，
+        # 重叠的关键词 (如 washer 和 dishwasher、lamp 和 plug) 不会被前一个匹配吞掉
+        self._search = re.compile(_trie_pattern(self.keywords)).search
+        # 同一位置只返回最长的关键词，它的前缀关键词也同时命中
+        self._prefixes = {
+            keyword: tuple(other for other in self.keywords if keyword.startswith(other))
+            for keyword in self.keywords
+        }
+
+    def find(self, text: str) -> set:
+        found = set()
+        search = self._search
+        match = search(text)
+        while match is not None:
+            found.update(self._prefixes[match.group()])
+            match = search(text, match.start() + 1)
+        return found
+
+    def scan(self, *texts: str) -> list:
+        """扫描多个字段 (用不会出现在关键词中的分隔符拼接后只扫描一次)，返回每个字段命中的关键词集合"""
+        joined = '\0'.join(texts)
+        found = [set() for _ in texts]
+        search = self._search
+        match = search(joined)
+        if match is None:
+            return found
+        bounds = []
+        end = -1
+        for text in texts:
+            end += len(text) + 1
+            bounds.append(end)
+        field = 0
+        while match is not None:
+            start = match.start()
+            while start > bounds[field]:
+                field += 1
+            found[field].update(self._prefixes[match.group()])
+            match = search(joined, start + 1)
+        return found
+
+DEVICE_MATCHER = KeywordMatcher(MODEL_IOT_KEYWORDS + IOT_KEYWORDS + COUNT_KEYWORDS + tuple(
+    keyword for _, keywords in MODEL_REASONS + NAME_REASONS + MIOT_REASONS for keyword in keywords
+))
+CATEGORY_MATCHER = KeywordMatcher(CATEGORY_MAPPING)
+_COUNT_KEYWORD_ORDER = {keyword: index for index, keyword in enumerate(COUNT_KEYWORDS)}
+_CATEGORY_ORDER = {keyword: index for index, keyword in enumerate(CATEGORY_MAPPING)}
+
+def _reason_index(reasons) -> dict:
+    """关键词 -> 它所成立的原因 (输出顺序, 原因)，命中的关键词很少，按关键词反查比逐条检查原因快"""
+    index = {}
+    for order, (reason, keywords) in enumerate(reasons):
+        for keyword in keywords:
+            index.setdefault(keyword, []).append((order, reason))
+    return index
+
+_MODEL_REASON_INDEX = _reason_index(MODEL_REASONS)
+_NAME_REASON_INDEX = _reason_index(NAME_REASONS)
+_MIOT_REASON_INDEX = _reason_index(MIOT_REASONS)
+
+class Classification(NamedTuple):
+    is_iot: bool  # extract_iot_devices 的IoT判定
+    reasons: tuple  # IoT原因 (get_iot_reason 的各条)
+    device_class: str  # count_device_types 的类型: phone/computer/tv/tablet/iot/unknown
+    class_reason: Optional[str]  # 归为 iot 的原因
+
+    @property
+    def reason(self) -> str:
+        """get_iot_reason 格式的原因文本"""
+        if self.reasons:
+            return '; '.join(self.reasons)
+        return "从设备特征推断"
+
+def _lower(value) -> str:
+    return value.lower() if isinstance(value, str) else ''
+
+def _matched(index, found) -> tuple:
+    matched = {entry for keyword in found for entry in index.get(keyword, ())}
+    return tuple(reason for _, reason in sorted(matched))
+
+def _first_count_keyword(found) -> int:
+    """count_device_types 关键词表中最靠前的命中关键词的位置，没有命中时为表长"""
+    return min((_COUNT_KEYWORD_ORDER[keyword] for keyword in found if keyword in _COUNT_KEYWORD_ORDER), default=len(COUNT_KEYWORDS))
+
+@lru_cache(maxsize=FIELD_CACHE_SIZE)
+def _scan_model(model: str):
+    """型号: (原因, 是否含IoT关键词, 计数关键词位置)"""
+    found = DEVICE_MATCHER.find(model)
+    return _matched(_MODEL_REASON_INDEX, found), not found.isdisjoint(MODEL_IOT_KEYWORDS), _first_count_keyword(found)
+
+@lru_cache(maxsize=FIELD_CACHE_SIZE)
+def _scan_names(names: str):
+    """"名称 原始名称": (原因, 计数关键词位置)"""
+    found = DEVICE_MATCHER.find(names)
+    return _matched(_NAME_REASON_INDEX, found), _first_count_keyword(found)
+
+@lru_cache(maxsize=FIELD_CACHE_SIZE)
+def _scan_miot_product(miot_product: str):
+    """MIoT产品: (原因, 是否含IoT关键词)"""
+    found = DEVICE_MATCHER.find(miot_product)
+    return _matched(_MIOT_REASON_INDEX, found), not found.isdisjoint(IOT_KEYWORDS)
+
+_NO_MATCH = ((), False)
+
+def classify(device: dict) -> Classification:
+    """对一个设备的各字段各扫描一次，返回IoT判定、原因和设备类型"""
+    get = device.get
+    is_miot = bool(get('is_miot_device', False))
+    product = _lower(get('product'))
+    user_product = _lower(get('userSpecifyProduct'))
+    name = _lower(get('name'))
+    miot_data = get('miotData')
+    model_reasons, model_iot, model_keyword = _scan_model(_lower(get('model')))
+    name_reasons, name_keyword = _scan_names(name + ' ' + _lower(get('originName')))
+    miot_reasons, miot_iot = (
+        _scan_miot_product(_lower(miot_data.get('product'))) if isinstance(miot_data, dict) else _NO_MATCH
+    )
+
+    reasons = model_reasons + name_reasons + miot_reasons
+    if is_miot:
+        reasons = ("标记为MIoT设备",) + reasons
+        return Classification(True, reasons, 'iot', '标记为MIoT设备')
+
+    for kind in PRODUCT_CLASSES:
+        if kind == product or kind == user_product:
+            return Classification(False, reasons, kind, None)
+    # extract_iot_devices 只看名称，count_device_types 名称为空时看原始名称
+    is_iot = model_iot or miot_iot or name not in UNKNOWN_DEVICE_NAMES
+    unknown_name = _lower(get('name') or get('originName')) in UNKNOWN_DEVICE_NAMES
+    if product == 'router' or user_product == 'router':
+        return Classification(is_iot, reasons, 'iot', '网络设备归类为IoT')
+    keyword = min(model_keyword, name_keyword)
+    if keyword < len(COUNT_KEYWORDS):
+        return Classification(is_iot, reasons, 'iot', f"找到关键词'{COUNT_KEYWORDS[keyword]}'")
+    if unknown_name:
+        return Classification(is_iot, reasons, 'unknown', None)
+    return Classification(is_iot, reasons, 'iot', '推断为IoT设备')
+
+def classification_columns(device: dict) -> dict:
+    """设备表分类列的取值，device 为导出记录格式
+
+    classification_reason: IoT设备为 get_iot_reason 格式的原因，其余为不属于IoT的原因。
+    """
+    result = classify(device)
+    if result.is_iot:
+        reason = result.reason
+    elif result.device_class in PRODUCT_CLASSES:
+        reason = f"产品类型为'{result.device_class}'"
+    else:
+        reason = "名称属于未知设备"
+    return {'is_iot': result.is_iot, 'device_class': result.device_class, 'classification_reason': reason}
+
+def classify_row(row) -> dict:
+    """按设备表的列 (name / origin_name / product / model，没有产品类型时用 category) 计算分类列
+
+    用于 API 写入和旧数据迁移；导入时使用完整的导出记录 (含MIoT标记等)，结果可能更准确。
+    """
+    device = {field: row.get(column) for column, field in DEVICE_COLUMN_FIELDS.items()}
+    if not device['product']:
+        device['product'] = CATEGORY_PRODUCTS.get(row.get('category'))
+    return classification_columns(device)
+
+@lru_cache(maxsize=FIELD_CACHE_SIZE)
+def map_product_to_category(product) -> str:
+    """将product字段映射到category分类"""
+    if not product:
+        return DEFAULT_CATEGORY
+    category = CATEGORY_MAPPING.get(product)
+    if category is not None:
+        return category
+    found = CATEGORY_MATCHER.find(product.lower())
+    if not found:
+        return DEFAULT_CATEGORY
+    return CATEGORY_MAPPING[min(found, key=_CATEGORY_ORDER.get)]
@@ -0,0 +1,203 @@
+"""
+API响应压缩 (ASGI中间件)
+
+按 Accept-Encoding 协商编码，优先级 zstd > br > gzip；brotli / zstandard
+未安装时只提供 gzip。小于 COMPRESSION_MIN_SIZE 的响应不压缩。
+
+一次性返回的响应整体压缩 (较大的放到线程池，避免阻塞事件循环)；
+分块返回的响应 (StreamingResponse、SSE) 逐块压缩并立即 flush，
+客户端不必等响应结束就能解出已发送的内容。
+"""
+
+import gzip
+import os
+import zlib
+
+import anyio
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:  # brotli 是可选依赖
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # zstandard 是可选依赖
+    zstandard = None
+
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+# 动态内容用较低的 brotli 质量，高质量档位的CPU开销数十倍于 gzip
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "4"))
+ZSTD_LEVEL = int(os.getenv("ZSTD_LEVEL", "3"))
+# 超过此大小的整体压缩在线程池中执行
+COMPRESSION_THREAD_THRESHOLD = 256 * 1024
+
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+    "text/",
+)
+
+class _GzipStream:
+    def __init__(self):
+        self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def chunk(self, data: bytes) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+class _BrotliStream:
+    def __init__(self):
+        self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+
+    def chunk(self, data: bytes) -> bytes:
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+class _ZstdStream:
+    def __init__(self):
+        self._compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+
+    def chunk(self, data: bytes) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+def _gzip(data: bytes) -> bytes:
+    return gzip.compress(data, GZIP_LEVEL, mtime=0)
+
+def _brotli(data: bytes) -> bytes:
+    return brotli.compress(data, quality=BROTLI_QUALITY)
+
+def _zstd(data: bytes) -> bytes:
+    return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+
+# 编码名 -> (整体压缩函数, 流式压缩器)，按优先级排列
+ENCODERS = {}
+if zstandard is not None:
+    ENCODERS["zstd"] = (_zstd, _ZstdStream)
+if brotli is not None:
+    ENCODERS["br"] = (_brotli, _BrotliStream)
+ENCODERS["gzip"] = (_gzip, _GzipStream)
+
+def parse_accept_encoding(accept_encoding: str) -> dict:
+    """解析 Accept-Encoding，返回 {编码: q值}"""
+    accepted = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    return accepted
+
+def accepts(accepted: dict, encoding: str) -> bool:
+    return accepted.get(encoding, accepted.get("*", 0.0)) > 0
+
+def negotiate(accept_encoding: str):
+    """从 Accept-Encoding 中选出支持的最优编码，没有可用编码时返回 None"""
+    accepted = parse_accept_encoding(accept_encoding)
+    for encoding in ENCODERS:
+        if accepts(accepted, encoding):
+            return encoding
+    return None
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size=COMPRESSION_MIN_SIZE, paths=("/api/",)):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.paths = tuple(paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.paths):
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        responder = _CompressionResponder(send, encoding, self.minimum_size)
+        await self.app(scope, receive, responder.send)
+
+class _CompressionResponder:
+    def __init__(self, send, encoding: str, minimum_size: int):
+        self._send = send
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.start_message = None
+        self.stream = None
+        self.passthrough = False
+
+    async def send(self, message):
+        message_type = message["type"]
+        if message_type == "http.response.start":
+            # 等到第一块响应体再决定是否压缩
+            self.start_message = message
+            return
+        if message_type != "http.response.body" or self.passthrough:
+            await self._send(message)
+            return
+        if self.stream is None:
+            await self._first_body(message)
+            return
+
+        body = self.stream.chunk(message.get("body", b""))
+        more_body = message.get("more_body", False)
+        if not more_body:
+            body += self.stream.finish()
+        await self._send({"type": "http.response.body", "body": body, "more_body": more_body})
+
+    async def _first_body(self, message):
+        headers = MutableHeaders(raw=self.start_message["headers"])
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if not self._compressible(headers) or (not more_body and len(body) < self.minimum_size):
+            self.passthrough = True
+            await self._send(self.start_message)
+            await self._send(message)
+            return
+
+        compress, stream_class = ENCODERS[self.encoding]
+        headers["Content-Encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        etag = headers.get("etag")
+        if etag and not etag.startswith("W/"):
+            # 压缩后字节不同，强ETag降为弱ETag
+            headers["ETag"] = f"W/{etag}"
+
+        if not more_body:
+            if len(body) >= COMPRESSION_THREAD_THRESHOLD:
+                body = await anyio.to_thread.run_sync(compress, body)
+            else:
+                body = compress(body)
+            headers["Content-Length"] = str(len(body))
+            await self._send(self.start_message)
+            await self._send({"type": "http.response.body", "body": body})
+            return
+
+        if "content-length" in headers:
+            del headers["Content-Length"]
+        self.stream = stream_class()
+        await self._send(self.start_message)
+        await self._send({"type": "http.response.body", "body": self.stream.chunk(body), "more_body": True})
+
+    def _compressible(self, headers) -> bool:
+        if self.start_message["status"] < 200 or self.start_message["status"] in (204, 304):
+            return False
+        if "content-encoding" in headers:
+            return False
+        content_type = headers.get("content-type", "")
+        return content_type.startswith(COMPRESSIBLE_TYPES)
@@ -1,21 +1,88 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from starlette.concurrency import run_in_threadpool
 import os
 
 # 数据库URL配置
 # 默认使用SQLite数据库，可以轻松切换到其他数据库
+# 使用异步驱动 (如 sqlite+aiosqlite:///./app/devices.db) 时API走异步会话
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./app/devices.db")
 
+ASYNC_DRIVERS = {"aiosqlite", "asyncpg", "aiomysql", "asyncmy"}
+
+_url = make_url(DATABASE_URL)
+USE_ASYNC = _url.get_driver_name() in ASYNC_DRIVERS
+# 建表、导入脚本等仍使用同步引擎，异步模式下去掉驱动部分使用默认同步驱动
+SYNC_DATABASE_URL = _url.set(drivername=_url.get_backend_name()) if USE_ASYNC else _url
+
+# SQLite性能配置
+# performance: WAL日志 + synchronous=NORMAL + 内存映射/缓存 + 忙等待，读写可以并发
+# default: 保持SQLite默认行为 (回滚日志，无忙等待)
+SQLITE_PROFILE = os.getenv("SQLITE_PROFILE", "performance")
+SQLITE_PRAGMAS = {
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT", "5000")),  # 毫秒
+    "cache_size": int(os.getenv("SQLITE_CACHE_SIZE", "-32000")),  # 负数单位为KB
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", str(128 * 1024 * 1024))),
+    "temp_store": "MEMORY",
+}
+# WAL模式下读连接互不阻塞，连接池大小决定了可以同时读的连接数
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+
+def _is_sqlite_file(url) -> bool:
+    return url.get_backend_name() == "sqlite" and url.database not in (None, "", ":memory:")
+
+def _apply_sqlite_pragmas(engine, pragmas):
+    """每个新建连接上执行PRAGMA"""
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+def create_db_engine(url, profile=SQLITE_PROFILE, async_engine=False):
+    """按配置创建数据库引擎，SQLite文件数据库会应用对应的性能配置"""
+    url = make_url(url)
+    options = {}
+    if url.get_backend_name() == "sqlite":
+        options["connect_args"] = {"check_same_thread": False}
+    use_profile = profile == "performance" and _is_sqlite_file(url)
+    if use_profile:
+        options["pool_size"] = DB_POOL_SIZE
+        options["max_overflow"] = DB_MAX_OVERFLOW
+
+    if async_engine:
+        from sqlalchemy.ext.asyncio import create_async_engine
+
+        created = create_async_engine(url, **options)
+        target = created.sync_engine
+    else:
+        created = create_engine(url, **options)
+        target = created
+
+    if use_profile:
+        _apply_sqlite_pragmas(target, SQLITE_PRAGMAS)
+    return created
+
 # 创建数据库引擎
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {}
-)
+engine = create_db_engine(SYNC_DATABASE_URL)
 
 # 创建会话工厂
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+if USE_ASYNC:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+    async_engine = create_db_engine(DATABASE_URL, async_engine=True)
+    AsyncSessionLocal = sessionmaker(
+        async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+    )
+
 # 创建基础类
 Base = declarative_base()
 
@@ -25,4 +92,51 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+# 获取异步数据库会话
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+# API路由使用的会话依赖，根据 DATABASE_URL 选择同步或异步
+get_session = get_async_db if USE_ASYNC else get_db
+
+async def run_db(db, fn, *args, **kwargs):
+    """在会话上执行同步的数据库操作 fn(session, *args)
+
+    异步会话通过 run_sync 在事件循环中执行，不占用线程池；
+    同步会话则放到线程池中执行，与普通 def 路由的行为一致。
+    """
+    if USE_ASYNC:
+        return await db.run_sync(fn, *args, **kwargs)
+    return await run_in_threadpool(fn, db, *args, **kwargs)
+
+def init_db():
+    """创建所有表，并为已有的旧表补齐新增的列和索引"""
+    from app import models  # noqa: F401  注册所有模型
+
+    Base.metadata.create_all(bind=engine)
+
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            existing = {col["name"] for col in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                col_type = column.type.compile(dialect=engine.dialect)
+                ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {col_type}"
+                # SQLite的ADD COLUMN只接受常量默认值
+                default = getattr(column.server_default, "arg", None)
+                if isinstance(default, str):
+                    ddl += f" DEFAULT {default}"
+                conn.execute(text(ddl))
+
+    # 新增列上的索引不会被create_all创建，这里单独补齐
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
+    from app.migrations import run_migrations
+    run_migrations(engine)
@@ -0,0 +1,123 @@
+"""
+设备变更推送 (Server-Sent Events)
+
+设备路由在写入成功后发布事件，事件ID就是设备表的同步版本号，
+断线重连的客户端携带 Last-Event-ID 即可补发错过的事件。
+
+每个订阅者有一个有界队列；客户端消费太慢导致队列写满时，丢弃其积压的事件
+并发送一个 reset 事件，客户端收到后用 GET /api/devices?since=<version> 做一次增量同步。
+历史缓冲中缺少断线期间的任何一个版本时同样发送 reset。
+
+其他进程 (import_devices.py 等) 的写入不会发布事件：订阅和保活时读取数据库的当前版本号，
+宽限期后仍没有事件的版本号向所有订阅者发送 reset。
+"""
+
+import asyncio
+import json
+import os
+from collections import deque
+from typing import Optional
+
+CHANGE_HISTORY_SIZE = int(os.getenv("CHANGE_HISTORY_SIZE", "1000"))
+CHANGE_QUEUE_SIZE = int(os.getenv("CHANGE_QUEUE_SIZE", "256"))
+# 已知的版本号在这段时间 (秒) 后仍没有事件时发送 reset (本进程的写入在提交后很快发布)
+CHANGE_GAP_GRACE = float(os.getenv("CHANGE_GAP_GRACE", "2"))
+
+class Subscriber:
+    def __init__(self, queue_size: int):
+        self.queue = asyncio.Queue(maxsize=queue_size)
+
+    def push(self, event: dict):
+        """非阻塞投递，队列已满时清空积压并改发 reset"""
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait({"type": "reset", "version": event["version"]})
+
+class ChangeBroker:
+    def __init__(self, history_size=CHANGE_HISTORY_SIZE, queue_size=CHANGE_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self.history_size = history_size
+        self._history = deque()  # 按版本号排序
+        self._subscribers = set()
+        self._latest = None  # 已知的最新版本号
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def publish(self, event_type: str, version: int, **payload):
+        """发布一个变更事件 (需在事件循环线程中调用)
+
+        并发写入的事件按请求完成的顺序发布，不一定是版本号顺序，历史中按版本号插入。
+        """
+        event = {"type": event_type, "version": version, **payload}
+        index = len(self._history)
+        while index and self._history[index - 1]["version"] > version:
+            index -= 1
+        self._history.insert(index, event)
+        if len(self._history) > self.history_size:
+            self._history.popleft()
+        self._expect(version - 1)
+        self._latest = max(self._latest, version)
+        for subscriber in list(self._subscribers):
+            subscriber.push(event)
+
+    def observe(self, version: int):
+        """得知数据库的当前版本号 (需在事件循环线程中调用)"""
+        self._expect(version)
+
+    def _expect(self, version: int):
+        """version 及之前的版本号都应当有事件，在途的写入在宽限期内发布"""
+        if self._latest is None:
+            self._latest = version
+            return
+        if version <= self._latest:
+            return
+        first, self._latest = self._latest + 1, version
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # 启动时的数据迁移，还没有订阅者
+        loop.call_later(CHANGE_GAP_GRACE, self._check_gap, first, version)
+
+    def _check_gap(self, first: int, last: int):
+        if not self._published(first, last):
+            event = {"type": "reset", "version": self._latest}
+            for subscriber in list(self._subscribers):
+                subscriber.push(event)
+
+    def _published(self, first: int, last: int) -> bool:
+        """first 到 last 的每个版本号在历史中都有事件"""
+        versions = {event["version"] for event in self._history if first <= event["version"] <= last}
+        return len(versions) == last - first + 1
+
+    def subscribe(self, since: Optional[int], current_version: int) -> Subscriber:
+        """订阅变更；since 为客户端已知的最新版本，会先补发其后的历史事件
+
+        current_version 是订阅前读取的数据库版本号，读取之后才发布的事件也从历史中补发
+        (since 为空时只补发这部分)；订阅在事件循环中一次完成，之后发布的事件直接进入队列。
+        """
+        subscriber = Subscriber(self.queue_size)
+        self.observe(current_version)
+        start = current_version if since is None else since
+        missed = [event for event in self._history if event["version"] > start]
+        covered = start >= current_version or self._published(start + 1, current_version)
+        if covered and len(missed) < self.queue_size:
+            for event in missed:
+                subscriber.push(event)
+        else:
+            subscriber.push({"type": "reset", "version": self._latest})
+        self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        self._subscribers.discard(subscriber)
+
+def format_sse(event: dict) -> str:
+    data = json.dumps(event, ensure_ascii=False, default=str)
+    return f"id: {event['version']}\nevent: {event['type']}\ndata: {data}\n\n"
+
+change_broker = ChangeBroker()
@@ -0,0 +1,294 @@
+"""
+远程设备图标的本地镜像
+
+导入的图标多为 s.miwifi.com 和第三方站点的远程URL，浏览器每次都要从外网获取。
+镜像把这些图标下载到 static/mirror，并把设备的图标URL改写为 /static/mirror/<文件名>：
+
+- 下载使用共享连接池的 httpx.AsyncClient，并发数受信号量限制；
+- 已镜像的图标刷新时带 If-None-Match / If-Modified-Since 条件请求；
+- 镜像记录 (原始URL、ETag 等) 存在 icon_mirror 表中，导入脚本和服务进程共享；
+- 本地文件总大小超过上限时按最近访问时间淘汰，被淘汰的图标再次被请求时重新下载，
+  下载失败则重定向到原始URL。
+
+批量镜像并改写设备图标 (在 backend 目录下运行):
+    python -m app.icon_mirror            # 镜像设备表中的远程图标
+    python -m app.icon_mirror --refresh  # 同时对已镜像的图标做条件请求刷新
+
+测试时可以镜像本地HTTP服务上的URL，或给 IconMirror 传入 httpx 的 transport。
+"""
+
+import argparse
+import asyncio
+import hashlib
+import os
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+
+from sqlalchemy import func, or_
+
+from app import models, sync
+from app.cache import device_cache
+from app.database import SessionLocal, init_db
+from app.events import change_broker
+from app.uploads import ICON_EXTENSIONS, MAX_ICON_SIZE
+
+try:
+    import httpx
+except ImportError:  # httpx 是可选依赖，未安装时镜像不可用
+    httpx = None
+
+MIRROR_DIR = "app/static/mirror"
+MIRROR_URL_PREFIX = "/static/mirror"
+ICON_MIRROR_MAX_BYTES = int(os.getenv("ICON_MIRROR_MAX_BYTES", str(256 * 1024 * 1024)))
+ICON_MIRROR_CONCURRENCY = int(os.getenv("ICON_MIRROR_CONCURRENCY", "8"))
+ICON_MIRROR_TIMEOUT = float(os.getenv("ICON_MIRROR_TIMEOUT", "10"))
+# 访问时间的更新粒度 (秒)，避免每次读取图标都写数据库
+ACCESS_RESOLUTION = 600
+
+def is_remote(url) -> bool:
+    return bool(url) and url.startswith(("http://", "https://"))
+
+def mirror_name(url: str) -> str:
+    """镜像文件名: URL的哈希 (取40位，与按内容寻址的上传文件区分，镜像内容可能随源站更新)"""
+    extension = ICON_EXTENSIONS.get(os.path.splitext(urlsplit(url).path)[1].lower(), ".png")
+    return hashlib.sha256(url.encode("utf-8")).hexdigest()[:40] + extension
+
+def local_url(url: str) -> str:
+    return f"{MIRROR_URL_PREFIX}/{mirror_name(url)}"
+
+def _now():
+    return datetime.now(timezone.utc)
+
+class IconMirror:
+    def __init__(
+        self,
+        directory=MIRROR_DIR,
+        max_bytes=ICON_MIRROR_MAX_BYTES,
+        concurrency=ICON_MIRROR_CONCURRENCY,
+        session_factory=SessionLocal,
+        transport=None,
+    ):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.concurrency = concurrency
+        self.session_factory = session_factory
+        self._transport = transport
+        self._client = None
+        self._semaphore = None  # 在事件循环中创建 (Python 3.9 的 Semaphore 创建时就绑定当前事件循环)
+        self._touched = {}  # 文件名 -> 上次写入访问时间的 monotonic 时间
+
+    def _get_client(self):
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency),
+                timeout=ICON_MIRROR_TIMEOUT,
+                follow_redirects=True,
+                transport=self._transport,
+            )
+        return self._client
+
+    def _get_semaphore(self):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self._semaphore
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        self._semaphore = None
+
+    async def mirror(self, url: str) -> str:
+        """确保图标已镜像到本地，返回 fetched / not_modified / failed"""
+        if httpx is None:
+            return "failed"
+        name = mirror_name(url)
+        entry = await asyncio.to_thread(self._load_entry, name)
+        headers = {}
+        if entry is not None and entry.size and os.path.exists(os.path.join(self.directory, name)):
+            if entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
+
+        async with self._get_semaphore():
+            try:
+                async with self._get_client().stream("GET", url, headers=headers) as response:
+                    if response.status_code == 304:
+                        await asyncio.to_thread(self._mark_fresh, name)
+                        return "not_modified"
+                    if response.status_code != 200 or not response.headers.get("content-type", "").startswith("image/"):
+                        return "failed"
+                    content = bytearray()
+                    async for chunk in response.aiter_bytes():
+                        content.extend(chunk)
+                        if len(content) > MAX_ICON_SIZE:
+                            return "failed"
+            except httpx.HTTPError:
+                return "failed"
+
+        await asyncio.to_thread(
+            self._store, name, url, bytes(content),
+            response.headers.get("etag"), response.headers.get("last-modified"),
+        )
+        return "fetched"
+
+    async def mirror_all(self, urls) -> dict:
+        """并发镜像一组URL，返回 {url: 状态}"""
+        urls = list(dict.fromkeys(urls))
+        results = await asyncio.gather(*(self.mirror(url) for url in urls))
+        return dict(zip(urls, results))
+
+    async def touch(self, name: str):
+        """记录一次访问 (按 ACCESS_RESOLUTION 合并写入)"""
+        now = time.monotonic()
+        if now - self._touched.get(name, 0) < ACCESS_RESOLUTION:
+            return
+        self._touched[name] = now
+        await asyncio.to_thread(self._update_entry, name, last_access=_now())
+
+    def entry_url(self, name: str):
+        """镜像文件对应的原始URL，不是镜像文件时返回 None"""
+        entry = self._load_entry(name)
+        return entry.url if entry is not None else None
+
+    def _load_entry(self, name: str):
+        db = self.session_factory()
+        try:
+            return db.get(models.IconMirrorEntry, name)
+        finally:
+            db.close()
+
+    def _update_entry(self, name: str, **values):
+        db = self.session_factory()
+        try:
+            db.query(models.IconMirrorEntry).filter(models.IconMirrorEntry.name == name).update(values)
+            db.commit()
+        finally:
+            db.close()
+
+    def _mark_fresh(self, name: str):
+        self._update_entry(name, fetched_at=_now(), last_access=_now())
+
+    def _store(self, name, url, content, etag, last_modified):
+        os.makedirs(self.directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, prefix=".mirror-")
+        with os.fdopen(fd, "wb") as temp:
+            temp.write(content)
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, os.path.join(self.directory, name))
+
+        db = self.session_factory()
+        try:
+            entry = db.get(models.IconMirrorEntry, name)
+            if entry is None:
+                entry = models.IconMirrorEntry(name=name, url=url)
+                db.add(entry)
+            entry.etag = etag
+            entry.last_modified = last_modified
+            entry.size = len(content)
+            entry.fetched_at = entry.last_access = _now()
+            db.flush()
+            self._evict(db, keep=name)
+            db.commit()
+        finally:
+            db.close()
+
+    def _evict(self, db, keep=None):
+        """本地文件总大小超过上限时，按最近访问时间从旧到新删除文件"""
+        total = db.query(func.coalesce(func.sum(models.IconMirrorEntry.size), 0)).scalar()
+        if total <= self.max_bytes:
+            return
+        entries = (
+            db.query(models.IconMirrorEntry)
+            .filter(models.IconMirrorEntry.size > 0, models.IconMirrorEntry.name != keep)
+            .order_by(models.IconMirrorEntry.last_access)
+        )
+        for entry in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(os.path.join(self.directory, entry.name))
+            except FileNotFoundError:
+                pass
+            total -= entry.size
+            entry.size = 0
+
+icon_mirror = IconMirror()
+
+def rewrite_device_icons(db, mirrored_urls) -> int:
+    """把已镜像的远程图标URL改写为本地路径，返回改写的设备数 (需在事件循环线程中调用)"""
+    mirrored_urls = set(mirrored_urls)
+    if not mirrored_urls:
+        return 0
+    devices = (
+        db.query(models.Device)
+        .filter(or_(models.Device.icon_url.in_(mirrored_urls), models.Device.big_icon_url.in_(mirrored_urls)))
+        .all()
+    )
+    if not devices:
+        return 0
+    version = sync.next_version(db)
+    for device in devices:
+        if device.icon_url in mirrored_urls:
+            device.icon_url = local_url(device.icon_url)
+        if device.big_icon_url in mirrored_urls:
+            device.big_icon_url = local_url(device.big_icon_url)
+        device.version = version
+    db.commit()
+    device_cache.invalidate()
+    change_broker.publish("bulk", version, created=0, updated=len(devices))
+    return len(devices)
+
+def remote_icon_urls(db):
+    """设备表中所有远程图标URL"""
+    rows = db.query(models.Device.icon_url, models.Device.big_icon_url).all()
+    return [url for row in rows for url in row if is_remote(url)]
+
+async def mirror_devices(mirror: IconMirror, refresh=False) -> Counter:
+    """镜像设备表中的远程图标并改写URL；refresh 时同时刷新已镜像的图标"""
+    db = mirror.session_factory()
+    try:
+        urls = remote_icon_urls(db)
+        if refresh:
+            urls += [row[0] for row in db.query(models.IconMirrorEntry.url)]
+    finally:
+        db.close()
+
+    results = await mirror.mirror_all(urls)
+    db = mirror.session_factory()
+    try:
+        rewritten = rewrite_device_icons(db, [url for url, status in results.items() if status != "failed"])
+    finally:
+        db.close()
+    summary = Counter(results.values())
+    summary["rewritten"] = rewritten
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description="镜像设备的远程图标到本地")
+    parser.add_argument("--refresh", action="store_true", help="同时对已镜像的图标发条件请求刷新")
+    parser.add_argument("--concurrency", type=int, default=ICON_MIRROR_CONCURRENCY)
+    args = parser.parse_args()
+
+    init_db()
+
+    async def run():
+        mirror = IconMirror(concurrency=args.concurrency)
+        try:
+            return await mirror_devices(mirror, refresh=args.refresh)
+        finally:
+            await mirror.aclose()
+
+    started = time.perf_counter()
+    summary = asyncio.run(run())
+    print(
+        f"✅ 下载 {summary['fetched']} 个，未变化 {summary['not_modified']} 个，失败 {summary['failed']} 个，"
+        f"改写设备 {summary['rewritten']} 个，耗时 {time.perf_counter() - started:.1f}s"
+    )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,340 @@
+"""
+设备导入引擎 (import_devices.py 和后端共用)
+
+把路由器导出的设备记录转换为设备表的行，按块写入:
+每块先用 executemany 写入临时表 import_staging，再用两条集合语句完成
+"已有设备只填充空字段" 的 UPDATE 和新设备的 INSERT，整个导入在调用方的同一事务中。
+
+每个设备保存导入字段的内容指纹 (import_hash)，重复导入时指纹未变的设备不再写入，
+导入一份基本未变的导出文件时几乎不产生磁盘写入。
+
+每个设备在转换时用完整的导出记录 (含MIoT标记和产品) 计算分类列 (is_iot / device_class /
+classification_reason)，已有设备的分类列总是以最新导出为准。
+
+大文件导入可以把转换 (图标优先级、类别映射、分类、描述和指纹) 放到进程池中：
+解析线程把每个设备裁剪为导入用到的字段，按批提交给进程池，
+批次的 future 经有界队列按顺序交给唯一的写入方 (调用线程) 分块写库。
+"""
+
+import hashlib
+import os
+import queue
+import threading
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Callable, Iterable, Iterator, Optional, Union
+
+from sqlalchemy import text
+
+from app.classification import CLASSIFICATION_COLUMNS, classification_columns, map_product_to_category
+from app.mac import mac_to_int, normalize_mac
+
+MIWIFI_ICON_HOST = "https://s.miwifi.com/icon/"
+# 每块写入的设备数
+IMPORT_CHUNK_SIZE = 2000
+# 转换进程数，1 表示在写入线程中直接转换
+IMPORT_WORKERS = int(os.getenv("IMPORT_WORKERS", "1"))
+# 每次提交给进程池的设备数
+TRANSFORM_BATCH_SIZE = 1000
+# 导出记录中转换用到的字段 (发给进程池前裁剪掉 events 等，miotData 只保留 product，减少进程间传输)
+SOURCE_FIELDS = (
+    'mac', 'name', 'originName', 'company', 'product', 'userSpecifyProduct', 'model',
+    'iconUrl', 'bigIconUrl', 'neg480', 'neg168', 'is_miot_device',
+)
+
+# 设备表中由导入写入的列 (暂存表与之相同)
+IMPORT_COLUMNS = [
+    'mac', 'mac_int', 'note', 'brand', 'category', 'icon_url', 'description',
+    'origin_name', 'name', 'company', 'product', 'model', 'big_icon_url', 'neg480', 'neg168',
+    *CLASSIFICATION_COLUMNS, 'import_hash',
+]
+# 参与内容指纹的列
+HASH_COLUMNS = [column for column in IMPORT_COLUMNS if column not in ('mac_int', 'import_hash')]
+# 已有设备只填充为空的列: 设备表列 -> 暂存表列
+FILL_COLUMNS = {
+    'origin_name': 'origin_name',
+    'name': 'name',
+    'company': 'company',
+    'product': 'product',
+    'model': 'model',
+    'icon_url': 'icon_url',
+    'big_icon_url': 'big_icon_url',
+    'neg480': 'neg480',
+    'neg168': 'neg168',
+    'brand': 'company',
+    'category': 'category',
+}
+
+def process_icon_url_with_priority(device_info):
+    """
+    新的图标优先级处理: neg480 > neg168 > bigIconUrl > iconUrl
+    neg480 和 neg168 通常是完整的第三方链接，不需要拼接host
+    """
+    # 按优先级检查图标
+    for field in ['neg480', 'neg168', 'bigIconUrl', 'iconUrl']:
+        icon_url = device_info.get(field)
+        if icon_url:
+            # neg480 和 neg168 通常是完整链接，直接返回
+            if field in ['neg480', 'neg168']:
+                return icon_url, field
+            
+            # bigIconUrl 和 iconUrl 可能需要补充host
+            if icon_url.startswith('http://') or icon_url.startswith('https://'):
+                return icon_url, field
+            else:
+                return MIWIFI_ICON_HOST + icon_url, field
+    
+    return None, 'none'
+
+def content_hash(row: dict) -> str:
+    """导入字段的内容指纹 (记录的是导出文件中的内容，而非合并后设备表中的值)"""
+    digest = hashlib.blake2b(digest_size=16)
+    for column in HASH_COLUMNS:
+        value = row[column]
+        digest.update(b'\x1f' if value is None else str(value).encode('utf-8') + b'\x1e')
+    return digest.hexdigest()
+
+def transform_device(device_info: dict) -> Optional[dict]:
+    """把一条导出记录转换为设备表的行，MAC无效时返回 None"""
+    mac = normalize_mac(device_info.get('mac'))
+    if not mac:
+        return None
+    icon_url, icon_source = process_icon_url_with_priority(device_info)
+    row = {
+        'mac': mac,
+        'mac_int': mac_to_int(mac),
+        'note': device_info.get('name'),
+        'brand': device_info.get('company'),
+        'category': map_product_to_category(device_info.get('product')),
+        'icon_url': icon_url,
+        'description': f"{device_info.get('company', '')} {device_info.get('model', '')}".strip(),
+        'origin_name': device_info.get('originName'),
+        'name': device_info.get('name'),
+        'company': device_info.get('company'),
+        'product': device_info.get('product'),
+        'model': device_info.get('model'),
+        'big_icon_url': device_info.get('bigIconUrl'),
+        'neg480': device_info.get('neg480'),
+        'neg168': device_info.get('neg168'),
+        'icon_source': icon_source,
+    }
+    row.update(classification_columns(device_info))
+    row['import_hash'] = content_hash(row)
+    return row
+
+def project_device(device_info: dict) -> dict:
+    """只保留转换用到的字段 (缺失的字段保持缺失，description 依赖这一点)"""
+    record = {field: device_info[field] for field in SOURCE_FIELDS if field in device_info}
+    miot_data = device_info.get('miotData')
+    if isinstance(miot_data, dict):
+        record['miotData'] = {'product': miot_data.get('product')}
+    return record
+
+def transform_batch(records) -> list:
+    return [transform_device(record) for record in records]
+
+def iter_transformed(devices: Iterable[dict], workers=IMPORT_WORKERS, batch_size=TRANSFORM_BATCH_SIZE) -> Iterator[Optional[dict]]:
+    """按原顺序返回每条导出记录的转换结果 (MAC无效时为 None)
+
+    workers > 1 时由后台线程读取 devices (解析文件) 并按批提交给进程池，
+    已提交的批次放在容量为 2 * workers 的有界队列中，解析速度快于转换时在此等待，
+    内存占用与文件大小无关。
+    """
+    if workers <= 1:
+        for device_info in devices:
+            yield transform_device(device_info)
+        return
+
+    pending = queue.Queue(maxsize=2 * workers)
+    stop = threading.Event()
+    errors = []
+
+    def put(item):
+        # 写入方提前退出 (出错) 时不再阻塞在满队列上
+        while not stop.is_set():
+            try:
+                pending.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def feed(pool):
+        try:
+            iterator = iter(devices)
+            while not stop.is_set():
+                batch = [project_device(device_info) for device_info in islice(iterator, batch_size)]
+                if not batch:
+                    break
+                put(pool.submit(transform_batch, batch))
+        except BaseException as exc:  # 解析错误交给写入方抛出
+            errors.append(exc)
+        finally:
+            put(None)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        feeder = threading.Thread(target=feed, args=(pool,), name="import-feeder", daemon=True)
+        feeder.start()
+        try:
+            while True:
+                future = pending.get()
+                if future is None:
+                    break
+                yield from future.result()
+            if errors:
+                raise errors[0]
+        finally:
+            stop.set()
+            feeder.join()
+
+def _merge_duplicate(row: dict, duplicate: dict):
+    """同一导出中重复出现的MAC: 与写入已有设备相同，只填充前一条中为空的字段"""
+    for column in set(FILL_COLUMNS.values()):
+        if not row[column]:
+            row[column] = duplicate[column]
+    if not row['brand']:
+        row['brand'] = row['company']
+    row['import_hash'] = content_hash(row)
+
+_CREATE_STAGING = f"""
+    CREATE TEMP TABLE IF NOT EXISTS import_staging (
+        mac_int INTEGER PRIMARY KEY,
+        {', '.join(f"{column} {'INTEGER' if column == 'is_iot' else 'TEXT'}" for column in IMPORT_COLUMNS if column != 'mac_int')}
+    )
+"""
+_INSERT_STAGING = (
+    f"INSERT INTO import_staging ({', '.join(IMPORT_COLUMNS)}) "
+    f"VALUES ({', '.join(':' + column for column in IMPORT_COLUMNS)})"
+)
+_UPDATE_EXISTING = f"""
+    UPDATE devices
+    SET {', '.join(f"{column} = COALESCE(NULLIF(devices.{column}, ''), s.{source})" for column, source in FILL_COLUMNS.items())},
+        {', '.join(f'{column} = s.{column}' for column in CLASSIFICATION_COLUMNS)},
+        import_hash = s.import_hash,
+        version = :version,
+        updated_at = datetime('now')
+    FROM import_staging AS s
+    -- IN 子查询让 SQLite 从暂存表出发按 mac_int 索引查找，而不是每块扫描整个设备表
+    WHERE devices.mac_int IN (SELECT mac_int FROM import_staging)
+      AND devices.mac_int = s.mac_int
+      AND devices.import_hash IS NOT s.import_hash
+"""
+_INSERT_NEW = f"""
+    INSERT INTO devices ({', '.join(IMPORT_COLUMNS)}, version, created_at, updated_at)
+    SELECT {', '.join('s.' + column for column in IMPORT_COLUMNS)}, :version, datetime('now'), datetime('now')
+    FROM import_staging AS s
+    WHERE NOT EXISTS (SELECT 1 FROM devices d WHERE d.mac_int = s.mac_int)
+"""
+
+def _apply_chunk(conn, rows, version, stats: Counter):
+    conn.execute(text("DELETE FROM import_staging"))
+    conn.execute(text(_INSERT_STAGING), rows)
+    existing, changed = conn.execute(text(
+        "SELECT COUNT(*), COALESCE(SUM(d.import_hash IS NOT s.import_hash), 0) "
+        "FROM import_staging s JOIN devices d ON d.mac_int = s.mac_int"
+    )).one()
+    # 指纹未变的设备不写入；整块都未变时跳过写入语句
+    if callable(version) and (changed or existing < len(rows)):
+        version = version()
+    if changed:
+        conn.execute(text(_UPDATE_EXISTING), {'version': version})
+    if existing < len(rows):
+        conn.execute(text(_INSERT_NEW), {'version': version})
+        conn.execute(text("DELETE FROM device_tombstones WHERE mac IN (SELECT mac FROM import_staging)"))
+    stats['changed'] += changed
+    stats['unchanged'] += existing - changed
+    stats['new'] += len(rows) - existing
+
+def import_devices(
+    conn, devices: Iterable[dict], version: Union[int, Callable[[], int]], chunk_size=IMPORT_CHUNK_SIZE,
+    on_progress=None, workers=IMPORT_WORKERS, on_chunk=None,
+):
+    """导入一组导出记录 (可以是流式迭代器)，返回 (统计, 图标来源统计)
+
+    conn 为调用方事务中的连接 (SQLite)，写入的设备使用同一个版本号 version；
+    version 也可以是函数，在有写入的块写入前调用一次 (按块提交时每块分配自己的版本号)。
+    on_chunk(统计) 在每块写入后调用 (当前线程，包括最后一块)，供调用方写入随设备解析
+    收集的其他数据或提交事务；on_progress(已处理数) 在其后调用；
+    workers > 1 时转换在进程池中进行。
+    统计中 new / changed / unchanged 为新增、指纹变化 (已写入)、指纹未变 (未写入) 的设备数，
+    duplicates 为同一块中重复出现并合并的记录数。
+    """
+    stats = Counter(new=0, changed=0, unchanged=0, duplicates=0, skipped=0, processed=0)
+    icon_stats = Counter()
+    conn.execute(text(_CREATE_STAGING))
+    try:
+        chunk = {}
+        for row in iter_transformed(devices, workers):
+            stats['processed'] += 1
+            if row is None:
+                stats['skipped'] += 1
+                continue
+            icon_stats[row['icon_source']] += 1
+            previous = chunk.get(row['mac_int'])
+            if previous is not None:
+                _merge_duplicate(previous, row)
+                stats['duplicates'] += 1
+                continue
+            chunk[row['mac_int']] = row
+            if len(chunk) >= chunk_size:
+                _apply_chunk(conn, list(chunk.values()), version, stats)
+                chunk = {}
+                if on_chunk is not None:
+                    on_chunk(stats)
+                if on_progress is not None:
+                    on_progress(stats['processed'])
+        if chunk:
+            _apply_chunk(conn, list(chunk.values()), version, stats)
+            if on_chunk is not None:
+                on_chunk(stats)
+    finally:
+        conn.execute(text("DROP TABLE IF EXISTS temp.import_staging"))
+    return stats, icon_stats
+
+def existing_hashes(conn) -> dict:
+    """设备表中 {整数MAC: 内容指纹}，尚未记录指纹的设备 (旧版本导入) 为 None
+
+    预演不补齐表结构，旧表还没有 mac_int 列时由 mac 列计算。
+    """
+    columns = {row[1] for row in conn.execute(text("PRAGMA table_info(devices)"))}
+    hash_column = 'import_hash' if 'import_hash' in columns else 'NULL'
+    if 'mac_int' not in columns:
+        rows = conn.execute(text(f"SELECT mac, {hash_column} FROM devices"))
+        hashes = {}
+        for mac, import_hash in rows:
+            hashes.setdefault(mac_to_int(mac), import_hash)
+        hashes.pop(None, None)
+        return hashes
+    rows = conn.execute(text(f"SELECT mac_int, {hash_column} FROM devices WHERE mac_int IS NOT NULL"))
+    return {mac_int: import_hash for mac_int, import_hash in rows}
+
+def diff_devices(conn, devices: Iterable[dict], on_progress=None, progress_interval=IMPORT_CHUNK_SIZE, workers=IMPORT_WORKERS):
+    """预演导入: 不写数据库，在内存中用哈希连接比较导出记录和设备表的指纹
+
+    先一次性读出设备表的 {整数MAC: 指纹}，再逐条探测导出记录，返回与 import_devices
+    相同格式的 (统计, 图标来源统计)。同一MAC重复出现时按首次出现的记录比较。
+    """
+    stats = Counter(new=0, changed=0, unchanged=0, duplicates=0, skipped=0, processed=0)
+    icon_stats = Counter()
+    hashes = existing_hashes(conn)
+    seen = set()
+    for row in iter_transformed(devices, workers):
+        stats['processed'] += 1
+        if on_progress is not None and stats['processed'] % progress_interval == 0:
+            on_progress(stats['processed'])
+        if row is None:
+            stats['skipped'] += 1
+            continue
+        icon_stats[row['icon_source']] += 1
+        mac_int = row['mac_int']
+        if mac_int in seen:
+            stats['duplicates'] += 1
+            continue
+        seen.add(mac_int)
+        if mac_int not in hashes:
+            stats['new'] += 1
+        elif hashes[mac_int] != row['import_hash']:
+            stats['changed'] += 1
+        else:
+            stats['unchanged'] += 1
+    return stats, icon_stats
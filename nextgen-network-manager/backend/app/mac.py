@@ -0,0 +1,44 @@
+"""
+MAC地址格式处理
+
+路由器返回 "AA:BB:CC:DD:EE:FF"，扩展和用户输入可能是小写、
+"-"/"."分隔或不带分隔符的形式，这里统一转换为大写冒号分隔的标准形式。
+"""
+
+import re
+from typing import Optional
+
+_SEPARATORS = re.compile(r"[\s:\-.]")
+_HEX12 = re.compile(r"^[0-9A-F]{12}$")
+
+def normalize_mac(mac: str) -> Optional[str]:
+    """转换为标准形式 AA:BB:CC:DD:EE:FF，无法识别时返回 None"""
+    if not mac:
+        return None
+    digits = _SEPARATORS.sub("", mac).upper()
+    if not _HEX12.match(digits):
+        return None
+    return ":".join(digits[i:i + 2] for i in range(0, 12, 2))
+
+def canonical_mac(mac: str) -> str:
+    """标准形式；无法识别的 (如类别示例设备的 TEMP_xxx) 保持原来的大写形式"""
+    return normalize_mac(mac) or mac.strip().upper()
+
+def mac_to_int(mac: str) -> Optional[int]:
+    """转换为48位整数键，无法识别时返回 None"""
+    normalized = normalize_mac(mac)
+    if normalized is None:
+        return None
+    return int(normalized.replace(":", ""), 16)
+
+def int_to_mac(value: int) -> str:
+    digits = f"{value:012X}"
+    return ":".join(digits[i:i + 2] for i in range(0, 12, 2))
+
+def oui_range(oui: str):
+    """厂商前缀 (前3字节，如 "50:88:11") 对应的整数键闭区间 (low, high)"""
+    digits = _SEPARATORS.sub("", oui or "").upper()
+    if not re.match(r"^[0-9A-F]{6}$", digits):
+        raise ValueError("无效的OUI前缀")
+    low = int(digits, 16) << 24
+    return low, low | 0xFFFFFF
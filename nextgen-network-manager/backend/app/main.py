@@ -1,9 +1,23 @@
-from fastapi import FastAPI, UploadFile, File
+from fastapi import FastAPI, Header, HTTPException, Request, UploadFile, File
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
+import asyncio
 import os
-import shutil
-from app.api import devices, categories
+from typing import Optional
+from starlette.concurrency import run_in_threadpool
+from app import sync
+from app.api import devices, categories, device_events, snapshots
+from app.compression import CompressionMiddleware
+from app.database import SessionLocal, init_db
+from app.events import change_broker, format_sse
+from app.icon_mirror import MIRROR_DIR, icon_mirror
+from app.snapshot_ingest import snapshot_worker
+from app.static_files import CachedStaticFiles, MirrorStaticFiles
+from app.thumbnails import schedule_thumbnails
+from app.uploads import UPLOAD_DIR, UPLOAD_URL_PREFIX, UploadTooLarge, icon_extension, store_icon
+
+# 初始化数据库 (创建表并补齐新增的列)
+init_db()
 
 app = FastAPI(
     title="小米路由器设备备注API",
@@ -20,39 +34,110 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# API响应压缩 (gzip，安装了 brotli / zstandard 时优先使用)
+app.add_middleware(CompressionMiddleware)
+
 # 包含API路由
 app.include_router(devices.router, prefix="/api", tags=["devices"])
 app.include_router(categories.router, prefix="/api", tags=["categories"])
+app.include_router(device_events.router, prefix="/api", tags=["device-events"])
+app.include_router(snapshots.router, prefix="/api", tags=["snapshots"])
 
 # 定义上传图标API路由（必须在静态文件挂载之前）
 @app.post("/api/upload-icon")
 async def upload_icon(file: UploadFile = File(...)):
-    """上传设备图标"""
-    # 创建上传目录
-    upload_dir = "app/static/uploads"
-    os.makedirs(upload_dir, exist_ok=True)
+    """上传设备图标
 
-    # 生成文件路径
-    file_path = os.path.join(upload_dir, file.filename)
+    文件按内容哈希命名，相同的图标只保存一份；返回的URL内容不会再变化。
+    缩略图在后台生成，通过 URL?s=48 获取。
+    """
+    try:
+        extension = icon_extension(file.filename)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        # 哈希和写盘都是阻塞操作，放到线程池中执行
+        filename = await run_in_threadpool(store_icon, file.file, extension)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    finally:
+        await file.close()
+    schedule_thumbnails(os.path.join(UPLOAD_DIR, filename))
 
-    # 保存文件
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    return {"url": f"{UPLOAD_URL_PREFIX}/{filename}", "filename": filename}
 
-    # 返回文件URL
-    file_url = f"/static/uploads/{file.filename}"
-    return {"url": file_url, "filename": file.filename}
+# SSE保活间隔 (秒)
+CHANGES_KEEPALIVE = 15
 
-# 挂载静态文件目录
-app.mount("/static", StaticFiles(directory="app/static"), name="static")
+def _current_version():
+    db = SessionLocal()
+    try:
+        return sync.current_version(db)
+    finally:
+        db.close()
+
+# 设备变更推送 (Server-Sent Events)
+@app.get("/api/changes")
+async def device_changes(
+    request: Request,
+    since: Optional[int] = None,
+    last_event_id: Optional[str] = Header(None),
+):
+    """订阅设备变更事件
+
+    事件ID为设备同步版本号，重连时浏览器会自动携带 Last-Event-ID，
+    也可以用 since 指定；收到 reset 事件时应通过 /api/devices?since= 增量同步。
+    """
+    if since is None and last_event_id and last_event_id.isdigit():
+        since = int(last_event_id)
+    current_version = await run_in_threadpool(_current_version)
+    # 读取版本号期间发布的事件由 subscribe 从历史中补发
+    subscriber = change_broker.subscribe(since, current_version)
+
+    async def stream():
+        try:
+            yield f"retry: 3000\nid: {current_version}\nevent: hello\ndata: {{\"version\": {current_version}}}\n\n"
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(subscriber.queue.get(), timeout=CHANGES_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    # 顺便检查其他进程 (如 import_devices.py) 写入的版本
+                    change_broker.observe(await run_in_threadpool(_current_version))
+                    yield ": keepalive\n\n"
+                    continue
+                yield format_sse(event)
+        finally:
+            change_broker.unsubscribe(subscriber)
 
-# 挂载Web UI静态文件目录（放在最后，作为默认路由）
-app.mount("/", StaticFiles(directory="app/static/web-ui", html=True), name="web-ui")
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.on_event("startup")
+async def resume_snapshots():
+    # 继续导入上次退出时未完成的快照
+    for snapshot_id in await run_in_threadpool(snapshot_worker.pending_ids):
+        snapshot_worker.schedule(snapshot_id)
+
+@app.on_event("shutdown")
+async def close_icon_mirror():
+    await icon_mirror.aclose()
+
+@app.on_event("shutdown")
+async def stop_snapshot_worker():
+    snapshot_worker.shutdown()
+
+# 挂载镜像的远程图标 (需在 /static 之前，本地文件被淘汰时重新下载)
+os.makedirs(MIRROR_DIR, exist_ok=True)
+app.mount("/static/mirror", MirrorStaticFiles(directory=MIRROR_DIR, mirror=icon_mirror), name="icon-mirror")
+
+# 挂载静态文件目录
+app.mount("/static", CachedStaticFiles(directory="app/static"), name="static")
 
-@app.get("/")
-async def root():
-    # 重定向到管理界面
-    return {"message": "小米路由器设备备注API服务", "redirect": "/static/index.html"}
+# 挂载Web UI静态文件目录（放在最后，作为默认路由，"/" 返回 index.html）
+app.mount("/", CachedStaticFiles(directory="app/static/web-ui", html=True), name="web-ui")
 
 @app.get("/health")
 async def health_check():
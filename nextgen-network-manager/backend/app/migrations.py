@@ -0,0 +1,115 @@
+"""
+数据迁移 (在 init_db 补齐表结构之后执行，可重复运行)
+"""
+
+from sqlalchemy import text
+
+from app.classification import CLASSIFICATION_COLUMNS, CLASSIFICATION_INPUT_COLUMNS, classify_row
+from app.events import change_broker
+from app.mac import mac_to_int, normalize_mac
+from app.sync import next_version
+
+def init_sync_state(conn):
+    """创建版本计数器行，并保证计数器不小于设备和墓碑中已有的最大版本号"""
+    conn.execute(text("INSERT OR IGNORE INTO sync_state (id, version) VALUES (1, 0)"))
+    conn.execute(text("""
+        UPDATE sync_state SET version = MAX(version,
+            COALESCE((SELECT MAX(version) FROM devices), 0),
+            COALESCE((SELECT MAX(version) FROM device_tombstones), 0))
+        WHERE id = 1
+    """))
+
+def backfill_mac_int(conn):
+    """为旧数据补齐 mac_int，并把MAC统一为标准形式
+
+    同一个MAC以不同格式存了多条时，只有第一条获得整数键，其余保持原样。
+    """
+    taken = {row[0] for row in conn.execute(text("SELECT mac_int FROM devices WHERE mac_int IS NOT NULL"))}
+    taken_macs = {row[0] for row in conn.execute(text("SELECT mac FROM devices"))}
+    rows = conn.execute(text("SELECT id, mac FROM devices WHERE mac_int IS NULL ORDER BY id")).fetchall()
+    updated = duplicates = 0
+    for device_id, mac in rows:
+        value = mac_to_int(mac)
+        if value is None:
+            continue
+        if value in taken:
+            duplicates += 1
+            continue
+        canonical = normalize_mac(mac)
+        if canonical != mac and canonical in taken_macs:
+            duplicates += 1
+            continue
+        conn.execute(
+            text("UPDATE devices SET mac = :mac, mac_int = :mac_int WHERE id = :id"),
+            {"mac": canonical, "mac_int": value, "id": device_id},
+        )
+        taken.add(value)
+        taken_macs.add(canonical)
+        updated += 1
+    if updated or duplicates:
+        print(f"mac_int 迁移: 补齐 {updated} 条，重复MAC {duplicates} 条未处理")
+
+def remove_category_placeholders(conn):
+    """删除旧版本为添加类别而创建的 TEMP_<类别> 示例设备
+
+    类别本身保留在 categories 表中，并为删除的设备留下墓碑供增量同步。
+    """
+    placeholder = "mac LIKE 'TEMP\\_%' ESCAPE '\\' AND note LIKE '示例设备用于添加类别:%'"
+    conn.execute(text(f"""
+        INSERT OR IGNORE INTO categories (name, device_count)
+        SELECT DISTINCT category, 0 FROM devices WHERE {placeholder} AND category IS NOT NULL
+    """))
+    macs = [row[0] for row in conn.execute(text(f"SELECT mac FROM devices WHERE {placeholder}"))]
+    if not macs:
+        return
+    version = next_version(conn)
+    for mac in macs:
+        conn.execute(
+            text("INSERT OR REPLACE INTO device_tombstones (mac, version) VALUES (:mac, :version)"),
+            {"mac": mac, "version": version},
+        )
+    conn.execute(text(f"DELETE FROM devices WHERE {placeholder}"))
+    change_broker.publish("bulk", version, created=0, updated=0, deleted=len(macs))
+    print(f"已删除 {len(macs)} 个类别示例设备")
+
+def backfill_classification(conn):
+    """为旧数据补齐分类列，并重算API创建的设备 (没有 import_hash) 的分类
+
+    按设备表中的名称、产品、型号和类别计算；导入的设备由导入时用完整的导出记录更新。
+    """
+    rows = conn.execute(text(
+        f"SELECT id, {', '.join(CLASSIFICATION_INPUT_COLUMNS + CLASSIFICATION_COLUMNS)} FROM devices "
+        "WHERE device_class IS NULL OR import_hash IS NULL"
+    )).mappings().all()
+    updates = []
+    for row in rows:
+        values = classify_row(row)
+        if any(row[column] != value for column, value in values.items()):
+            updates.append({"id": row["id"], **values})
+    if not updates:
+        return
+    conn.execute(
+        text(f"UPDATE devices SET {', '.join(f'{column} = :{column}' for column in CLASSIFICATION_COLUMNS)} WHERE id = :id"),
+        updates,
+    )
+    print(f"设备分类迁移: 更新 {len(updates)} 条")
+
+def rebuild_category_counts(conn):
+    """按设备表全量重算类别计数 (启动时和批量导入后校正)"""
+    conn.execute(text("""
+        INSERT OR IGNORE INTO categories (name, device_count)
+        SELECT DISTINCT category, 0 FROM devices WHERE category IS NOT NULL AND category != ''
+    """))
+    conn.execute(text("""
+        UPDATE categories SET device_count = (
+            SELECT COUNT(*) FROM devices WHERE devices.category = categories.name
+        )
+    """))
+
+def run_migrations(engine):
+    with engine.begin() as conn:
+        init_sync_state(conn)
+        backfill_mac_int(conn)
+        remove_category_placeholders(conn)
+        backfill_classification(conn)
+        rebuild_category_counts(conn)
@@ -1,3 +1,11 @@
-from .device import Device
+from .device import Device, DeviceTombstone, SyncState
+from .category import Category
+from .icon_mirror import IconMirrorEntry
+from .telemetry import DeviceMetricBlock, DeviceMetricSample
+from .device_event import DeviceEvent, DevicePresence
+from .router_snapshot import RouterSnapshot
 
-__all__ = ["Device"]
\ No newline at end of file
+__all__ = [
+    "Device", "DeviceTombstone", "SyncState", "Category", "IconMirrorEntry", "DeviceMetricBlock", "DeviceMetricSample",
+    "DeviceEvent", "DevicePresence", "RouterSnapshot",
+]
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text
+from sqlalchemy import BigInteger, Boolean, Column, Integer, String, DateTime, Text
 from sqlalchemy.sql import func
 from app.database import Base
 
@@ -7,6 +7,8 @@ class Device(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     mac = Column(String, unique=True, index=True, nullable=False)
+    # 48位整数形式的MAC，格式无关的查找和按厂商前缀(OUI)的范围查询都走这个索引
+    mac_int = Column(BigInteger, unique=True, index=True, nullable=True)
     note = Column(String, nullable=True)
     brand = Column(String, nullable=True)  # 品牌 (原brand字段，映射到company)
     category = Column(String, nullable=True)  # 类别 (映射到product)
@@ -20,9 +22,42 @@ class Device(Base):
     product = Column(String, nullable=True)  # 产品类型
     model = Column(String, nullable=True)  # 设备型号
     big_icon_url = Column(String, nullable=True)  # 大图标URL
+    neg480 = Column(String, nullable=True)  # 第三方高清图标 (480)
+    neg168 = Column(String, nullable=True)  # 第三方高清图标 (168)
+    # 导入字段的内容指纹，重复导入时跳过未变化的设备
+    import_hash = Column(String, nullable=True)
+
+    # 设备分类 (app.classification)，导入和写入设备时计算，供 GET /api/devices 按索引过滤
+    is_iot = Column(Boolean, nullable=True, index=True)
+    device_class = Column(String, nullable=True, index=True)  # phone/computer/tv/tablet/iot/unknown
+    classification_reason = Column(String, nullable=True)  # 分类原因
+
+    # 增量同步: 每次写入时分配一个全局递增的版本号
+    version = Column(Integer, nullable=False, server_default="0", default=0, index=True)
     
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
     def __repr__(self):
-        return f"<Device(mac='{self.mac}', note='{self.note}', brand='{self.brand}', category='{self.category}')>"
\ No newline at end of file
+        return f"<Device(mac='{self.mac}', note='{self.note}', brand='{self.brand}', category='{self.category}')>"
+
+class DeviceTombstone(Base):
+    """已删除设备的墓碑记录，供增量同步的客户端感知删除"""
+    __tablename__ = "device_tombstones"
+
+    mac = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, index=True)
+    deleted_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    def __repr__(self):
+        return f"<DeviceTombstone(mac='{self.mac}', version={self.version})>"
+
+class SyncState(Base):
+    """增量同步的版本计数器 (只有 id=1 一行)，写入时在事务中原子递增"""
+    __tablename__ = "sync_state"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, server_default="0", default=0)
+
+    def __repr__(self):
+        return f"<SyncState(version={self.version})>"
@@ -0,0 +1,33 @@
+from sqlalchemy import BigInteger, Column, Index, Integer, SmallInteger, String
+from app.database import Base
+
+class DeviceEvent(Base):
+    """设备事件: 相邻两次快照的差异 (上线/离线/IP/频段/Wi-Fi协议变化) 和路由器记录的事件"""
+    __tablename__ = "device_events"
+    __table_args__ = (
+        # 同一事件重复写入时忽略 (重复导入同一快照、路由器事件在多个快照中重复出现)
+        Index("ux_device_events_key", "mac_int", "ts", "kind", "new_value", unique=True),
+    )
+
+    id = Column(Integer, primary_key=True)
+    ts = Column(Integer, nullable=False, index=True)  # 事件时间 (Unix秒)
+    mac_int = Column(BigInteger, nullable=False)  # 48位整数形式的MAC
+    kind = Column(SmallInteger, nullable=False)  # app.snapshot_diff.EVENT_KINDS 中的序号
+    old_value = Column(String, nullable=False, server_default="", default="")
+    new_value = Column(String, nullable=False, server_default="", default="")
+
+    def __repr__(self):
+        return f"<DeviceEvent(mac_int={self.mac_int}, ts={self.ts}, kind={self.kind}, new_value='{self.new_value}')>"
+
+class DevicePresence(Base):
+    """最近一次快照中在线的设备及其连接状态 (下一次快照与之比较)"""
+    __tablename__ = "device_presence"
+
+    mac_int = Column(BigInteger, primary_key=True)
+    ip = Column(String, nullable=False, server_default="", default="")
+    band = Column(String, nullable=False, server_default="", default="")  # 2.4GHz/5GHz/5G Game/wired
+    wifiprotocol = Column(String, nullable=False, server_default="", default="")
+    generation = Column(Integer, nullable=False, server_default="0", default=0)  # 最近一次在线的导入代号
+
+    def __repr__(self):
+        return f"<DevicePresence(mac_int={self.mac_int}, ip='{self.ip}', band='{self.band}')>"
@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy.sql import func
+from app.database import Base
+
+class IconMirrorEntry(Base):
+    """远程图标的本地镜像记录 (文件在 static/mirror 下，被淘汰后 size 为 0)"""
+    __tablename__ = "icon_mirror"
+
+    name = Column(String, primary_key=True)  # 本地文件名 (由URL哈希得到)
+    url = Column(String, unique=True, nullable=False)  # 原始远程URL
+    etag = Column(String, nullable=True)  # 用于条件请求
+    last_modified = Column(String, nullable=True)
+    size = Column(Integer, nullable=False, server_default="0", default=0)
+    fetched_at = Column(DateTime(timezone=True), nullable=True)
+    last_access = Column(DateTime(timezone=True), server_default=func.now(), index=True)  # LRU淘汰依据
+
+    def __repr__(self):
+        return f"<IconMirrorEntry(name='{self.name}', url='{self.url}', size={self.size})>"
@@ -0,0 +1,22 @@
+from sqlalchemy import Column, DateTime, Integer, String, Text
+from sqlalchemy.sql import func
+from app.database import Base
+
+class RouterSnapshot(Base):
+    """通过 POST /api/snapshots 上传的路由器设备列表，由后台任务按顺序导入"""
+    __tablename__ = "router_snapshots"
+
+    id = Column(Integer, primary_key=True)
+    sha256 = Column(String(64), unique=True, nullable=False)  # 解压后内容的哈希，相同内容只导入一次
+    status = Column(String, nullable=False, server_default="queued", default="queued")  # queued/processing/done/failed
+    size = Column(Integer, nullable=False)  # 解压后的字节数
+    snapshot_ts = Column(Integer, nullable=False)  # 快照时间 (Unix秒，遥测和设备事件使用)
+    processed = Column(Integer, nullable=False, server_default="0", default=0)  # 已处理的设备数
+    stats = Column(Text, nullable=True)  # 导入统计 (JSON)
+    error = Column(Text, nullable=True)
+    received_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    def __repr__(self):
+        return f"<RouterSnapshot(id={self.id}, sha256='{self.sha256[:12]}', status='{self.status}')>"
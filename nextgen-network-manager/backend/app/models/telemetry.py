@@ -0,0 +1,46 @@
+from sqlalchemy import BigInteger, Column, Float, Index, Integer, LargeBinary
+from app.database import Base
+
+class DeviceMetricSample(Base):
+    """尚未打包的遥测样本 (当天导入的快照，每个设备每个快照一行)"""
+    __tablename__ = "device_metric_samples"
+
+    mac_int = Column(BigInteger, primary_key=True)  # 48位整数形式的MAC
+    ts = Column(Integer, primary_key=True, index=True)  # 快照时间 (Unix秒)
+    total_tx = Column(Float, nullable=True)  # 累计发送流量 (totalTX)
+    total_rx = Column(Float, nullable=True)  # 累计接收流量 (totalRX)
+    rx_rate = Column(Float, nullable=True)  # 协商接收速率 Mbps
+    tx_rate = Column(Float, nullable=True)  # 协商发送速率 Mbps
+    signal = Column(Float, nullable=True)  # 信号强度 dBm
+    online_time = Column(Float, nullable=True)  # 在线时长 (秒)
+    wifi_quality = Column(Float, nullable=True)  # Wi-Fi质量等级
+
+    def __repr__(self):
+        return f"<DeviceMetricSample(mac_int={self.mac_int}, ts={self.ts})>"
+
+class DeviceMetricBlock(Base):
+    """一个设备在一个时间窗口内的列式遥测数据块
+
+    timestamps 和每个指标列都是 array 序列化的 BLOB (时间戳为 int64，指标为 float64，缺失值为 NaN)。
+    resolution 为 0 时是原始样本，否则是按该秒数降采样后的点。
+    """
+    __tablename__ = "device_metric_blocks"
+    # 降采样时按层级和窗口起点查找旧数据块
+    __table_args__ = (Index("ix_device_metric_blocks_resolution_start", "resolution", "start_ts"),)
+
+    mac_int = Column(BigInteger, primary_key=True)
+    resolution = Column(Integer, primary_key=True)
+    start_ts = Column(Integer, primary_key=True)  # 窗口起点 (按窗口跨度对齐)
+    end_ts = Column(Integer, nullable=False)  # 块内最后一个点的时间
+    count = Column(Integer, nullable=False)
+    timestamps = Column(LargeBinary, nullable=False)
+    total_tx = Column(LargeBinary, nullable=False)
+    total_rx = Column(LargeBinary, nullable=False)
+    rx_rate = Column(LargeBinary, nullable=False)
+    tx_rate = Column(LargeBinary, nullable=False)
+    signal = Column(LargeBinary, nullable=False)
+    online_time = Column(LargeBinary, nullable=False)
+    wifi_quality = Column(LargeBinary, nullable=False)
+
+    def __repr__(self):
+        return f"<DeviceMetricBlock(mac_int={self.mac_int}, resolution={self.resolution}, start_ts={self.start_ts}, count={self.count})>"
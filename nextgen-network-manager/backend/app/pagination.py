@@ -0,0 +1,63 @@
+"""
+设备列表的游标 (keyset) 分页
+
+按主键 id 排序，游标记录上一页最后一条的 id，下一页用 id > :last_id
+走主键索引定位，每页耗时与翻页深度无关；翻页过程中插入的新记录
+只会出现在末尾，不会导致重复或遗漏。
+"""
+
+import base64
+import binascii
+import json
+from typing import Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app import models
+
+def encode_cursor(last_id: int) -> str:
+    payload = json.dumps({"id": last_id}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> int:
+    """解析游标，空字符串表示第一页；格式错误时抛出 ValueError"""
+    if not cursor:
+        return 0
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        last_id = json.loads(base64.urlsafe_b64decode(padded))["id"]
+    except (binascii.Error, ValueError, KeyError, TypeError) as e:
+        raise ValueError("无效的分页游标") from e
+    if not isinstance(last_id, int):
+        raise ValueError("无效的分页游标")
+    return last_id
+
+def keyset_page(db: Session, cursor: str, limit: int, filters=(), columns=None):
+    """返回 (本页设备, 下一页游标)，没有下一页时游标为 None
+
+    指定 columns 时只查询这些列，返回的行末尾附带一列 cursor_id。
+    """
+    last_id = decode_cursor(cursor)
+    if columns is None:
+        query = db.query(models.Device)
+    else:
+        query = db.query(*columns, models.Device.id.label("cursor_id"))
+    rows = (
+        query
+        .filter(*filters)
+        .filter(models.Device.id > last_id)
+        .order_by(models.Device.id)
+        .limit(limit + 1)
+        .all()
+    )
+    next_cursor: Optional[str] = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(last.id if columns is None else last.cursor_id)
+    return rows, next_cursor
+
+def estimate_total(db: Session) -> int:
+    """设备总数的估计值: 取最大主键 (走索引)，删除过的记录会使其略偏大"""
+    return db.query(func.max(models.Device.id)).scalar() or 0
@@ -0,0 +1,30 @@
+"""
+设备字段投影 (fields=mac,note,name,icon_url)
+
+只在SQL中选择需要的列，结果行直接转换为 dict，不创建ORM对象，
+也不经过 Pydantic 校验；不指定 fields 时返回 schemas.Device 的全部字段。
+"""
+
+from typing import List, Optional
+
+from app import models, schemas
+
+DEVICE_FIELDS = list(schemas.Device.model_fields)
+
+def parse_fields(fields: Optional[str]) -> List[str]:
+    """解析逗号分隔的字段列表，mac 总是包含在内；有未知字段时抛出 ValueError"""
+    if not fields:
+        return DEVICE_FIELDS
+    names = list(dict.fromkeys(["mac"] + [name.strip() for name in fields.split(",") if name.strip()]))
+    unknown = [name for name in names if name not in DEVICE_FIELDS]
+    if unknown:
+        raise ValueError(f"未知字段: {', '.join(unknown)}")
+    return names
+
+def device_columns(names: List[str]):
+    table = models.Device.__table__
+    return [table.c[name] for name in names]
+
+def project_rows(rows, names: List[str]) -> List[dict]:
+    """把按 device_columns(names) 顺序查询的行转换为 dict (行末多出的列会被忽略)"""
+    return [dict(zip(names, row)) for row in rows]
@@ -0,0 +1,28 @@
+"""
+快速JSON响应
+
+列表接口直接返回由数据库行构造的 dict，用 orjson 序列化 (比标准库 json 快一个数量级)，
+并绕过 response_model 的逐条校验。未安装 orjson 时退回标准库 json。
+"""
+
+import json
+from datetime import date, datetime
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # orjson 是可选依赖
+    orjson = None
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"无法序列化 {type(value).__name__}")
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+        return json.dumps(content, ensure_ascii=False, separators=(",", ":"), default=_default).encode("utf-8")
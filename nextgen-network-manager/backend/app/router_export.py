@@ -0,0 +1,120 @@
+"""
+路由器设备导出文件 (devices.json) 的流式解析
+
+导出文件形如 {"code": 0, ..., "devices": [{...}, {...}, ...]}，每个设备带有
+events、miotData、速率计数等字段，整体 json.load 时内存随文件大小增长。
+iter_devices 按块读取文件，逐个解析 devices 数组中的元素，
+内存占用只与单个设备记录的大小有关。
+"""
+
+import json
+from typing import IO, Iterator
+
+CHUNK_SIZE = 256 * 1024
+# 单个JSON值 (一个设备记录或一个顶层字段) 的长度上限，超过时按格式错误处理，不再继续读入
+MAX_VALUE_SIZE = 16 * 1024 * 1024
+# 解析错误的位置离缓冲区末尾不超过这个距离时，可能只是值被块边界截断 (如 "tru"、"\u00")
+_TRUNCATION_MARGIN = 16
+_WHITESPACE = " \t\r\n"
+_NUMBER_CHARS = "0123456789.eE+-"
+
+class _Reader:
+    """按块读取文本的缓冲区，丢弃已解析的部分"""
+
+    def __init__(self, fp: IO[str], chunk_size: int):
+        self.fp = fp
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        """读入下一块，文件已读完时返回 False"""
+        if self.eof:
+            return False
+        chunk = self.fp.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """跳过空白，返回下一个字符 (文件结束时返回空字符串)"""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer) or not self.fill():
+                return self.buffer[self.pos:self.pos + 1]
+
+    def expect(self, char: str):
+        if self.peek() != char:
+            raise ValueError(f"devices.json 格式错误: 位置 {self.pos} 处应为 {char!r}")
+        self.pos += 1
+
+    def _maybe_truncated(self, error: json.JSONDecodeError) -> bool:
+        """解析错误是否可能只是因为值还没有完整读入缓冲区"""
+        if len(self.buffer) - self.pos > MAX_VALUE_SIZE:
+            return False
+        # 未结束的字符串报告的是字符串开始的位置，其余错误都在截断处附近
+        return error.msg.startswith("Unterminated string") or error.pos >= len(self.buffer) - _TRUNCATION_MARGIN
+
+    def value(self, decoder: json.JSONDecoder):
+        """解析下一个完整的JSON值，缓冲区中不完整时继续读入"""
+        self.peek()
+        while True:
+            try:
+                value, end = decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError as e:
+                # 格式错误时立即抛出，只有可能被截断时才读入更多内容
+                if not self._maybe_truncated(e) or not self.fill():
+                    raise
+                continue
+            # 数字可能被块边界截断 (如 "12" + "34"、"2." + "5")，读入更多内容后重新解析
+            if (
+                isinstance(value, (int, float))
+                and (end == len(self.buffer) or self.buffer[end] in _NUMBER_CHARS)
+                and self.fill()
+            ):
+                continue
+            self.pos = end
+            return value
+
+def iter_devices(fp: IO[str], chunk_size: int = CHUNK_SIZE) -> Iterator[dict]:
+    """逐个返回导出文件中 devices 数组的元素 (也接受顶层直接是设备数组的文件)"""
+    reader = _Reader(fp, chunk_size)
+    decoder = json.JSONDecoder()
+
+    if reader.peek() == "[":
+        yield from _iter_array(reader, decoder)
+        return
+
+    reader.expect("{")
+    if reader.peek() == "}":
+        return
+    while True:
+        key = reader.value(decoder)
+        reader.expect(":")
+        if key == "devices" and reader.peek() == "[":
+            yield from _iter_array(reader, decoder)
+        else:
+            reader.value(decoder)  # 跳过其他顶层字段
+        if reader.peek() == ",":
+            reader.pos += 1
+            continue
+        reader.expect("}")
+        return
+
+def _iter_array(reader: _Reader, decoder: json.JSONDecoder) -> Iterator[dict]:
+    reader.expect("[")
+    if reader.peek() == "]":
+        reader.pos += 1
+        return
+    while True:
+        yield reader.value(decoder)
+        if reader.peek() == ",":
+            reader.pos += 1
+            continue
+        reader.expect("]")
+        return
@@ -1,3 +1,13 @@
-from .device import DeviceBase, DeviceCreate, DeviceUpdate, Device
+from .device import (
+    DeviceBase, DeviceCreate, DeviceUpdate, Device, DeviceLookup,
+    DeviceBulkItem, DeviceBulkResult, DevicePage, DeviceChanges,
+)
+from .category import Category
+from .device_event import DeviceEvent
+from .router_snapshot import RouterSnapshot
 
-__all__ = ["DeviceBase", "DeviceCreate", "DeviceUpdate", "Device"]
\ No newline at end of file
+__all__ = [
+    "DeviceBase", "DeviceCreate", "DeviceUpdate", "Device", "DeviceLookup",
+    "DeviceBulkItem", "DeviceBulkResult", "DevicePage", "DeviceChanges",
+    "Category", "DeviceEvent", "RouterSnapshot",
+]
\ No newline at end of file
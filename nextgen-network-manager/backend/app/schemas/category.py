@@ -0,0 +1,8 @@
+from pydantic import BaseModel
+
+class Category(BaseModel):
+    name: str
+    device_count: int
+
+    class Config:
+        from_attributes = True
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import List, Optional
 from datetime import datetime
 
 class DeviceBase(BaseModel):
@@ -39,8 +39,40 @@ class DeviceUpdate(BaseModel):
 
 class Device(DeviceBase):
     id: int
+    # 分类列由服务端计算，不能通过写入接口指定
+    is_iot: Optional[bool] = None
+    device_class: Optional[str] = None
+    classification_reason: Optional[str] = None
+    version: int = 0
     created_at: datetime
     updated_at: datetime
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class DeviceLookup(BaseModel):
+    """批量查询请求: MAC地址大小写和分隔符不限"""
+    macs: List[str] = Field(..., max_length=1000)
+
+class DeviceBulkItem(BaseModel):
+    """批量写入中单条记录的结果: created / updated / duplicate / invalid"""
+    mac: str
+    status: str
+
+class DeviceBulkResult(BaseModel):
+    version: int
+    created: int
+    updated: int
+    results: List[DeviceBulkItem]
+
+class DevicePage(BaseModel):
+    """游标分页结果，next_cursor 为空表示已经是最后一页"""
+    items: List[Device]
+    next_cursor: Optional[str] = None
+    total_estimate: Optional[int] = None
+
+class DeviceChanges(BaseModel):
+    """增量同步结果: 自 since 版本之后新增/修改的设备以及被删除设备的MAC"""
+    version: int
+    devices: List[Device]
+    deleted: List[str]
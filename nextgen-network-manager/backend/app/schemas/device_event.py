@@ -0,0 +1,11 @@
+from pydantic import BaseModel
+from typing import Optional
+
+class DeviceEvent(BaseModel):
+    """设备事件: kind 为 join / leave / ip / band / wifiprotocol / router"""
+    id: int
+    ts: int
+    mac: str
+    kind: str
+    old_value: Optional[str] = None
+    new_value: Optional[str] = None
@@ -0,0 +1,23 @@
+from datetime import datetime
+from pydantic import BaseModel
+from typing import Optional
+
+class RouterSnapshot(BaseModel):
+    """上传的路由器快照: status 为 queued / processing / done / failed
+
+    progress 为 0~1 (导入中时按已读取的字节估算)；stats 为导入统计，
+    duplicate 仅在上传接口中表示相同内容已上传过。
+    """
+    id: int
+    sha256: str
+    status: str
+    size: int
+    snapshot_ts: int
+    processed: int
+    progress: float
+    stats: Optional[dict] = None
+    error: Optional[str] = None
+    received_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    duplicate: bool = False
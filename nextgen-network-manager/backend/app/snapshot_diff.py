@@ -0,0 +1,229 @@
+"""
+快照差异引擎: 比较相邻两次路由器导出，得到设备的上线/离线和IP、频段、Wi-Fi协议变化
+
+每个快照先归约为 {整数MAC: (IP, 频段, Wi-Fi协议)} (只包含在线设备)，
+上线/离线是两个MAC集合的差集，IP/频段/协议变化只比较交集中状态不同的设备，整体 O(n)。
+结果保存为紧凑的事件记录 (时间、整数MAC、类型序号、旧值、新值)。
+
+导出中每个设备自带的 events 数组 (如 "5GHz接入"、"离线") 以其 originatedTime
+为事件时间一并写入，同一事件在多个快照中重复出现时只保留一条。
+
+导入时与数据库中上一次快照的状态 (device_presence) 比较，快照需按时间顺序导入；
+第一次导入只记录基线，不产生上线事件。比较随导入按块进行 (PresenceWriter):
+每块只按MAC读出这些设备的上一次状态，在线的设备写入本次导入的代号 (generation)，
+导入结束时代号不是本次的设备即为离线，内存占用与设备数无关。
+"""
+
+from collections import Counter, deque
+from typing import Iterable, List, NamedTuple, Optional
+
+from sqlalchemy import bindparam, text
+
+from app.mac import mac_to_int
+
+EVENT_KINDS = ('join', 'leave', 'ip', 'band', 'wifiprotocol', 'router')
+JOIN, LEAVE, IP, BAND, WIFI_PROTOCOL, ROUTER = range(len(EVENT_KINDS))
+# 导出记录中 connectionType 的含义 (对应路由器事件 "2.4GHz接入"、"5GHz接入"、"有线接入"、"5G Game接入")
+BANDS = {1: '2.4GHz', 2: '5GHz', 4: 'wired', 6: '5G Game'}
+# 每次 executemany 写入的行数
+EVENT_CHUNK_SIZE = 500
+
+class DeviceState(NamedTuple):
+    ip: str
+    band: str
+    wifiprotocol: str
+
+# 状态中的字段 -> 变化时的事件类型
+STATE_EVENTS = tuple(zip(DeviceState._fields, (IP, BAND, WIFI_PROTOCOL)))
+
+class DeviceEvent(NamedTuple):
+    ts: int
+    mac_int: int
+    kind: int
+    old_value: str = ''
+    new_value: str = ''
+
+def device_state(device_info: dict) -> Optional[DeviceState]:
+    """导出记录中设备的连接状态，设备离线 (online 为 0) 时为 None"""
+    if device_info.get('online', 1) == 0:
+        return None
+    connection = device_info.get('connectionType')
+    band = BANDS.get(connection, '' if connection is None else str(connection))
+    return DeviceState(device_info.get('ip') or '', band, device_info.get('wifiprotocol') or '')
+
+def router_events(mac_int: int, device_info: dict) -> List[DeviceEvent]:
+    """导出记录自带的路由器事件"""
+    events = device_info.get('events')
+    if not isinstance(events, list):
+        return []
+    return [
+        DeviceEvent(event['originatedTime'], mac_int, ROUTER, '', str(event['text']))
+        for event in events
+        if isinstance(event, dict) and isinstance(event.get('originatedTime'), int) and event.get('text')
+    ]
+
+class Snapshot:
+    """归约后的快照: 在线设备的连接状态和路由器事件，可以在流式解析时逐个添加设备"""
+
+    def __init__(self):
+        self.states = {}
+        self.router_events = {}  # 用 dict 去重并保持顺序
+
+    def add(self, device_info: dict):
+        mac_int = mac_to_int(device_info.get('mac'))
+        if mac_int is None:
+            return
+        state = device_state(device_info)
+        if state is not None:
+            self.states.setdefault(mac_int, state)
+        for event in router_events(mac_int, device_info):
+            self.router_events[event] = None
+
+    @classmethod
+    def from_devices(cls, devices: Iterable[dict]) -> 'Snapshot':
+        snapshot = cls()
+        for device_info in devices:
+            snapshot.add(device_info)
+        return snapshot
+
+def diff_states(previous: dict, current: dict, ts: int) -> List[DeviceEvent]:
+    """比较两个快照的 {整数MAC: DeviceState}，返回按MAC排序的事件"""
+    events = [DeviceEvent(ts, mac_int, JOIN, '', current[mac_int].ip) for mac_int in current.keys() - previous.keys()]
+    events += [DeviceEvent(ts, mac_int, LEAVE, previous[mac_int].ip, '') for mac_int in previous.keys() - current.keys()]
+    for mac_int in current.keys() & previous.keys():
+        old, new = previous[mac_int], current[mac_int]
+        if old == new:
+            continue
+        for field, kind in STATE_EVENTS:
+            if getattr(old, field) != getattr(new, field):
+                events.append(DeviceEvent(ts, mac_int, kind, getattr(old, field), getattr(new, field)))
+    events.sort(key=lambda event: (event.mac_int, event.kind))
+    return events
+
+def new_router_events(previous: Snapshot, current: Snapshot) -> List[DeviceEvent]:
+    """current 中有而 previous 中没有的路由器事件"""
+    return [event for event in current.router_events if event not in previous.router_events]
+
+def diff_snapshots(previous: Snapshot, current: Snapshot, ts: int) -> List[DeviceEvent]:
+    """两个快照之间的全部事件: 状态差异 (时间为 ts) 加上新出现的路由器事件"""
+    return diff_states(previous.states, current.states, ts) + new_router_events(previous, current)
+
+_INSERT_EVENT = text(
+    "INSERT OR IGNORE INTO device_events (ts, mac_int, kind, old_value, new_value) "
+    "VALUES (:ts, :mac_int, :kind, :old_value, :new_value)"
+)
+
+def _execute_chunks(conn, statement, rows: list) -> int:
+    written = 0
+    for i in range(0, len(rows), EVENT_CHUNK_SIZE):
+        written += conn.execute(statement, rows[i:i + EVENT_CHUNK_SIZE]).rowcount
+    return written
+
+_SELECT_PRESENCE = text(
+    "SELECT mac_int, ip, band, wifiprotocol, generation FROM device_presence WHERE mac_int IN :macs"
+).bindparams(bindparam('macs', expanding=True))
+_REPLACE_PRESENCE = text(
+    "INSERT OR REPLACE INTO device_presence (mac_int, ip, band, wifiprotocol, generation) "
+    "VALUES (:mac_int, :ip, :band, :wifiprotocol, :generation)"
+)
+_MARK_PRESENCE = text(
+    "UPDATE device_presence SET generation = :generation WHERE mac_int IN :macs"
+).bindparams(bindparam('macs', expanding=True))
+
+class PresenceWriter:
+    """导入时边解析边与上一次快照比较并写入事件，内存中只保留尚未比较的设备
+
+    add 在解析设备时调用 (import_devices 使用进程池时在解析线程中)，
+    flush 在写入设备的线程中每块调用一次，finish 写入离线事件并返回各类型新写入的事件数。
+    同一快照中重复的MAC按第一次出现的状态比较。conn 为调用方事务中的连接。
+    """
+
+    def __init__(self, conn, ts: int):
+        self.conn = conn
+        self.ts = ts
+        self.stats = Counter({kind: 0 for kind in EVENT_KINDS})
+        count, generation = conn.execute(text(
+            "SELECT COUNT(*), COALESCE(MAX(generation), 0) FROM device_presence"
+        )).one()
+        self.baseline = not count
+        self.generation = generation + 1
+        # 两个线程之间只用 append / popleft
+        self._states = deque()
+        self._events = deque()
+
+    def add(self, device_info: dict):
+        mac_int = mac_to_int(device_info.get('mac'))
+        if mac_int is None:
+            return
+        state = device_state(device_info)
+        if state is not None:
+            self._states.append((mac_int, state))
+        self._events.extend(router_events(mac_int, device_info))
+
+    def add_state(self, mac_int: int, state: DeviceState):
+        self._states.append((mac_int, state))
+
+    def add_events(self, events: Iterable[DeviceEvent]):
+        self._events.extend(events)
+
+    def flush(self):
+        states = {}
+        for _ in range(len(self._states)):
+            mac_int, state = self._states.popleft()
+            states.setdefault(mac_int, state)
+        macs = list(states)
+        for i in range(0, len(macs), EVENT_CHUNK_SIZE):
+            self._compare({mac_int: states[mac_int] for mac_int in macs[i:i + EVENT_CHUNK_SIZE]})
+        # 用 dict 去重并保持顺序，跨块的重复由唯一索引忽略
+        events = dict.fromkeys(self._events.popleft() for _ in range(len(self._events)))
+        self.stats['router'] += _execute_chunks(self.conn, _INSERT_EVENT, [event._asdict() for event in events])
+
+    def _compare(self, current: dict):
+        previous = {}
+        for mac_int, ip, band, wifiprotocol, generation in self.conn.execute(_SELECT_PRESENCE, {'macs': list(current)}):
+            if generation == self.generation:
+                del current[mac_int]  # 本次快照中已经比较过
+            else:
+                previous[mac_int] = DeviceState(ip, band, wifiprotocol)
+        # previous 是 current 的子集，这里只有上线和状态变化
+        events = diff_states(previous, current, self.ts) if not self.baseline else []
+        for kind in (JOIN, IP, BAND, WIFI_PROTOCOL):
+            self.stats[EVENT_KINDS[kind]] += _execute_chunks(
+                self.conn, _INSERT_EVENT, [event._asdict() for event in events if event.kind == kind],
+            )
+        # 有变化的设备整行改写，没有变化的只更新代号
+        _execute_chunks(self.conn, _REPLACE_PRESENCE, [
+            {'mac_int': mac_int, **state._asdict(), 'generation': self.generation}
+            for mac_int, state in current.items() if previous.get(mac_int) != state
+        ])
+        unchanged = [mac_int for mac_int, state in current.items() if previous.get(mac_int) == state]
+        if unchanged:
+            self.conn.execute(_MARK_PRESENCE, {'generation': self.generation, 'macs': unchanged})
+
+    def finish(self) -> Counter:
+        self.flush()
+        # 本次快照中没有在线的设备
+        params = {'generation': self.generation}
+        result = self.conn.execute(
+            text("SELECT mac_int, ip FROM device_presence WHERE generation != :generation"), params,
+        )
+        while True:
+            rows = result.fetchmany(EVENT_CHUNK_SIZE)
+            if not rows:
+                break
+            self.stats['leave'] += self.conn.execute(_INSERT_EVENT, [
+                DeviceEvent(self.ts, mac_int, LEAVE, ip, '')._asdict() for mac_int, ip in rows
+            ]).rowcount
+        self.conn.execute(text("DELETE FROM device_presence WHERE generation != :generation"), params)
+        return self.stats
+
+def apply_snapshot(conn, snapshot: Snapshot, ts: int) -> Counter:
+    """与上一次快照比较并写入事件，然后把 snapshot 保存为新的上一次快照
+
+    返回各类型新写入的事件数。conn 为调用方事务中的连接。
+    """
+    writer = PresenceWriter(conn, ts)
+    for mac_int, state in snapshot.states.items():
+        writer.add_state(mac_int, state)
+    writer.add_events(snapshot.router_events)
+    return writer.finish()
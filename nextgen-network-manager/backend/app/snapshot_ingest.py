@@ -0,0 +1,284 @@
+"""
+路由器快照的上传与后台导入 (POST /api/snapshots)
+
+请求体是路由器设备列表接口原样返回的JSON，可以用 Content-Encoding: gzip 压缩上传：
+- 接收时边解压边计算 SHA-256，解压后超过大小上限立即中止 (也用于防止压缩炸弹)；
+- 内容以 gzip 压缩保存为 snapshots/<哈希>.json.gz，相同内容 (按解压后的哈希) 只导入一次；
+- 导入由唯一的后台线程按上传顺序进行，与 import_devices.py 相同：写入设备表、
+  重算类别计数、追加遥测样本、与上一次快照比较生成设备事件；每块设备 (连同其遥测样本和
+  设备事件) 单独提交，只在写入时持有数据库写锁，解析大快照期间API的写入不用等待；
+- 进度 (已解析的设备数和字节比例) 保存在内存中，状态、统计和错误保存在 router_snapshots 表，
+  服务重启后未完成的快照重新排队 (导入是幂等的，重复导入不会产生重复数据)。
+
+导入成功后删除保存的文件，失败的保留以便排查，再次上传相同内容时重新导入。
+"""
+
+import asyncio
+import functools
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from sqlalchemy.exc import IntegrityError
+
+from app import models, sync
+from app.cache import device_cache
+from app.database import SessionLocal
+from app.events import change_broker
+from app.importer import import_devices
+from app.migrations import rebuild_category_counts
+from app.router_export import iter_devices
+from app.snapshot_diff import PresenceWriter
+from app.telemetry import SampleWriter
+
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", "app/snapshots")
+# 解压后的大小上限
+MAX_SNAPSHOT_SIZE = int(os.getenv("MAX_SNAPSHOT_SIZE", str(64 * 1024 * 1024)))
+SNAPSHOT_COMPRESS_LEVEL = 6
+SNAPSHOT_STATUSES = ("queued", "processing", "done", "failed")
+_GZIP_ENCODINGS = ("gzip", "x-gzip")
+_WHITESPACE = b" \t\r\n"
+
+class SnapshotTooLarge(Exception):
+    pass
+
+def snapshot_path(sha256: str, directory=SNAPSHOT_DIR) -> str:
+    return os.path.join(directory, f"{sha256}.json.gz")
+
+def _now():
+    return datetime.now(timezone.utc)
+
+class SnapshotWriter:
+    """边接收边解压、计算哈希并压缩写入临时文件
+
+    write / finish / commit / abort 都是阻塞调用，需在线程池中执行；
+    内容不是gzip或JSON、gzip数据不完整时抛出 ValueError。
+    """
+
+    def __init__(self, content_encoding=None, directory=SNAPSHOT_DIR, max_size=MAX_SNAPSHOT_SIZE):
+        encoding = (content_encoding or "identity").strip().lower()
+        if encoding not in ("identity",) + _GZIP_ENCODINGS:
+            raise ValueError(f"不支持的 Content-Encoding: {content_encoding}")
+        self.directory = directory
+        self.max_size = max_size
+        self.size = 0
+        self._decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS) if encoding in _GZIP_ENCODINGS else None
+        self._digest = hashlib.sha256()
+        self._started = False  # 是否已确认内容以 { 或 [ 开头
+        os.makedirs(directory, exist_ok=True)
+        fd, self._temp_path = tempfile.mkstemp(dir=directory, prefix=".snapshot-")
+        self._raw = os.fdopen(fd, "wb")
+        self._file = gzip.GzipFile(fileobj=self._raw, mode="wb", compresslevel=SNAPSHOT_COMPRESS_LEVEL)
+
+    def write(self, chunk: bytes):
+        if self._decompressor is not None:
+            if self._decompressor.eof and chunk:
+                raise ValueError("gzip 数据之后还有多余的内容")
+            # 单次解压的输出不超过剩余额度 + 1，超出即可判定过大
+            try:
+                chunk = self._decompressor.decompress(chunk, self.max_size - self.size + 1)
+            except zlib.error:
+                raise ValueError("请求体不是有效的 gzip 数据")
+        self._append(chunk)
+
+    def _append(self, data: bytes):
+        if not data:
+            return
+        self.size += len(data)
+        if self.size > self.max_size:
+            raise SnapshotTooLarge(f"快照解压后不能超过 {self.max_size // (1024 * 1024)} MB")
+        if not self._started:
+            head = data.lstrip(_WHITESPACE)
+            if head:
+                if head[:1] not in (b"{", b"["):
+                    raise ValueError("快照必须是路由器返回的JSON")
+                self._started = True
+        self._digest.update(data)
+        self._file.write(data)
+
+    def finish(self):
+        """结束接收，返回 (解压后内容的SHA-256, 解压后的字节数)"""
+        if self._decompressor is not None:
+            self._append(self._decompressor.flush())
+            if not self._decompressor.eof:
+                raise ValueError("gzip 数据不完整")
+        if not self._started:
+            raise ValueError("快照内容为空")
+        self._close()
+        return self._digest.hexdigest(), self.size
+
+    def commit(self, sha256: str):
+        """保存为 snapshots/<哈希>.json.gz"""
+        os.replace(self._temp_path, snapshot_path(sha256, self.directory))
+
+    def abort(self):
+        self._close()
+        if os.path.exists(self._temp_path):
+            os.unlink(self._temp_path)
+
+    def _close(self):
+        if not self._raw.closed:
+            self._file.close()
+            self._raw.close()
+
+def register_snapshot(db, sha256: str, size: int):
+    """登记上传的快照，返回 (记录, 是否需要导入)
+
+    新内容登记为 queued；导入失败过的相同内容重新排队；其他状态视为重复上传。
+    相同内容同时上传时只有一个请求能登记 (sha256 唯一)，其余的按重复上传返回已登记的记录。
+    快照时间取收到的时间。
+    """
+    query = db.query(models.RouterSnapshot).filter(models.RouterSnapshot.sha256 == sha256)
+    snapshot = query.first()
+    if snapshot is None:
+        snapshot = models.RouterSnapshot(sha256=sha256, size=size, status="queued", snapshot_ts=int(time.time()))
+        db.add(snapshot)
+    elif snapshot.status == "failed":
+        snapshot.status = "queued"
+        snapshot.snapshot_ts = int(time.time())
+        snapshot.processed = 0
+        snapshot.stats = snapshot.error = snapshot.started_at = snapshot.finished_at = None
+    else:
+        return snapshot, False
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        return query.one(), False
+    db.refresh(snapshot)
+    return snapshot, True
+
+class SnapshotWorker:
+    """按上传顺序逐个导入快照的后台线程 (schedule 需在事件循环线程中调用)"""
+
+    def __init__(self, directory=SNAPSHOT_DIR, session_factory=SessionLocal):
+        self.directory = directory
+        self.session_factory = session_factory
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="snapshots")
+        self._pending = set()
+        self._progress = {}  # 快照ID -> (已解析的设备数, 已读取的字节比例)
+        self._loop = None
+
+    def schedule(self, snapshot_id: int):
+        """排队导入一个快照，同一快照不会重复排队；每提交一块有写入的设备就使设备缓存失效并推送 bulk 事件"""
+        if snapshot_id in self._pending:
+            return
+        self._pending.add(snapshot_id)
+        self._loop = asyncio.get_running_loop()
+        future = self._loop.run_in_executor(self._executor, self.process, snapshot_id)
+        future.add_done_callback(lambda f: self._pending.discard(snapshot_id))
+
+    def _publish(self, version: int, created: int, updated: int):
+        """推送一块已提交的设备变更 (在导入线程中调用，事件在事件循环线程中发布)"""
+        device_cache.invalidate()
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(
+                functools.partial(change_broker.publish, "bulk", version, created=created, updated=updated)
+            )
+
+    def progress(self, snapshot_id: int):
+        """正在导入的快照的 (已解析的设备数, 字节比例)，不在导入中时为 None"""
+        return self._progress.get(snapshot_id)
+
+    def pending_ids(self):
+        """数据库中等待导入或导入被中断 (服务重启) 的快照ID"""
+        db = self.session_factory()
+        try:
+            rows = (
+                db.query(models.RouterSnapshot.id)
+                .filter(models.RouterSnapshot.status.in_(("queued", "processing")))
+                .order_by(models.RouterSnapshot.id)
+            )
+            return [row.id for row in rows]
+        finally:
+            db.close()
+
+    def shutdown(self):
+        """不再开始新的导入 (未完成的在下次启动时重新排队)"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def process(self, snapshot_id: int):
+        """导入一个快照，返回导入统计；快照不存在、已完成或导入失败时返回 None"""
+        db = self.session_factory()
+        try:
+            snapshot = db.get(models.RouterSnapshot, snapshot_id)
+            if snapshot is None or snapshot.status not in ("queued", "processing"):
+                return None
+            snapshot.status = "processing"
+            snapshot.started_at = _now()
+            db.commit()
+            path = snapshot_path(snapshot.sha256, self.directory)
+            try:
+                result = self._import(db.get_bind(), snapshot_id, path, snapshot.size, snapshot.snapshot_ts)
+            except Exception as e:
+                db.rollback()
+                snapshot = db.get(models.RouterSnapshot, snapshot_id)
+                snapshot.status = "failed"
+                snapshot.error = str(e) or type(e).__name__
+                snapshot.finished_at = _now()
+                db.commit()
+                return None
+
+            snapshot.status = "done"
+            snapshot.processed = result["processed"]
+            snapshot.stats = json.dumps(result)
+            snapshot.finished_at = _now()
+            db.commit()
+            os.unlink(path)
+            return result
+        finally:
+            self._progress.pop(snapshot_id, None)
+            db.close()
+
+    def _import(self, engine, snapshot_id: int, path: str, size: int, ts: int) -> dict:
+        """与 import_devices.py 相同的导入流程，但每块设备单独提交
+
+        版本号在有写入的块写入前分配，提交后推送该块的 bulk 事件；
+        中途失败时已提交的块保留，再次导入时 (幂等) 补齐。
+        """
+        with engine.connect() as conn:
+            samples = SampleWriter(conn, ts)
+            presence = PresenceWriter(conn, ts)
+            versions = []
+            published = {"new": 0, "changed": 0}
+
+            def chunk_version():
+                versions.append(sync.next_version(conn))
+                return versions[-1]
+
+            def commit_chunk(stats):
+                samples.flush()
+                presence.flush()
+                conn.commit()
+                if versions:
+                    self._publish(
+                        versions.pop(), stats["new"] - published["new"], stats["changed"] - published["changed"],
+                    )
+                    published.update(new=stats["new"], changed=stats["changed"])
+
+            with gzip.open(path, "rt", encoding="utf-8") as fp:
+                def collect(devices):
+                    for count, device_info in enumerate(devices, 1):
+                        samples.add(device_info)
+                        presence.add(device_info)
+                        self._progress[snapshot_id] = (count, fp.buffer.tell() / size if size else 0.0)
+                        yield device_info
+
+                stats, _ = import_devices(conn, collect(iter_devices(fp)), chunk_version, on_chunk=commit_chunk)
+            # 没有设备的快照多半是路由器返回的错误 (如登录过期)，导入会把所有设备记为离线
+            if not stats["processed"]:
+                raise ValueError("快照中没有设备")
+            if stats["new"] or stats["changed"]:
+                rebuild_category_counts(conn)
+            samples_written = samples.finish()
+            events = presence.finish()
+            conn.commit()
+        return {**stats, "samples": samples_written, "events": dict(events)}
+
+snapshot_worker = SnapshotWorker()
@@ -0,0 +1,209 @@
+"""
+静态文件服务
+
+按内容寻址的文件 (如上传的图标 "<哈希>.png" 及其缩略图) 内容永不改变：
+返回一年的 immutable 缓存头，并以文件名 (包含内容哈希) 作为强ETag。
+Vite 构建产物 assets/*-<hash>.js 等同样返回 immutable 缓存头；HTML 入口页返回 no-cache，按 ETag 重新验证。
+
+JS/CSS/HTML 等文本文件在构建时 (python -m app.static_files) 预先生成 .br / .gz 压缩副本，
+客户端接受时直接返回压缩副本，不在请求时压缩；没有压缩副本或已过期时返回原文件。
+Range 请求始终返回原文件；文件发送由 FileResponse 完成，ASGI服务器支持
+http.response.pathsend 扩展时走零拷贝 sendfile。
+
+uploads 下的图标支持 ?s=48 参数，按 Accept 请求头返回对应尺寸的 WebP / AVIF 缩略图 (两者都接受时取较小的)；
+缩略图尚未生成时先返回原图 (不允许缓存) 并在后台生成。
+
+镜像的远程图标由 MirrorStaticFiles 提供，本地文件已被淘汰时重新下载，失败则重定向到原始URL。
+"""
+
+import argparse
+import gzip
+import mimetypes
+import os
+import re
+import stat
+import tempfile
+import time
+
+import anyio
+from starlette.datastructures import Headers, QueryParams
+from starlette.exceptions import HTTPException
+from starlette.responses import FileResponse, RedirectResponse
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+
+from app.compression import accepts, brotli, parse_accept_encoding
+from app.thumbnails import accepted_formats, pick_size, schedule_thumbnails, thumbnail_name
+from app.uploads import content_hash
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+MIRROR_CACHE_CONTROL = "public, max-age=86400"
+HTML_CACHE_CONTROL = "no-cache"
+# 支持 ?s= 缩略图的目录 (相对于挂载目录)
+THUMBNAIL_DIRS = ("uploads/",)
+
+# Vite 构建产物的文件名: <名称>-<8位哈希>.<扩展名>
+HASHED_ASSET = re.compile(r"-[A-Za-z0-9_-]{8}\.[a-z0-9]+$")
+# 编码 -> 压缩副本的后缀，按优先级排列
+PRECOMPRESSED = {"br": ".br", "gzip": ".gz"}
+PRECOMPRESS_EXTENSIONS = (".js", ".mjs", ".css", ".html", ".svg", ".json", ".map", ".txt", ".xml", ".wasm")
+PRECOMPRESS_MIN_SIZE = 1024
+# 用户内容目录不生成压缩副本 (文件会被替换或淘汰)
+PRECOMPRESS_SKIP_DIRS = {"uploads", "mirror"}
+
+def is_hashed_asset(full_path: str) -> bool:
+    parent = os.path.basename(os.path.dirname(full_path))
+    return parent == "assets" and HASHED_ASSET.search(os.path.basename(full_path)) is not None
+
+def _is_file(stat_result) -> bool:
+    return stat_result is not None and stat.S_ISREG(stat_result.st_mode)
+
+class CachedStaticFiles(StaticFiles):
+    def file_response(self, full_path, stat_result, scope, status_code=200, name=None, encoding=None):
+        """name 为原文件名 (返回压缩副本时与 full_path 不同)"""
+        name = name or os.path.basename(full_path)
+        media_type = (mimetypes.guess_type(name)[0] or "text/plain") if encoding else None
+        response = FileResponse(full_path, status_code=status_code, stat_result=stat_result, media_type=media_type)
+        if content_hash(name) is not None:
+            response.headers["ETag"] = f'"{name}{PRECOMPRESSED.get(encoding, "")}"'
+            response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+        elif is_hashed_asset(os.path.join(os.path.dirname(full_path), name)):
+            response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+        elif name.endswith(".html"):
+            # 入口页引用带哈希的资源，每次都按 ETag 重新验证
+            response.headers["Cache-Control"] = HTML_CACHE_CONTROL
+        if encoding is not None:
+            response.headers["Content-Encoding"] = encoding
+        if name.endswith(PRECOMPRESS_EXTENSIONS):
+            response.headers.add_vary_header("Accept-Encoding")
+        if self.is_not_modified(response.headers, Headers(scope=scope)):
+            return NotModifiedResponse(response.headers)
+        return response
+
+    async def get_response(self, path, scope):
+        headers = Headers(scope=scope)
+        requested = QueryParams(scope["query_string"]).get("s", "")
+        if requested.isdigit() and path.startswith(THUMBNAIL_DIRS):
+            return await self._thumbnail_response(path, scope, headers, int(requested))
+        # html 模式下 "/" 等目录URL返回其中的 index.html，同样优先使用压缩副本
+        target = os.path.join(path, "index.html") if self.html and scope["path"].endswith("/") else path
+        if target.endswith(PRECOMPRESS_EXTENSIONS) and "range" not in headers:
+            accepted = parse_accept_encoding(headers.get("accept-encoding", ""))
+            encodings = [encoding for encoding in PRECOMPRESSED if accepts(accepted, encoding)]
+            if encodings:
+                variant = await anyio.to_thread.run_sync(self._find_precompressed, target, encodings)
+                if variant is not None:
+                    full_path, stat_result, encoding = variant
+                    return self.file_response(
+                        full_path, stat_result, scope, name=os.path.basename(target), encoding=encoding,
+                    )
+        return await super().get_response(path, scope)
+
+    def _find_precompressed(self, path, encodings):
+        """查找不比原文件旧的压缩副本，返回 (路径, stat, 编码)"""
+        _, original = self.lookup_path(path)
+        if not _is_file(original):
+            return None
+        for encoding in encodings:
+            full_path, stat_result = self.lookup_path(path + PRECOMPRESSED[encoding])
+            if _is_file(stat_result) and stat_result.st_mtime >= original.st_mtime:
+                return full_path, stat_result, encoding
+        return None
+
+    async def _thumbnail_response(self, path, scope, headers, requested):
+        formats = accepted_formats(headers.get("accept", ""))
+        size = pick_size(requested)
+        candidates = []
+        for fmt in formats:
+            full_path, stat_result = await anyio.to_thread.run_sync(self.lookup_path, thumbnail_name(path, size, fmt))
+            if stat_result is not None:
+                candidates.append((stat_result.st_size, full_path, stat_result))
+        if candidates:
+            _, full_path, stat_result = min(candidates)
+            response = self.file_response(full_path, stat_result, scope)
+            response.headers["Vary"] = "Accept"
+            return response
+
+        response = await super().get_response(path, scope)
+        if response.status_code in (200, 304):
+            # 返回的是原图: 不能按缩略图URL长期缓存
+            response.headers["Cache-Control"] = "no-cache"
+            response.headers["Vary"] = "Accept"
+            if formats:
+                full_path, _ = await anyio.to_thread.run_sync(self.lookup_path, path)
+                if full_path:
+                    schedule_thumbnails(full_path)
+        return response
+
+class MirrorStaticFiles(CachedStaticFiles):
+    def __init__(self, *, mirror, **kwargs):
+        super().__init__(**kwargs)
+        self.mirror = mirror
+
+    async def get_response(self, path, scope):
+        try:
+            response = await super().get_response(path, scope)
+        except HTTPException as e:
+            if e.status_code != 404:
+                raise
+            return await self._fetch_missing(path, scope)
+        await self.mirror.touch(path)
+        # 镜像内容会随源站刷新，允许缓存一天
+        response.headers.setdefault("Cache-Control", MIRROR_CACHE_CONTROL)
+        return response
+
+    async def _fetch_missing(self, path, scope):
+        url = await anyio.to_thread.run_sync(self.mirror.entry_url, path)
+        if url is None:
+            raise HTTPException(status_code=404)
+        if await self.mirror.mirror(url) == "failed":
+            return RedirectResponse(url, status_code=307)
+        response = await super().get_response(path, scope)
+        response.headers.setdefault("Cache-Control", MIRROR_CACHE_CONTROL)
+        return response
+
+def _compress_file(source: str, target: str, compress):
+    with open(source, "rb") as f:
+        data = f.read()
+    compressed = compress(data)
+    if len(compressed) >= len(data):
+        return False
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(target), prefix=".precompress-")
+    with os.fdopen(fd, "wb") as temp:
+        temp.write(compressed)
+    os.chmod(temp_path, 0o644)
+    os.replace(temp_path, target)
+    return True
+
+def precompress_directory(directory: str) -> int:
+    """为目录下的文本文件生成 .br / .gz 压缩副本 (已是最新的跳过)，返回生成的文件数"""
+    compressors = {"gzip": lambda data: gzip.compress(data, 9, mtime=0)}
+    if brotli is not None:
+        compressors["br"] = lambda data: brotli.compress(data, quality=11)
+
+    generated = 0
+    for root, dirs, files in os.walk(directory):
+        dirs[:] = [d for d in dirs if d not in PRECOMPRESS_SKIP_DIRS]
+        for filename in files:
+            source = os.path.join(root, filename)
+            if not filename.endswith(PRECOMPRESS_EXTENSIONS) or os.path.getsize(source) < PRECOMPRESS_MIN_SIZE:
+                continue
+            mtime = os.path.getmtime(source)
+            for encoding, compress in compressors.items():
+                target = source + PRECOMPRESSED[encoding]
+                if os.path.exists(target) and os.path.getmtime(target) >= mtime:
+                    continue
+                if _compress_file(source, target, compress):
+                    generated += 1
+    return generated
+
+def main():
+    parser = argparse.ArgumentParser(description="为静态文件生成 .br / .gz 压缩副本")
+    parser.add_argument("directory", nargs="?", default="app/static")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    generated = precompress_directory(args.directory)
+    print(f"✅ 生成 {generated} 个压缩副本，耗时 {time.perf_counter() - started:.1f}s")
+
+if __name__ == "__main__":
+    main()
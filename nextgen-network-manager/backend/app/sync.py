@@ -0,0 +1,65 @@
+"""
+设备表的增量同步支持
+
+每次写入设备(新增/修改/删除)时从 sync_state 计数器分配一个全局递增的版本号，
+客户端携带上次拿到的版本号即可只获取其后的变更。
+"""
+
+from sqlalchemy import func, text
+from sqlalchemy.orm import Session
+from app import models
+
+def current_version(db: Session) -> int:
+    """当前设备表的版本号 (已提交的写入中最大的版本号)"""
+    return db.execute(text("SELECT version FROM sync_state WHERE id = 1")).scalar() or 0
+
+def next_version(db) -> int:
+    """在调用方的写入事务中为本次写入分配新的版本号
+
+    计数器在同一条语句中递增并返回，同时取得写锁，并发的写入方各自得到不同的版本号；
+    事务回滚时计数器一并回滚。db 可以是会话或连接。
+    """
+    return db.execute(text("UPDATE sync_state SET version = version + 1 WHERE id = 1 RETURNING version")).scalar()
+
+def make_etag(version: int) -> str:
+    return f'W/"devices-{version}"'
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """判断 If-None-Match 请求头是否命中当前ETag"""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+def mark_deleted(db: Session, mac: str, version: int):
+    """记录设备删除的墓碑"""
+    tombstone = db.get(models.DeviceTombstone, mac)
+    if tombstone is None:
+        db.add(models.DeviceTombstone(mac=mac, version=version))
+    else:
+        tombstone.version = version
+        tombstone.deleted_at = func.now()
+
+def clear_tombstone(db: Session, mac: str):
+    """设备重新创建时移除旧的墓碑，避免客户端把新记录当作已删除"""
+    db.query(models.DeviceTombstone).filter(models.DeviceTombstone.mac == mac).delete(synchronize_session=False)
+
+def clear_tombstones(db: Session, macs):
+    """批量版本的 clear_tombstone，macs 需由调用方控制在单条语句的参数上限内"""
+    db.query(models.DeviceTombstone).filter(models.DeviceTombstone.mac.in_(macs)).delete(synchronize_session=False)
+
+def get_changes(db: Session, since: int, columns=None):
+    """返回版本号大于 since 的设备和墓碑；指定 columns 时设备只查询这些列"""
+    devices = (
+        db.query(*(columns or [models.Device]))
+        .filter(models.Device.version > since)
+        .order_by(models.Device.version)
+        .all()
+    )
+    deleted = (
+        db.query(models.DeviceTombstone.mac)
+        .filter(models.DeviceTombstone.version > since)
+        .order_by(models.DeviceTombstone.version)
+        .all()
+    )
+    return devices, [row[0] for row in deleted]
@@ -0,0 +1,302 @@
+"""
+设备遥测时序存储 (累计流量、协商速率、信号强度、在线时长、Wi-Fi质量)
+
+路由器每次导出的设备列表都带有这些计数，导入时按快照时间追加，以整数MAC为键:
+  - 新样本写入按行存储的 device_metric_samples，追加只是一次 executemany INSERT
+  - 前一天及更早的样本按设备打包为列式数据块 (device_metric_blocks)，
+    时间戳和每个指标各是一列 array 序列化的 BLOB，每个点 8 字节
+  - 较旧的数据块自动降采样: 原始样本保留 7 天后聚合为每小时一个点，
+    每小时的点保留 180 天后聚合为每天一个点；累计计数取区间内最后一个值，其余取平均值。
+    保留时长相对于最新的快照计算，按时间顺序补录历史快照时每个时间桶都在数据完整后才聚合
+    (晚于降采样才补录的旧快照会覆盖同一时间桶的点)
+
+查询只读取与时间范围重叠的数据块 (按MAC走主键) 和未打包的样本，
+在块内二分定位范围，再按 step 重新分桶，不需要扫描原始 JSON。
+"""
+
+import math
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import deque
+from itertools import groupby, islice
+from typing import Iterable, List, Optional, Tuple
+
+from sqlalchemy import bindparam, text
+
+from app.mac import mac_to_int
+
+# (列名, 导出字段, 降采样聚合方式)
+METRICS = (
+    ('total_tx', 'totalTX', 'last'),
+    ('total_rx', 'totalRX', 'last'),
+    ('rx_rate', 'rx_rate', 'mean'),
+    ('tx_rate', 'tx_rate', 'mean'),
+    ('signal', 'signal', 'mean'),
+    ('online_time', 'onlineTime', 'last'),
+    ('wifi_quality', 'wifi_quality', 'mean'),
+)
+METRIC_NAMES = tuple(name for name, _, _ in METRICS)
+_AGGREGATES = tuple(aggregate for _, _, aggregate in METRICS)
+
+HOUR = 3600
+DAY = 86400
+# 存储层级: (分辨率秒数, 数据块窗口跨度, 保留时长)，分辨率 0 为原始样本；
+# 窗口完全早于保留时长的数据块降采样到下一层级，最后一层永久保留
+TIERS = (
+    (0, DAY, 7 * DAY),
+    (HOUR, 30 * DAY, 180 * DAY),
+    (DAY, 360 * DAY, None),
+)
+# 每次 executemany 写入的样本数 / 数据块数
+APPEND_CHUNK_SIZE = 500
+
+_METRIC_LIST = ', '.join(METRIC_NAMES)
+_BLOCK_COLUMNS = f"mac_int, resolution, start_ts, end_ts, count, timestamps, {_METRIC_LIST}"
+_INSERT_SAMPLE = text(
+    f"INSERT OR IGNORE INTO device_metric_samples (mac_int, ts, {_METRIC_LIST}) "
+    f"VALUES (:mac_int, :ts, {', '.join(':' + name for name in METRIC_NAMES)})"
+)
+_REPLACE_BLOCK = text(
+    f"INSERT OR REPLACE INTO device_metric_blocks ({_BLOCK_COLUMNS}) "
+    f"VALUES ({', '.join(':' + column.strip() for column in _BLOCK_COLUMNS.split(','))})"
+)
+_SELECT_BLOCKS = text(
+    f"SELECT {_BLOCK_COLUMNS} FROM device_metric_blocks "
+    "WHERE resolution = :resolution AND mac_int IN :macs AND start_ts IN :windows"
+).bindparams(bindparam('macs', expanding=True), bindparam('windows', expanding=True))
+
+def _number(value) -> float:
+    """导出记录中的数值，缺失或不是数字时为 NaN"""
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return math.nan
+    return float(value)
+
+def _nan(value) -> float:
+    return math.nan if value is None else value
+
+def extract_sample(device_info: dict) -> Optional[tuple]:
+    """从一条导出记录中取出 (整数MAC, 各指标...)，MAC无效或没有任何指标时返回 None"""
+    mac_int = mac_to_int(device_info.get('mac'))
+    if mac_int is None:
+        return None
+    values = tuple(_number(device_info.get(field)) for _, field, _ in METRICS)
+    if all(math.isnan(value) for value in values):
+        return None
+    return (mac_int,) + values
+
+def _encode(timestamps, columns) -> dict:
+    row = {'count': len(timestamps), 'end_ts': timestamps[-1], 'timestamps': array('q', timestamps).tobytes()}
+    for name, values in zip(METRIC_NAMES, columns):
+        row[name] = array('d', values).tobytes()
+    return row
+
+def _decode(block) -> Tuple[array, List[array]]:
+    timestamps = array('q')
+    timestamps.frombytes(block.timestamps)
+    columns = []
+    for name in METRIC_NAMES:
+        values = array('d')
+        values.frombytes(getattr(block, name))
+        columns.append(values)
+    return timestamps, columns
+
+def _aggregate(timestamps, columns, step: int):
+    """按 step 秒分桶 (时间戳需有序，桶的时间取起点)，累计计数取桶内最后一个有效值，其余取有效值的平均"""
+    buckets = []
+    results = [[] for _ in columns]
+    start, n = 0, len(timestamps)
+    while start < n:
+        bucket = timestamps[start] - timestamps[start] % step
+        end = start + 1
+        while end < n and timestamps[end] < bucket + step:
+            end += 1
+        buckets.append(bucket)
+        for values, result, aggregate in zip(columns, results, _AGGREGATES):
+            valid = [value for value in values[start:end] if not math.isnan(value)]
+            if not valid:
+                result.append(math.nan)
+            elif aggregate == 'last':
+                result.append(valid[-1])
+            else:
+                result.append(sum(valid) / len(valid))
+        start = end
+    return buckets, results
+
+def _split_windows(mac_int: int, span: int, timestamps, columns):
+    """把一个设备的一组有序的点按窗口切分，返回 ((整数MAC, 窗口起点), 时间戳, 各列)"""
+    start = 0
+    while start < len(timestamps):
+        window = timestamps[start] - timestamps[start] % span
+        end = bisect_left(timestamps, window + span, start)
+        yield (mac_int, window), timestamps[start:end], [values[start:end] for values in columns]
+        start = end
+
+def _merge_blocks(conn, resolution: int, pieces):
+    """把 _split_windows 切出的点写入对应的数据块，与块内已有的点合并 (同一时间以新点为准)
+
+    每 APPEND_CHUNK_SIZE 个数据块用一条查询读出已有的块，再用一次 executemany 写回。
+    """
+    pieces = iter(pieces)
+    while True:
+        chunk = list(islice(pieces, APPEND_CHUNK_SIZE))
+        if not chunk:
+            return
+        existing = {}
+        blocks = conn.execute(_SELECT_BLOCKS, {
+            'resolution': resolution,
+            'macs': list({key[0] for key, _, _ in chunk}),
+            'windows': list({key[1] for key, _, _ in chunk}),
+        })
+        for block in blocks:
+            existing[(block.mac_int, block.start_ts)] = _decode(block)
+        rows = []
+        for key, timestamps, columns in chunk:
+            if key in existing:
+                points = {}
+                for source_timestamps, source_columns in (existing[key], (timestamps, columns)):
+                    for i, ts in enumerate(source_timestamps):
+                        points[ts] = [values[i] for values in source_columns]
+                timestamps = sorted(points)
+                columns = [[points[ts][j] for ts in timestamps] for j in range(len(METRICS))]
+            rows.append({'mac_int': key[0], 'resolution': resolution, 'start_ts': key[1], **_encode(timestamps, columns)})
+        conn.execute(_REPLACE_BLOCK, rows)
+
+def _pack_samples(conn, cutoff: int):
+    """把 cutoff 之前的样本按设备打包为原始数据块"""
+    rows = conn.execute(text(
+        f"SELECT mac_int, ts, {_METRIC_LIST} FROM device_metric_samples WHERE ts < :cutoff ORDER BY mac_int, ts"
+    ), {'cutoff': cutoff}).fetchall()
+    if not rows:
+        return
+    span = TIERS[0][1]
+
+    def pieces():
+        for mac_int, group in groupby(rows, key=lambda row: row[0]):
+            group = list(group)
+            timestamps = [row[1] for row in group]
+            columns = [[_nan(row[2 + j]) for row in group] for j in range(len(METRICS))]
+            yield from _split_windows(mac_int, span, timestamps, columns)
+
+    _merge_blocks(conn, 0, pieces())
+    conn.execute(text("DELETE FROM device_metric_samples WHERE ts < :cutoff"), {'cutoff': cutoff})
+
+def _downsample(conn, resolution: int, span: int, cutoff: int, next_resolution: int, next_span: int):
+    """把窗口完全早于 cutoff 的数据块聚合到下一层级"""
+    blocks = conn.execute(text(
+        f"SELECT {_BLOCK_COLUMNS} FROM device_metric_blocks "
+        "WHERE resolution = :resolution AND start_ts <= :last_start ORDER BY mac_int, start_ts"
+    ), {'resolution': resolution, 'last_start': cutoff - span}).fetchall()
+    if not blocks:
+        return
+
+    def pieces():
+        # 同一设备的多个数据块可能落入下一层级的同一窗口，先按设备合并
+        for mac_int, group in groupby(blocks, key=lambda block: block.mac_int):
+            timestamps, columns = [], [[] for _ in METRICS]
+            for block in group:
+                buckets, results = _aggregate(*_decode(block), next_resolution)
+                timestamps.extend(buckets)
+                for values, result in zip(columns, results):
+                    values.extend(result)
+            yield from _split_windows(mac_int, next_span, timestamps, columns)
+
+    _merge_blocks(conn, next_resolution, pieces())
+    conn.execute(text(
+        "DELETE FROM device_metric_blocks WHERE resolution = :resolution AND start_ts <= :last_start"
+    ), {'resolution': resolution, 'last_start': cutoff - span})
+
+def compact(conn, now: Optional[int] = None):
+    """打包 now 前一天及更早的样本，并把超过保留时长的数据块降采样到下一层级 (可重复执行)
+
+    now 默认为最新样本的时间。
+    """
+    if now is None:
+        now = conn.execute(text("SELECT MAX(ts) FROM device_metric_samples")).scalar()
+        if now is None:
+            return
+    _pack_samples(conn, now - now % DAY)
+    for (resolution, span, retention), (next_resolution, next_span, _) in zip(TIERS, TIERS[1:]):
+        _downsample(conn, resolution, span, now - retention, next_resolution, next_span)
+
+def insert_samples(conn, samples: Iterable[tuple], timestamp: int) -> int:
+    """写入一批样本 (extract_sample 的结果)，不整理旧数据，返回写入的样本数
+
+    同一批中重复的MAC只保留第一条；已有相同MAC和时间的样本时忽略 (先写入的优先)。
+    """
+    rows = {}
+    for mac_int, *values in samples:
+        if mac_int not in rows:
+            rows[mac_int] = {'mac_int': mac_int, 'ts': timestamp, **dict(zip(METRIC_NAMES, values))}
+    rows = list(rows.values())
+    written = 0
+    for i in range(0, len(rows), APPEND_CHUNK_SIZE):
+        written += conn.execute(_INSERT_SAMPLE, rows[i:i + APPEND_CHUNK_SIZE]).rowcount
+    return written
+
+def append_samples(conn, samples: Iterable[tuple], timestamp: int) -> int:
+    """追加一个快照的样本 (extract_sample 的结果)，然后整理旧数据，返回写入的样本数
+
+    同一快照中重复的MAC只保留第一条；同一时间的快照重复导入时忽略已有的样本。
+    conn 为调用方事务中的连接。
+    """
+    written = insert_samples(conn, samples, timestamp)
+    compact(conn)
+    return written
+
+class SampleWriter:
+    """导入时边解析边追加一个快照的样本，内存中只保留尚未写入的样本
+
+    add 在解析设备时调用 (import_devices 使用进程池时在解析线程中)，
+    flush 在写入设备的线程中每块调用一次，finish 写入剩余的样本并整理旧数据，返回写入的样本数。
+    """
+
+    def __init__(self, conn, timestamp: int):
+        self.conn = conn
+        self.timestamp = timestamp
+        self.written = 0
+        self._pending = deque()  # 两个线程之间只用 append / popleft
+
+    def add(self, device_info: dict):
+        sample = extract_sample(device_info)
+        if sample is not None:
+            self._pending.append(sample)
+
+    def flush(self):
+        samples = [self._pending.popleft() for _ in range(len(self._pending))]
+        self.written += insert_samples(self.conn, samples, self.timestamp)
+
+    def finish(self) -> int:
+        self.flush()
+        compact(self.conn)
+        return self.written
+
+def query_metrics(conn, mac_int: int, start: int, end: int, step: Optional[int] = None):
+    """返回 [start, end] 内的 (时间戳列表, {指标名: 取值列表})，缺失值为 None
+
+    step 为空时返回存储中的点 (近期为原始样本，较早的为降采样后的点)，否则按 step 秒重新分桶。
+    """
+    points = {}
+    blocks = conn.execute(text(
+        f"SELECT {_BLOCK_COLUMNS} FROM device_metric_blocks "
+        "WHERE mac_int = :mac_int AND start_ts <= :end AND end_ts >= :start"
+    ), {'mac_int': mac_int, 'start': start, 'end': end})
+    for block in blocks:
+        timestamps, columns = _decode(block)
+        for i in range(bisect_left(timestamps, start), bisect_right(timestamps, end)):
+            points[timestamps[i]] = [values[i] for values in columns]
+    samples = conn.execute(text(
+        f"SELECT ts, {_METRIC_LIST} FROM device_metric_samples "
+        "WHERE mac_int = :mac_int AND ts BETWEEN :start AND :end"
+    ), {'mac_int': mac_int, 'start': start, 'end': end})
+    for ts, *values in samples:
+        points[ts] = [_nan(value) for value in values]
+
+    timestamps = sorted(points)
+    columns = [[points[ts][j] for ts in timestamps] for j in range(len(METRICS))]
+    if step:
+        timestamps, columns = _aggregate(timestamps, columns, step)
+    metrics = {
+        name: [None if math.isnan(value) else value for value in values]
+        for name, values in zip(METRIC_NAMES, columns)
+    }
+    return list(timestamps), metrics
@@ -0,0 +1,129 @@
+"""
+图标缩略图
+
+为 static/uploads 中的图标生成固定尺寸的 WebP / AVIF 缩略图，与原图放在同一目录：
+    leishido.png -> leishido.png.s48.webp, leishido.png.s48.avif, ...
+
+上传后在后台线程中生成；已有图标用进程池批量补齐 (在 backend 目录下运行):
+    python -m app.thumbnails --workers 4
+
+Pillow 是可选依赖，未安装或不支持对应格式时跳过生成，图标URL继续返回原图。
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from app.uploads import UPLOAD_DIR
+
+try:
+    from PIL import Image, UnidentifiedImageError, features
+except ImportError:  # Pillow 是可选依赖
+    Image = None
+
+THUMBNAIL_SIZES = tuple(sorted(int(size) for size in os.getenv("THUMBNAIL_SIZES", "48,96").split(",")))
+# 客户端同时接受两种格式时返回文件更小的一个 (小尺寸图标 WebP 往往比 AVIF 更小)
+THUMBNAIL_FORMATS = ("webp", "avif")
+SAVE_OPTIONS = {
+    "webp": {"quality": 80, "method": 4},
+    "avif": {"quality": 50, "speed": 6},
+}
+THUMBNAIL_SOURCE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".gif", ".webp", ".avif", ".ico", ".bmp")
+
+def supported_formats():
+    """当前环境能生成的缩略图格式"""
+    if Image is None:
+        return ()
+    return tuple(fmt for fmt in THUMBNAIL_FORMATS if features.check(fmt))
+
+def thumbnail_name(filename: str, size: int, fmt: str) -> str:
+    return f"{filename}.s{size}.{fmt}"
+
+def is_thumbnail(filename: str) -> bool:
+    name, fmt = os.path.splitext(filename)
+    return fmt[1:] in THUMBNAIL_FORMATS and os.path.splitext(name)[1][2:].isdigit()
+
+def pick_size(requested: int) -> int:
+    """取不小于请求尺寸的最小缩略图尺寸，超过最大尺寸时取最大的"""
+    for size in THUMBNAIL_SIZES:
+        if size >= requested:
+            return size
+    return THUMBNAIL_SIZES[-1]
+
+def accepted_formats(accept: str):
+    """Accept 请求头中客户端支持、且当前环境能生成的缩略图格式"""
+    return [fmt for fmt in supported_formats() if f"image/{fmt}" in accept]
+
+def generate_thumbnails(path: str) -> int:
+    """为一个图标生成全部尺寸和格式的缩略图 (已存在的跳过)，返回新生成的数量"""
+    formats = supported_formats()
+    directory, filename = os.path.split(path)
+    if not formats or is_thumbnail(filename) or not filename.lower().endswith(THUMBNAIL_SOURCE_EXTENSIONS):
+        return 0
+    targets = [
+        (size, fmt, os.path.join(directory, thumbnail_name(filename, size, fmt)))
+        for size in THUMBNAIL_SIZES
+        for fmt in formats
+    ]
+    targets = [target for target in targets if not os.path.exists(target[2])]
+    if not targets:
+        return 0
+
+    try:
+        with Image.open(path) as source:
+            source.seek(0)  # 动图只取第一帧
+            image = source.convert("RGBA")
+    except (UnidentifiedImageError, OSError):
+        return 0
+
+    generated = 0
+    for size, fmt, target in targets:
+        thumbnail = image.copy()
+        thumbnail.thumbnail((size, size), Image.LANCZOS)
+        # 先写临时文件再改名，避免并发请求读到写了一半的缩略图
+        temp_path = f"{target}.tmp"
+        thumbnail.save(temp_path, format=fmt.upper(), **SAVE_OPTIONS[fmt])
+        os.replace(temp_path, target)
+        generated += 1
+    return generated
+
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="thumbnails")
+_pending = set()
+
+def schedule_thumbnails(path: str):
+    """在后台线程中为图标生成缩略图，同一文件不会重复排队"""
+    if not supported_formats() or path in _pending:
+        return
+    _pending.add(path)
+    future = _executor.submit(generate_thumbnails, path)
+    future.add_done_callback(lambda _: _pending.discard(path))
+
+def backfill(upload_dir=UPLOAD_DIR, workers=None):
+    """用进程池为目录中已有的图标补齐缩略图，返回 (处理的图标数, 生成的缩略图数)"""
+    paths = [
+        os.path.join(upload_dir, filename)
+        for filename in sorted(os.listdir(upload_dir))
+        if not filename.startswith(".") and not is_thumbnail(filename)
+    ]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        generated = sum(pool.map(generate_thumbnails, paths, chunksize=4))
+    return len(paths), generated
+
+def main():
+    parser = argparse.ArgumentParser(description="为已上传的图标批量生成缩略图")
+    parser.add_argument("--dir", default=UPLOAD_DIR, help="图标目录")
+    parser.add_argument("--workers", type=int, default=None, help="进程数 (默认CPU核数)")
+    args = parser.parse_args()
+
+    formats = supported_formats()
+    if not formats:
+        print("❌ 未安装 Pillow 或不支持 WebP/AVIF，无法生成缩略图")
+        return
+    started = time.perf_counter()
+    total, generated = backfill(args.dir, args.workers)
+    elapsed = time.perf_counter() - started
+    print(f"✅ 处理 {total} 个图标，生成 {generated} 个缩略图 ({'/'.join(formats)}，尺寸 {THUMBNAIL_SIZES})，耗时 {elapsed:.1f}s")
+
+if __name__ == "__main__":
+    main()
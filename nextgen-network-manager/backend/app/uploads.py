@@ -0,0 +1,78 @@
+"""
+按内容寻址的图标存储
+
+上传内容边写入临时文件边计算 SHA-256，超过大小上限立即中止；
+完成后以 "<哈希>.<扩展名>" 命名 (相同内容只保存一份)，
+因此返回的URL指向的内容永不改变，可以长期缓存。
+"""
+
+import hashlib
+import os
+import re
+import tempfile
+
+UPLOAD_DIR = "app/static/uploads"
+UPLOAD_URL_PREFIX = "/static/uploads"
+MAX_ICON_SIZE = int(os.getenv("MAX_ICON_SIZE", str(2 * 1024 * 1024)))
+CHUNK_SIZE = 64 * 1024
+# 文件名中哈希的长度 (SHA-256 前128位)
+HASH_LENGTH = 32
+
+ICON_EXTENSIONS = {
+    ".png": ".png",
+    ".jpg": ".jpg",
+    ".jpeg": ".jpg",
+    ".gif": ".gif",
+    ".webp": ".webp",
+    ".avif": ".avif",
+    ".svg": ".svg",
+    ".ico": ".ico",
+}
+
+# 按内容寻址的文件名，以及由其派生的缩略图 (<哈希>.png.s48.webp)
+HASHED_NAME = re.compile(rf"^([0-9a-f]{{{HASH_LENGTH}}})\.[a-z0-9]+(\.s\d+\.[a-z0-9]+)?$")
+
+class UploadTooLarge(Exception):
+    pass
+
+def icon_extension(filename: str) -> str:
+    """按原文件名确定存储的扩展名，不是图片格式时抛出 ValueError"""
+    extension = ICON_EXTENSIONS.get(os.path.splitext(filename or "")[1].lower())
+    if extension is None:
+        raise ValueError("不支持的图标格式")
+    return extension
+
+def content_hash(name: str):
+    """按内容寻址的文件名返回其哈希，其他文件名返回 None"""
+    match = HASHED_NAME.match(name)
+    return match.group(1) if match else None
+
+def store_icon(source, extension: str, upload_dir=UPLOAD_DIR, max_size=MAX_ICON_SIZE):
+    """把文件对象的内容存入图标目录，返回存储的文件名 (阻塞调用，需在线程池中执行)"""
+    os.makedirs(upload_dir, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    fd, temp_path = tempfile.mkstemp(dir=upload_dir, prefix=".upload-")
+    try:
+        with os.fdopen(fd, "wb") as temp:
+            while True:
+                chunk = source.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_size:
+                    raise UploadTooLarge(f"图标不能超过 {max_size // 1024} KB")
+                digest.update(chunk)
+                temp.write(chunk)
+        filename = f"{digest.hexdigest()[:HASH_LENGTH]}{extension}"
+        target = os.path.join(upload_dir, filename)
+        if os.path.exists(target):
+            os.unlink(temp_path)
+        else:
+            os.chmod(temp_path, 0o644)
+            os.replace(temp_path, target)
+        return filename
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+同步/异步数据库会话的压测对比
+
+分别以 sqlite:// 和 sqlite+aiosqlite:// 启动后端，模拟多个扩展客户端并发地
+刷新设备列表、按MAC查询和批量查询，输出每秒请求数与延迟分位数。
+
+用法 (在 backend 目录下运行，需要额外安装 httpx):
+    python benchmarks/bench_async_load.py --clients 200 --duration 15
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+MODES = {
+    "sync": "sqlite:///{path}",
+    "async": "sqlite+aiosqlite:///{path}",
+}
+
+def make_mac(i):
+    return ":".join(f"{(i >> shift) & 0xFF:02X}" for shift in (40, 32, 24, 16, 8, 0))
+
+def start_server(database_url, port):
+    env = dict(os.environ, DATABASE_URL=database_url)
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        env=env,
+    )
+
+async def wait_ready(client):
+    for _ in range(100):
+        try:
+            if (await client.get("/api/categories")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.1)
+    raise RuntimeError("后端服务启动超时")
+
+async def seed(client, device_count):
+    devices = [{"mac": make_mac(i), "note": f"设备{i}", "category": "智能家居"} for i in range(device_count)]
+    response = await client.post("/api/devices/bulk", json=devices, timeout=60)
+    response.raise_for_status()
+
+async def run_client(client, device_count, deadline, latencies, errors):
+    """单个客户端: 模拟扩展在路由器页面上的典型请求组合"""
+    etag = None
+    while time.perf_counter() < deadline:
+        roll = random.random()
+        started = time.perf_counter()
+        try:
+            if roll < 0.5:
+                headers = {"If-None-Match": etag} if etag else {}
+                response = await client.get("/api/devices", headers=headers)
+                etag = response.headers.get("etag", etag)
+            elif roll < 0.8:
+                response = await client.get(f"/api/devices/{make_mac(random.randrange(device_count))}")
+            elif roll < 0.95:
+                macs = [make_mac(random.randrange(device_count)) for _ in range(40)]
+                response = await client.post("/api/devices/lookup", json={"macs": macs})
+            else:
+                mac = make_mac(random.randrange(device_count))
+                response = await client.put(f"/api/devices/{mac}", json={"note": f"备注{random.random():.6f}"})
+            if response.status_code >= 400:
+                errors.append(response.status_code)
+        except httpx.HTTPError as e:
+            errors.append(type(e).__name__)
+        latencies.append(time.perf_counter() - started)
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+async def bench_mode(mode, args, port):
+    with tempfile.TemporaryDirectory() as tmp:
+        server = start_server(MODES[mode].format(path=os.path.join(tmp, "bench.db")), port)
+        try:
+            limits = httpx.Limits(max_connections=args.clients, max_keepalive_connections=args.clients)
+            async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=30) as client:
+                await wait_ready(client)
+                await seed(client, args.devices)
+
+                latencies, errors = [], []
+                started = time.perf_counter()
+                deadline = started + args.duration
+                await asyncio.gather(*(
+                    run_client(client, args.devices, deadline, latencies, errors) for _ in range(args.clients)
+                ))
+                elapsed = time.perf_counter() - started
+        finally:
+            server.terminate()
+            server.wait()
+
+    print(f"{mode:>6}: {len(latencies) / elapsed:8.1f} req/s  "
+          f"p50 {percentile(latencies, 50) * 1000:7.1f} ms  "
+          f"p99 {percentile(latencies, 99) * 1000:7.1f} ms  "
+          f"错误 {len(errors)}")
+
+def main():
+    parser = argparse.ArgumentParser(description="同步/异步数据库会话压测")
+    parser.add_argument("--clients", type=int, default=200, help="并发客户端数")
+    parser.add_argument("--duration", type=float, default=15, help="每种模式的压测秒数")
+    parser.add_argument("--devices", type=int, default=2000, help="预置设备数")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--modes", nargs="+", default=list(MODES), choices=list(MODES))
+    args = parser.parse_args()
+
+    print(f"并发客户端 {args.clients}，设备 {args.devices}，每种模式 {args.duration}s")
+    for offset, mode in enumerate(args.modes):
+        asyncio.run(bench_mode(mode, args, args.port + offset))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+设备分类: 逐个关键词 in 扫描与编译后的规则引擎的速度对比
+
+生成合成设备 (名称、型号、产品类型、MIoT产品随机组合关键词)，分别用原实现
+(legacy_classification.py) 和 app.classification 计算:
+  - IoT判定 (is_iot_device)
+  - IoT原因 (get_iot_reason)
+  - 设备类型 (count_device_types)
+  - 类别映射 (map_product_to_category)
+  - 以上全部 (规则引擎每个设备只调用一次 classify)
+输出每秒设备数，并校验两种实现的结果一致。
+
+为控制内存，先生成 --pool 个不同的设备，再循环使用到 --devices 个。
+
+用法 (在 backend 目录下运行):
+    python benchmarks/bench_classification.py --devices 1000000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from itertools import islice, cycle
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import legacy_classification as legacy
+from app.classification import classify, map_product_to_category
+
+PRODUCTS = ["", "", "", "phone", "computer", "tablet", "tv", "router", "gateway", "camera", "stereo", "robot"]
+CATEGORY_PRODUCTS = ["", "phone", "smart_light", "AirConditioner", "nas_box", "gamepad", "robot_vacuum", "unknown", "Camera"]
+NAME_WORDS = [
+    "Xiaomi", "Redmi", "iPhone", "MacBook", "living room", "camera", "light", "lamp", "plug", "socket",
+    "purifier", "dishwasher", "cat eye", "raspberry", "vacuum", "Mi-Router", "sensor", "客厅", "卧室", "树莓派5",
+]
+MODELS = ["", "", "xiaomi_phone_v12pro", "apple_computer_^macbook", "xiaomi_stereo_v2", "chuangmi_camera_ipc019",
+          "yeelink_light_ceiling", "zhimi_fan_za4", "xiaomi_router_rc01", "dmaker_airfresh_t2017"]
+MIOT_PRODUCTS = ["窗帘电机", "晾衣架", "灯", "摄像机", "插座／插排", "smart plug", "gateway", "air purifier", "音箱"]
+
+def make_device(i, rng):
+    device = {
+        "mac": f"00:00:{(i >> 24) & 0xFF:02X}:{(i >> 16) & 0xFF:02X}:{(i >> 8) & 0xFF:02X}:{i & 0xFF:02X}",
+        "name": " ".join(rng.sample(NAME_WORDS, rng.randint(0, 2))),
+        "originName": rng.choice(["", f"device-{i}", "Xiaomi-Plug-M1", "android-ac12"]),
+        "product": rng.choice(PRODUCTS),
+        "userSpecifyProduct": rng.choice(["", "", "", "gateway", "tv", "computer", "camera"]),
+        "model": rng.choice(MODELS),
+    }
+    if rng.random() < 0.3:
+        device["is_miot_device"] = True
+    if rng.random() < 0.4:
+        device["miotData"] = {"product": rng.choice(MIOT_PRODUCTS)}
+    return device
+
+def measure(fn, devices):
+    started = time.perf_counter()
+    results = [fn(device) for device in devices]
+    return results, time.perf_counter() - started
+
+def main():
+    parser = argparse.ArgumentParser(description="设备分类实现的速度对比")
+    parser.add_argument("--devices", type=int, default=1000000)
+    parser.add_argument("--pool", type=int, default=50000, help="不同设备的数量")
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    pool = [make_device(i, rng) for i in range(args.pool)]
+    products = [rng.choice(CATEGORY_PRODUCTS) for _ in range(args.pool)]
+    devices = list(islice(cycle(pool), args.devices))
+    product_values = list(islice(cycle(products), args.devices))
+
+    def legacy_all(device):
+        return (
+            legacy.is_iot_device(device), legacy.get_iot_reason(device), legacy.count_device_class(device),
+        )
+
+    def engine_class(device):
+        result = classify(device)
+        return result.device_class, result.class_reason
+
+    def engine_all(device):
+        result = classify(device)
+        return result.is_iot, result.reason, (result.device_class, result.class_reason)
+
+    cases = [
+        ("IoT判定", devices, legacy.is_iot_device, lambda device: classify(device).is_iot),
+        ("IoT原因", devices, legacy.get_iot_reason, lambda device: classify(device).reason),
+        ("设备类型", devices, legacy.count_device_class, engine_class),
+        ("类别映射", product_values, legacy.map_product_to_category, map_product_to_category),
+        ("全部 (一次扫描)", devices, legacy_all, engine_all),
+    ]
+
+    print(f"{args.devices} 个设备 (其中不同的 {args.pool} 个)")
+    print(f"{'项目':<16}{'原实现 设备/秒':>16}{'规则引擎 设备/秒':>18}{'加速比':>8}{'结果一致':>10}")
+    for label, values, old, new in cases:
+        old_results, old_time = measure(old, values)
+        new_results, new_time = measure(new, values)
+        same = old_results == new_results
+        print(
+            f"{label:<16}{len(values) / old_time:>16.0f}{len(values) / new_time:>18.0f}"
+            f"{old_time / new_time:>8.2f}{'是' if same else '否':>10}"
+        )
+
+if __name__ == "__main__":
+    main()
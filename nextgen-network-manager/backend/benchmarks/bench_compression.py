@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+设备列表响应的压缩率与CPU开销
+
+按 GET /api/devices 的响应格式生成设备列表 JSON (含较长的图标URL和描述)，
+对不同编码和级别分别统计压缩后大小、压缩率和单次压缩耗时。
+中间件默认使用的档位用 * 标出。
+
+用法 (在 backend 目录下运行):
+    python benchmarks/bench_compression.py --devices 100 1000
+"""
+
+import argparse
+import gzip
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import compression
+from app.responses import FastJSONResponse
+
+BRANDS = ["Xiaomi", "Redmi", "Apple", "HUAWEI", "OPPO", "vivo", "Yeelight", "Aqara", "Roborock", "Lenovo"]
+CATEGORIES = ["手机", "电脑", "平板", "智能家居", "摄像头", "路由器", "电视", "音箱", "其他"]
+
+def make_devices(count):
+    rng = random.Random(42)
+    devices = []
+    for i in range(count):
+        brand = rng.choice(BRANDS)
+        model = f"{brand.lower()}.{rng.choice(['phone', 'camera', 'light', 'plug', 'vacuum'])}.v{rng.randint(1, 9)}"
+        devices.append({
+            "mac": ":".join(f"{rng.randint(0, 255):02X}" for _ in range(6)),
+            "note": f"{brand} 设备 {i}",
+            "brand": brand,
+            "category": rng.choice(CATEGORIES),
+            "icon_url": f"https://cdn.cnbj1.fds.api.mi-img.com/miwifi/device_icons/{model}_{rng.getrandbits(64):016x}.png",
+            "description": f"{brand} {model} 固件 {rng.randint(1, 5)}.{rng.randint(0, 20)}.{rng.randint(0, 99)}，位于客厅",
+            "origin_name": f"{brand}-{rng.getrandbits(24):06X}",
+            "name": f"{brand} {model}",
+            "company": f"{brand} Communications Co., Ltd.",
+            "product": model,
+            "model": model,
+            "big_icon_url": f"https://cdn.cnbj1.fds.api.mi-img.com/miwifi/device_icons/big/{model}.png",
+            "id": i + 1,
+            "version": rng.randint(1, 1000),
+            "created_at": "2025-06-01T12:00:00",
+            "updated_at": "2025-06-02T08:30:00",
+        })
+    return devices
+
+def codecs():
+    yield "gzip", 1, lambda data: gzip.compress(data, 1, mtime=0)
+    yield "gzip", 6, lambda data: gzip.compress(data, 6, mtime=0)
+    yield "gzip", 9, lambda data: gzip.compress(data, 9, mtime=0)
+    if compression.brotli is not None:
+        for quality in (1, 4, 6, 11):
+            yield "br", quality, lambda data, q=quality: compression.brotli.compress(data, quality=q)
+    if compression.zstandard is not None:
+        for level in (1, 3, 10, 19):
+            yield "zstd", level, lambda data, l=level: compression.zstandard.ZstdCompressor(level=l).compress(data)
+
+DEFAULT_LEVELS = {
+    "gzip": compression.GZIP_LEVEL,
+    "br": compression.BROTLI_QUALITY,
+    "zstd": compression.ZSTD_LEVEL,
+}
+
+def measure(fn, data, min_seconds=0.2):
+    runs = 0
+    started = time.perf_counter()
+    while True:
+        result = fn(data)
+        runs += 1
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_seconds:
+            return result, elapsed / runs * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description="设备列表压缩率与CPU开销")
+    parser.add_argument("--devices", type=int, nargs="+", default=[100, 1000])
+    args = parser.parse_args()
+
+    missing = [name for name, module in (("brotli", compression.brotli), ("zstandard", compression.zstandard)) if module is None]
+    if missing:
+        print(f"未安装: {', '.join(missing)} (对应编码跳过)")
+
+    for count in args.devices:
+        body = FastJSONResponse(make_devices(count)).body
+        print(f"\n{count} 个设备，原始大小 {len(body) / 1024:.1f} KB")
+        print(f"{'编码':<6} {'级别':>4} {'压缩后 (KB)':>12} {'压缩率':>8} {'耗时 (ms)':>10} {'吞吐 (MB/s)':>12}")
+        for name, level, fn in codecs():
+            compressed, elapsed = measure(fn, body)
+            mark = "*" if DEFAULT_LEVELS[name] == level else " "
+            print(
+                f"{name:<6} {level:>4}{mark} {len(compressed) / 1024:>11.1f} {len(body) / len(compressed):>7.1f}x"
+                f" {elapsed:>10.2f} {len(body) / 1048576 / (elapsed / 1000):>12.1f}"
+            )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+图标镜像的下载与刷新测试
+
+在本地启动一个模拟图标源站的HTTP服务 (支持 ETag 条件请求，可设置响应延迟)，
+在临时数据库中预置引用这些图标的设备，然后依次测量:
+  - 首次镜像 (不同并发数) 的耗时
+  - 刷新 (全部应返回 304) 的耗时
+  - 缓存上限较小时的LRU淘汰，以及被淘汰图标的按需重新下载
+
+用法 (在 backend 目录下运行，需要 httpx):
+    python benchmarks/bench_icon_mirror.py --icons 500 --latency 20
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, create_db_engine
+from app.icon_mirror import IconMirror, mirror_devices, mirror_name
+from app import models
+
+ICON_BYTES = b"\x89PNG\r\n\x1a\n" + b"\0" * 4000
+
+def make_handler(latency, counters):
+    class IconHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            time.sleep(latency)
+            etag = f'"{self.path}"'
+            counters["requests"] += 1
+            if self.headers.get("If-None-Match") == etag:
+                counters["not_modified"] += 1
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "image/png")
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", str(len(ICON_BYTES)))
+            self.end_headers()
+            self.wfile.write(ICON_BYTES)
+
+        def log_message(self, *args):
+            pass
+
+    return IconHandler
+
+def seed(session_factory, base_url, icon_count):
+    db = session_factory()
+    db.add_all(
+        models.Device(mac=f"{i:012X}", mac_int=i, icon_url=f"{base_url}/icons/{i}.png", version=1)
+        for i in range(icon_count)
+    )
+    db.commit()
+    db.close()
+
+async def timed(label, coro):
+    started = time.perf_counter()
+    result = await coro
+    print(f"{label:<28} {time.perf_counter() - started:>8.2f}s  {dict(result)}")
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="图标镜像的下载与刷新测试")
+    parser.add_argument("--icons", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=20, help="模拟源站的响应延迟 (毫秒)")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    args = parser.parse_args()
+
+    counters = {"requests": 0, "not_modified": 0}
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(args.latency / 1000, counters))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    async def run(tmp):
+        for concurrency in args.concurrency:
+            engine = create_db_engine(f"sqlite:///{os.path.join(tmp, f'bench-{concurrency}.db')}")
+            Base.metadata.create_all(bind=engine)
+            session_factory = sessionmaker(bind=engine)
+            seed(session_factory, base_url, args.icons)
+            mirror = IconMirror(
+                directory=os.path.join(tmp, f"mirror-{concurrency}"),
+                concurrency=concurrency,
+                session_factory=session_factory,
+            )
+            await timed(f"首次镜像 (并发 {concurrency})", mirror_devices(mirror))
+            await timed(f"刷新 (并发 {concurrency})", mirror_devices(mirror, refresh=True))
+            await mirror.aclose()
+            engine.dispose()
+
+        # LRU淘汰: 上限只够保存一半的图标
+        engine = create_db_engine(f"sqlite:///{os.path.join(tmp, 'bench-lru.db')}")
+        Base.metadata.create_all(bind=engine)
+        session_factory = sessionmaker(bind=engine)
+        seed(session_factory, base_url, args.icons)
+        directory = os.path.join(tmp, "mirror-lru")
+        mirror = IconMirror(
+            directory=directory,
+            max_bytes=len(ICON_BYTES) * args.icons // 2,
+            session_factory=session_factory,
+        )
+        await mirror_devices(mirror)
+        files = [name for name in os.listdir(directory) if not name.startswith(".")]
+        total = sum(os.path.getsize(os.path.join(directory, name)) for name in files)
+        print(f"LRU: 上限 {mirror.max_bytes / 1024:.0f} KB，保留 {len(files)} 个文件共 {total / 1024:.0f} KB")
+        first = f"{base_url}/icons/0.png"
+        evicted = not os.path.exists(os.path.join(directory, mirror_name(first)))
+        status = await mirror.mirror(first)
+        print(f"LRU: 被淘汰的图标重新请求 -> {status} (淘汰前已删除: {evicted})")
+        await mirror.aclose()
+        engine.dispose()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(run(tmp))
+    server.shutdown()
+    print(f"源站共收到 {counters['requests']} 个请求，其中 {counters['not_modified']} 个返回 304")
+
+if __name__ == "__main__":
+    main()
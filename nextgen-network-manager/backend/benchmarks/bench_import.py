@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+设备导入: 逐行 SELECT + UPDATE/INSERT 与按块集合写入的速度对比
+
+在临时数据库中分别用两种方式导入同一批合成设备 (格式同 bench_stream_import.py)，
+依次测量首次导入 (全部为新设备)、重复导入 (内容完全相同) 和导入少量设备有变化的导出
+的每秒行数，以及后者实际写入的设备数。按块集合写入会跳过内容指纹未变的设备；
+另外测量预演 (内存哈希连接，不写数据库) 的速度。
+两种方式都在单个事务中完成，与 import_devices.py 一致。
+
+用法 (在 backend 目录下运行):
+    python benchmarks/bench_import.py --devices 100000 --chunk-size 2000 --changed 0.01
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+
+from app import models  # noqa: F401  注册所有模型
+from app.database import Base, create_db_engine
+from app.importer import IMPORT_COLUMNS, diff_devices, import_devices, transform_device
+from bench_stream_import import make_device
+
+_LEGACY_UPDATE = """
+    UPDATE devices
+    SET origin_name = COALESCE(NULLIF(origin_name, ''), :origin_name),
+        name = COALESCE(NULLIF(name, ''), :name),
+        company = COALESCE(NULLIF(company, ''), :company),
+        product = COALESCE(NULLIF(product, ''), :product),
+        model = COALESCE(NULLIF(model, ''), :model),
+        icon_url = COALESCE(NULLIF(icon_url, ''), :icon_url),
+        big_icon_url = COALESCE(NULLIF(big_icon_url, ''), :big_icon_url),
+        neg480 = COALESCE(NULLIF(neg480, ''), :neg480),
+        neg168 = COALESCE(NULLIF(neg168, ''), :neg168),
+        brand = COALESCE(NULLIF(brand, ''), :company),
+        category = COALESCE(NULLIF(category, ''), :category),
+        version = :version,
+        updated_at = datetime('now')
+    WHERE mac_int = :mac_int
+"""
+_LEGACY_INSERT = f"""
+    INSERT INTO devices ({', '.join(IMPORT_COLUMNS)}, version, created_at, updated_at)
+    VALUES ({', '.join(':' + column for column in IMPORT_COLUMNS)}, :version, datetime('now'), datetime('now'))
+"""
+
+def legacy_import(conn, devices, version):
+    """原 import_devices.py 的逐行导入: 每个设备一次查询加一次写入"""
+    for device_info in devices:
+        row = transform_device(device_info)
+        if row is None:
+            continue
+        row["version"] = version
+        existing = conn.execute(text("SELECT id FROM devices WHERE mac_int = :mac_int"), row).fetchone()
+        if existing:
+            conn.execute(text(_LEGACY_UPDATE), row)
+        else:
+            conn.execute(text(_LEGACY_INSERT), row)
+            conn.execute(text("DELETE FROM device_tombstones WHERE mac = :mac"), row)
+
+def run(tmp, name, batches, importer, dry_run=False):
+    """依次导入各批设备 (版本号 1, 2, ...)，返回 (各批耗时, 最后一批写入的设备数, 预演耗时)"""
+    engine = create_db_engine(f"sqlite:///{os.path.join(tmp, name + '.db')}")
+    Base.metadata.create_all(bind=engine)
+    timings = []
+    for version, devices in enumerate(batches, 1):
+        with engine.begin() as conn:
+            started = time.perf_counter()
+            importer(conn, devices, version)
+            timings.append(time.perf_counter() - started)
+    with engine.connect() as conn:
+        written = conn.execute(text("SELECT COUNT(*) FROM devices WHERE version = :v"), {"v": len(batches)}).scalar()
+        dry_run_time = None
+        if dry_run:
+            started = time.perf_counter()
+            diff_devices(conn, batches[-1])
+            dry_run_time = time.perf_counter() - started
+    engine.dispose()
+    return timings, written, dry_run_time
+
+def main():
+    parser = argparse.ArgumentParser(description="设备导入方式的速度对比")
+    parser.add_argument("--devices", type=int, default=100000)
+    parser.add_argument("--chunk-size", type=int, default=2000)
+    parser.add_argument("--changed", type=float, default=0.01, help="第三次导入中有变化的设备比例")
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    devices = [make_device(i, rng) for i in range(args.devices)]
+    changed = [dict(device) for device in devices]
+    for device in rng.sample(changed, int(len(changed) * args.changed)):
+        device["model"] += "-v2"
+    batches = (devices, devices, changed)
+
+    def set_based(conn, devices, version):
+        import_devices(conn, devices, version, chunk_size=args.chunk_size)
+
+    print(f"{args.devices} 个设备，每块 {args.chunk_size} 个，第三次导入 {args.changed:.0%} 的设备有变化")
+    print(f"{'方式':<16}{'首次 行/秒':>12}{'重复 行/秒':>12}{'少量变化 行/秒':>16}{'写入设备数':>12}{'预演 行/秒':>12}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, importer in (("逐行", legacy_import), ("按块集合写入", set_based)):
+            (fresh, again, partial), written, dry_run_time = run(
+                tmp, label, batches, importer, dry_run=importer is set_based
+            )
+            dry_run_rate = f"{args.devices / dry_run_time:.0f}" if dry_run_time else "-"
+            print(
+                f"{label:<16}{args.devices / fresh:>12.0f}{args.devices / again:>12.0f}"
+                f"{args.devices / partial:>16.0f}{written:>12}{dry_run_rate:>12}"
+            )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+偏移分页与游标分页的每页耗时对比
+
+在临时SQLite数据库中预置大量设备，分别用 offset/limit 和 keyset 游标
+读取不同深度的页面，输出每页的平均耗时。
+
+用法 (在 backend 目录下运行):
+    python benchmarks/bench_pagination.py --devices 200000 --limit 100
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, create_db_engine
+from app.pagination import encode_cursor, keyset_page
+from app import models
+
+def seed(engine, device_count):
+    Base.metadata.create_all(bind=engine)
+    table = models.Device.__table__
+    with engine.begin() as conn:
+        for start in range(0, device_count, 10000):
+            conn.execute(table.insert(), [
+                {"mac": f"{i:012X}", "note": f"设备{i}", "description": "x" * 40, "version": 1}
+                for i in range(start, min(start + 10000, device_count))
+            ])
+
+def time_page(fn, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description="偏移分页与游标分页对比")
+    parser.add_argument("--devices", type=int, default=200000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_db_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        print(f"预置 {args.devices} 个设备...")
+        seed(engine, args.devices)
+        db = sessionmaker(bind=engine)()
+
+        depths = [0, 0.1, 0.25, 0.5, 0.75, 0.99]
+        print(f"{'页面位置':>10} {'offset (ms)':>12} {'cursor (ms)':>12}")
+        for depth in depths:
+            skip = int(args.devices * depth)
+            # 游标指向同一位置: 主键从1开始连续分配
+            cursor = encode_cursor(skip) if skip else ""
+            offset_ms = time_page(
+                lambda: db.query(models.Device).offset(skip).limit(args.limit).all(), args.repeat
+            )
+            cursor_ms = time_page(lambda: keyset_page(db, cursor, args.limit), args.repeat)
+            print(f"{skip:>10} {offset_ms:>12.2f} {cursor_ms:>12.2f}")
+
+        db.close()
+        engine.dispose()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+导入流水线的进程数扩展测试
+
+生成合成的 devices.json (格式同 bench_stream_import.py)，分别用 1/2/4/8 个转换进程
+流式导入到新的临时数据库，输出每秒行数和相对单进程的加速比。
+1 个进程即不使用进程池，转换和写入都在当前线程中进行。
+加速上限取决于CPU核数，以及解析线程和写入线程本身的开销。
+
+用法 (在 backend 目录下运行):
+    python benchmarks/bench_parallel_import.py --devices 200000 --workers 1 2 4 8
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import models  # noqa: F401  注册所有模型
+from app.database import Base, create_db_engine
+from app.importer import import_devices
+from app.router_export import iter_devices
+from bench_stream_import import generate
+
+def run(tmp, path, workers):
+    engine = create_db_engine(f"sqlite:///{os.path.join(tmp, f'workers-{workers}.db')}")
+    Base.metadata.create_all(bind=engine)
+    started = time.perf_counter()
+    with engine.begin() as conn, open(path, "r", encoding="utf-8") as f:
+        stats, _ = import_devices(conn, iter_devices(f), 1, workers=workers)
+    elapsed = time.perf_counter() - started
+    engine.dispose()
+    return stats["processed"], elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="导入流水线的进程数扩展测试")
+    parser.add_argument("--devices", type=int, default=200000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "devices.json")
+        generate(path, args.devices)
+        print(f"{args.devices} 个设备，文件 {os.path.getsize(path) / 1024 / 1024:.0f} MB，CPU核数 {os.cpu_count()}")
+        print(f"{'进程数':<8}{'耗时 s':>10}{'行/秒':>12}{'加速比':>10}")
+        baseline = None
+        for workers in args.workers:
+            processed, elapsed = run(tmp, path, workers)
+            rate = processed / elapsed
+            baseline = baseline or rate
+            print(f"{workers:<8}{elapsed:>10.1f}{rate:>12.0f}{rate / baseline:>10.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+设备列表序列化耗时对比
+
+在临时SQLite数据库中预置设备，比较一次列表响应从查询到生成JSON字节的耗时：
+  - 原方式: 查询ORM对象 -> response_model 逐条校验 -> 标准库 json 序列化
+  - 新方式: 只查询需要的列 -> dict -> FastJSONResponse (orjson)
+
+用法 (在 backend 目录下运行):
+    python benchmarks/bench_serialization.py --devices 10000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, create_db_engine
+from app.projection import DEVICE_FIELDS, device_columns, project_rows
+from app.responses import FastJSONResponse, orjson
+from app import models, schemas
+
+def seed(engine, device_count):
+    Base.metadata.create_all(bind=engine)
+    table = models.Device.__table__
+    with engine.begin() as conn:
+        conn.execute(table.insert(), [
+            {
+                "mac": f"{i:012X}", "mac_int": i, "note": f"设备{i}", "name": f"device-{i}",
+                "category": "手机", "brand": "Xiaomi", "description": "x" * 40,
+                "icon_url": f"https://example.com/icons/{i}.png", "version": 1,
+            }
+            for i in range(device_count)
+        ])
+
+def before(db, limit):
+    # 与 response_model=List[schemas.Device] 的处理过程一致: 校验 -> 转换为JSON兼容对象 -> json.dumps
+    adapter = TypeAdapter(List[schemas.Device])
+    devices = [schemas.Device.model_validate(d) for d in db.query(models.Device).limit(limit)]
+    content = adapter.dump_python(adapter.validate_python(devices), mode="json")
+    return JSONResponse(content).body
+
+def after(db, limit, names):
+    rows = db.query(*device_columns(names)).order_by(models.Device.id).limit(limit)
+    return FastJSONResponse(project_rows(rows, names)).body
+
+def measure(fn, repeat):
+    fn()  # 预热
+    started = time.perf_counter()
+    for _ in range(repeat):
+        size = len(fn())
+    return (time.perf_counter() - started) / repeat * 1000, size
+
+def main():
+    parser = argparse.ArgumentParser(description="设备列表序列化耗时对比")
+    parser.add_argument("--devices", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_db_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        print(f"预置 {args.devices} 个设备... (orjson: {'已安装' if orjson else '未安装'})")
+        seed(engine, args.devices)
+        db = sessionmaker(bind=engine)()
+
+        cases = [
+            ("原方式 (ORM + response_model)", lambda: before(db, args.devices)),
+            ("新方式 (全部字段)", lambda: after(db, args.devices, DEVICE_FIELDS)),
+            ("新方式 (fields=mac,note,name,icon_url)",
+             lambda: after(db, args.devices, ["mac", "note", "name", "icon_url"])),
+        ]
+        print(f"{'方式':<40} {'耗时 (ms)':>10} {'响应大小 (KB)':>14}")
+        for label, fn in cases:
+            elapsed, size = measure(fn, args.repeat)
+            print(f"{label:<40} {elapsed:>10.1f} {size / 1024:>14.1f}")
+
+        db.close()
+        engine.dispose()
+
+if __name__ == "__main__":
+    main()
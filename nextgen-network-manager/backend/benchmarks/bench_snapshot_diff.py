@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+快照差异引擎的速度测试
+
+生成两份合成快照 (格式同 bench_stream_import.py，另加 connectionType / online)，
+第二份相对第一份有 --churn 比例的设备离线、同样数量的新设备上线，
+各 --churn / 2 比例的设备IP、频段变化，并为部分设备追加一条路由器事件。分别测量:
+  - 归约: 把导出记录归约为 {整数MAC: 连接状态} 和路由器事件
+  - 内存比较: diff_snapshots (MAC集合的差集/交集)
+  - 写入数据库: apply_snapshot 与上一次快照状态比较并写入事件 (临时SQLite数据库)
+  - 重复写入: 同一快照再写一次 (事件已存在，全部忽略)
+
+用法 (在 backend 目录下运行):
+    python benchmarks/bench_snapshot_diff.py --devices 50000 --churn 0.02
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import models  # noqa: F401  注册所有模型
+from app.database import Base, create_db_engine
+from app.snapshot_diff import Snapshot, apply_snapshot, diff_snapshots
+from bench_stream_import import make_device
+
+def make_snapshots(count, churn, rng):
+    first = []
+    for i in range(count):
+        device = make_device(i, rng)
+        device["connectionType"] = rng.choice([1, 1, 2, 4, 6])
+        device["online"] = 1
+        first.append(device)
+
+    second = [dict(device) for device in first]
+    changes = int(count * churn)
+    removed = set(rng.sample(range(count), changes))
+    second = [device for i, device in enumerate(second) if i not in removed]
+    second += [dict(make_device(count + i, rng), connectionType=2, online=1) for i in range(changes)]
+    for device in rng.sample(second, changes // 2):
+        device["ip"] = device["ip"] + "0"
+    for device in rng.sample(second, changes // 2):
+        device["connectionType"] = 2 if device["connectionType"] != 2 else 1
+    for device in rng.sample(second, changes):
+        device["events"] = device["events"] + [{"originatedTime": 1761999999, "text": "离线"}]
+    return first, second
+
+def timed(fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - started
+
+def main():
+    parser = argparse.ArgumentParser(description="快照差异引擎的速度测试")
+    parser.add_argument("--devices", type=int, default=50000)
+    parser.add_argument("--churn", type=float, default=0.02, help="离线 (以及新上线) 设备的比例")
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    first, second = make_snapshots(args.devices, args.churn, rng)
+    (old, reduce_time), (new, _) = timed(Snapshot.from_devices, first), timed(Snapshot.from_devices, second)
+    events, diff_time = timed(diff_snapshots, old, new, 2)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_db_engine(f"sqlite:///{os.path.join(tmp, 'events.db')}")
+        Base.metadata.create_all(bind=engine)
+        timings = []
+        for ts, snapshot in ((1, old), (2, new), (2, new)):
+            with engine.begin() as conn:
+                stats, elapsed = timed(apply_snapshot, conn, snapshot, ts)
+                timings.append((elapsed, sum(stats.values())))
+        engine.dispose()
+
+    print(f"{args.devices} 个设备，离线/上线各 {int(args.devices * args.churn)} 个，差异事件 {len(events)} 个")
+    print(f"{'阶段':<20}{'耗时 ms':>10}{'设备/秒':>12}{'写入事件':>10}")
+    rows = [("归约 (每个快照)", reduce_time, None), ("内存比较", diff_time, None)]
+    rows += [(label, elapsed, written) for label, (elapsed, written) in zip(("写入数据库 (基线)", "写入数据库 (差异)", "重复写入"), timings)]
+    for label, elapsed, written in rows:
+        print(f"{label:<20}{elapsed * 1000:>10.1f}{args.devices / elapsed:>12.0f}{'' if written is None else written:>10}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+SQLite性能配置 (SQLITE_PROFILE) 的读写混合压测
+
+多个写线程模拟扩展保存备注 (单行更新 + 提交)，多个读线程模拟Web界面
+刷新列表和按MAC查询，分别在 default 与 performance 配置下运行，
+输出读写吞吐、p99延迟以及 "database is locked" 错误数。
+
+用法 (在 backend 目录下运行):
+    python benchmarks/bench_sqlite_profile.py --readers 8 --writers 4 --duration 10
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from app.database import Base, create_db_engine
+from app import models  # noqa: F401  注册所有模型
+
+PROFILES = ["default", "performance"]
+
+def make_mac(i):
+    return ":".join(f"{(i >> shift) & 0xFF:02X}" for shift in (40, 32, 24, 16, 8, 0))
+
+def seed(engine, device_count):
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(
+            models.Device.__table__.insert(),
+            [{"mac": make_mac(i), "note": f"设备{i}", "category": "智能家居", "version": 1}
+             for i in range(device_count)],
+        )
+
+def worker(engine, kind, device_count, deadline, stats):
+    latencies, errors = [], 0
+    while time.perf_counter() < deadline:
+        mac = make_mac(random.randrange(device_count))
+        started = time.perf_counter()
+        try:
+            if kind == "write":
+                with engine.begin() as conn:
+                    conn.execute(
+                        text("UPDATE devices SET note = :note, version = version + 1 WHERE mac = :mac"),
+                        {"note": f"备注{random.random():.6f}", "mac": mac},
+                    )
+            elif random.random() < 0.3:
+                with engine.connect() as conn:
+                    conn.execute(text("SELECT * FROM devices ORDER BY id LIMIT 100")).fetchall()
+            else:
+                with engine.connect() as conn:
+                    conn.execute(text("SELECT * FROM devices WHERE mac = :mac"), {"mac": mac}).fetchall()
+        except OperationalError:
+            errors += 1
+            continue
+        latencies.append(time.perf_counter() - started)
+    with stats["lock"]:
+        stats[kind].extend(latencies)
+        stats[kind + "_errors"] += errors
+
+def percentile(values, pct):
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+def bench_profile(profile, args):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_db_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}", profile=profile)
+        seed(engine, args.devices)
+
+        stats = {"lock": threading.Lock(), "read": [], "write": [], "read_errors": 0, "write_errors": 0}
+        deadline = time.perf_counter() + args.duration
+        threads = [
+            threading.Thread(target=worker, args=(engine, kind, args.devices, deadline, stats))
+            for kind, count in (("read", args.readers), ("write", args.writers))
+            for _ in range(count)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        engine.dispose()
+
+    for kind in ("read", "write"):
+        values = stats[kind]
+        print(f"{profile:>12} {kind:>5}: {len(values) / args.duration:9.1f} ops/s  "
+              f"p99 {percentile(values, 99) * 1000:8.2f} ms  "
+              f"locked {stats[kind + '_errors']}")
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite性能配置读写混合压测")
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--devices", type=int, default=5000)
+    parser.add_argument("--profiles", nargs="+", default=PROFILES, choices=PROFILES)
+    args = parser.parse_args()
+
+    print(f"读线程 {args.readers}，写线程 {args.writers}，设备 {args.devices}，每种配置 {args.duration}s")
+    for profile in args.profiles:
+        bench_profile(profile, args)
+
+if __name__ == "__main__":
+    main()
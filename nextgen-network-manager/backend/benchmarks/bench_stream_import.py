@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+devices.json 流式解析与整体 json.load 的内存和速度对比
+
+生成一个与路由器导出格式相同的合成文件 (每个设备带 events、miotData、速率计数)，
+分别在子进程中用 json.load 和 iter_devices 解析并做与导入相同的图标/类别映射，
+输出峰值内存 (RSS) 和处理速度。
+
+用法 (在 backend 目录下运行):
+    python benchmarks/bench_stream_import.py --devices 500000
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(BACKEND_DIR))  # import_devices.py 所在目录
+
+PRODUCTS = ["phone", "computer", "tablet", "camera", "light", "plug", "speaker", "tv", "vacuum", "sensor"]
+
+def make_device(i, rng):
+    product = rng.choice(PRODUCTS)
+    return {
+        "mac": ":".join(f"{(i >> shift) & 0xFF:02X}" for shift in (40, 32, 24, 16, 8, 0)),
+        "ip": f"192.168.{(i >> 8) & 0xFF}.{i & 0xFF}",
+        "name": f"设备{i}",
+        "originName": f"device-{i}",
+        "company": rng.choice(["xiaomi", "apple", "huawei", "lumi"]),
+        "product": product,
+        "model": f"xiaomi_{product}_^Model-{rng.randint(1, 99)}",
+        "iconUrl": f"list/device_list_{product}.png?{rng.getrandbits(30)}",
+        "bigIconUrl": f"big/device_list_{product}.png",
+        "neg480": rng.choice(["", f"https://cdn.example.com/neg480/{product}-{i}.png"]),
+        "totalTX": rng.getrandbits(32),
+        "totalRX": rng.getrandbits(32),
+        "rx_rate": rng.randint(0, 2400),
+        "tx_rate": rng.randint(0, 2400),
+        "signal": -rng.randint(30, 90),
+        "wifiprotocol": "Wi-Fi 6(802.11ax)",
+        "events": [
+            {"duration": rng.randint(1, 9999), "eventID": e, "originatedTime": 1761952860 + e,
+             "text": "5GHz接入", "textColor": "", "timeDisplay": 1}
+            for e in range(rng.randint(1, 8))
+        ],
+        "miotData": {"did": str(rng.getrandbits(40)), "token": f"{rng.getrandbits(128):032x}", "props": list(range(20))},
+    }
+
+def generate(path, count):
+    rng = random.Random(1)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('{"code": 0, "bssid_24G": "50:88:11:d1:6a:af", "risk_devices": [], "devices": [\n')
+        for i in range(count):
+            if i:
+                f.write(",\n")
+            json.dump(make_device(i, rng), f, ensure_ascii=False)
+        f.write("\n], \"mesh_nodes\": []}\n")
+
+def run_mode(mode, path):
+    """子进程中执行: 解析并做映射，输出 (设备数, 耗时, 峰值RSS MB)"""
+    import resource
+
+    from import_devices import map_product_to_category, process_icon_url_with_priority
+    from app.router_export import iter_devices
+
+    started = time.perf_counter()
+    count = 0
+    with open(path, "r", encoding="utf-8") as f:
+        devices = json.load(f)["devices"] if mode == "json.load" else iter_devices(f)
+        for device in devices:
+            process_icon_url_with_priority(device)
+            map_product_to_category(device.get("product"))
+            count += 1
+    elapsed = time.perf_counter() - started
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(json.dumps({"count": count, "elapsed": elapsed, "peak_mb": peak_mb}))
+
+def main():
+    parser = argparse.ArgumentParser(description="devices.json 流式解析对比")
+    parser.add_argument("--devices", type=int, default=500000)
+    parser.add_argument("--run", nargs=2, metavar=("MODE", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        run_mode(*args.run)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "devices.json")
+        print(f"生成 {args.devices} 个设备的合成文件...")
+        generate(path, args.devices)
+        print(f"文件大小 {os.path.getsize(path) / 1048576:.0f} MB")
+        print(f"{'方式':<14} {'设备数':>10} {'耗时 (s)':>10} {'设备/秒':>10} {'峰值内存 (MB)':>14}")
+        for mode in ("iter_devices", "json.load"):
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--run", mode, path],
+                capture_output=True, text=True, check=True,
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            print(
+                f"{mode:<14} {result['count']:>10} {result['elapsed']:>10.1f}"
+                f" {result['count'] / result['elapsed']:>10.0f} {result['peak_mb']:>14.0f}"
+            )
+
+if __name__ == "__main__":
+    main()
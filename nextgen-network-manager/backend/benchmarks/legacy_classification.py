@@ -0,0 +1,293 @@
+"""
+分类规则引擎之前的实现 (逐个关键词 in 扫描)，供 bench_classification.py 做速度和结果对比
+
+is_iot_device / get_iot_reason 来自 extract_iot_devices.py，count_device_class 是
+count_device_types.py 循环体中的单设备分类，map_product_to_category 来自 import_devices.py。
+"""
+
+def is_iot_device(device):
+    """
+    根据设备属性判断是否为IoT设备。
+    IoT设备通常不需要网络浏览服务（不是手机、平板、电脑、电视）。
+    """
+    # 检查是否明确标记为IoT设备
+    if device.get('is_miot_device', False):
+        return True
+    
+    # 检查产品类型以排除非IoT设备（但保留路由器）
+    product = device.get('product', '').lower()
+    if product in ['phone', 'tablet', 'computer', 'tv']:
+        return False
+    
+    # 检查用户指定的产品类型（但保留路由器）
+    user_specified_product = device.get('userSpecifyProduct', '').lower()
+    if user_specified_product in ['phone', 'tablet', 'computer', 'tv']:
+        return False
+    
+    # 检查型号中常见的IoT设备标识
+    model = device.get('model', '').lower()
+    if any(keyword in model for keyword in ['camera', 'light', 'curtain', 'speaker', 'fan', 'printer', 'refrigerator', 'washer', 'dryer', 'stereo', 'router']):
+        return True
+    
+    # 检查名称中常见的IoT设备标识
+    name = device.get('name', '').lower()
+    origin_name = device.get('originName', '').lower()
+    combined_name = name + ' ' + origin_name
+    
+    iot_keywords = [
+        'camera', 'light', 'curtain', 'speaker', 'fan', 'printer', 'refrigerator', 
+        'washer', 'dryer', 'robot', 'vacuum', 'socket', 'plug', 'gateway', 
+        'airer', 'lamp', 'bulb', 'sensor', 'doorbell', 'cat eye', 'cateye',
+        'panel', 'purifier', 'conditioner', 'ac', 'dishwasher', 'raspberry', 'router'
+    ]
+    
+    # 特别处理带有miotData的设备
+    if 'miotData' in device:
+        miot_product = device['miotData'].get('product', '').lower()
+        if any(keyword in miot_product for keyword in iot_keywords):
+            return True
+    
+    # 只有树莓派5和XTC_Q1A属于未知设备，其他都应该归类为IoT设备
+    if name == "树莓派5" or name == "xtc_q1a":
+        return False
+    
+    return any(keyword in combined_name for keyword in iot_keywords) or (
+        product not in ['phone', 'tablet', 'computer', 'tv'] and 
+        user_specified_product not in ['phone', 'tablet', 'computer', 'tv']
+    )
+
+def get_iot_reason(device):
+    """
+    提供设备被分类为IoT的原因。
+    """
+    reasons = []
+    
+    if device.get('is_miot_device', False):
+        reasons.append("标记为MIoT设备")
+    
+    # 检查型号中常见的IoT设备标识
+    model = device.get('model', '').lower()
+    if 'camera' in model:
+        reasons.append("型号包含'camera'")
+    if 'light' in model:
+        reasons.append("型号包含'light'")
+    if 'curtain' in model:
+        reasons.append("型号包含'curtain'")
+    if 'speaker' in model:
+        reasons.append("型号包含'speaker'")
+    if 'fan' in model:
+        reasons.append("型号包含'fan'")
+    if 'printer' in model:
+        reasons.append("型号包含'printer'")
+    if 'refrigerator' in model:
+        reasons.append("型号包含'refrigerator'")
+    if 'washer' in model:
+        reasons.append("型号包含'washer'")
+    if 'dryer' in model:
+        reasons.append("型号包含'dryer'")
+    if 'stereo' in model:
+        reasons.append("型号包含'stereo'")
+    if 'panel' in model:
+        reasons.append("型号包含'panel'")
+    if 'purifier' in model:
+        reasons.append("型号包含'purifier'")
+    if 'router' in model:
+        reasons.append("型号包含'router'")
+    
+    # 检查名称中常见的IoT设备标识
+    name = device.get('name', '').lower()
+    origin_name = device.get('originName', '').lower()
+    combined_name = name + ' ' + origin_name
+    
+    if 'camera' in combined_name:
+        reasons.append("名称包含'camera'")
+    if 'light' in combined_name:
+        reasons.append("名称包含'light'")
+    if 'curtain' in combined_name:
+        reasons.append("名称包含'curtain'")
+    if 'speaker' in combined_name:
+        reasons.append("名称包含'speaker'")
+    if 'fan' in combined_name:
+        reasons.append("名称包含'fan'")
+    if 'printer' in combined_name:
+        reasons.append("名称包含'printer'")
+    if 'refrigerator' in combined_name:
+        reasons.append("名称包含'refrigerator'")
+    if 'washer' in combined_name:
+        reasons.append("名称包含'washer'")
+    if 'dryer' in combined_name:
+        reasons.append("名称包含'dryer'")
+    if 'robot' in combined_name:
+        reasons.append("名称包含'robot'")
+    if 'vacuum' in combined_name:
+        reasons.append("名称包含'vacuum'")
+    if 'socket' in combined_name:
+        reasons.append("名称包含'socket'")
+    if 'plug' in combined_name:
+        reasons.append("名称包含'plug'")
+    if 'gateway' in combined_name:
+        reasons.append("名称包含'gateway'")
+    if 'airer' in combined_name:
+        reasons.append("名称包含'airer'")
+    if 'lamp' in combined_name:
+        reasons.append("名称包含'lamp'")
+    if 'bulb' in combined_name:
+        reasons.append("名称包含'bulb'")
+    if 'sensor' in combined_name:
+        reasons.append("名称包含'sensor'")
+    if 'doorbell' in combined_name:
+        reasons.append("名称包含'doorbell'")
+    if 'cat eye' in combined_name or 'cateye' in combined_name:
+        reasons.append("名称包含'cat eye'")
+    if 'panel' in combined_name:
+        reasons.append("名称包含'panel'")
+    if 'purifier' in combined_name:
+        reasons.append("名称包含'purifier'")
+    if 'conditioner' in combined_name or 'ac' in combined_name:
+        reasons.append("名称包含'conditioner'或'ac'")
+    if 'dishwasher' in combined_name:
+        reasons.append("名称包含'dishwasher'")
+    if 'raspberry' in combined_name:
+        reasons.append("名称包含'raspberry'")
+    if 'router' in combined_name:
+        reasons.append("名称包含'router'")
+    
+    # 特别处理带有miotData的设备
+    if 'miotData' in device:
+        miot_product = device['miotData'].get('product', '').lower()
+        if 'camera' in miot_product:
+            reasons.append("MIoT产品为'camera'")
+        if 'light' in miot_product:
+            reasons.append("MIoT产品为'light'")
+        if 'curtain' in miot_product:
+            reasons.append("MIoT产品为'curtain'")
+        if 'speaker' in miot_product:
+            reasons.append("MIoT产品为'speaker'")
+        if 'fan' in miot_product:
+            reasons.append("MIoT产品为'fan'")
+        if 'printer' in miot_product:
+            reasons.append("MIoT产品为'printer'")
+        if 'refrigerator' in miot_product:
+            reasons.append("MIoT产品为'refrigerator'")
+        if 'washer' in miot_product:
+            reasons.append("MIoT产品为'washer'")
+        if 'dryer' in miot_product:
+            reasons.append("MIoT产品为'dryer'")
+        if 'socket' in miot_product or 'plug' in miot_product:
+            reasons.append("MIoT产品为'socket/plug'")
+        if 'gateway' in miot_product:
+            reasons.append("MIoT产品为'gateway'")
+        if 'airer' in miot_product:
+            reasons.append("MIoT产品为'airer'")
+        if 'lamp' in miot_product or 'bulb' in miot_product:
+            reasons.append("MIoT产品为'lamp/bulb'")
+        if 'sensor' in miot_product:
+            reasons.append("MIoT产品为'sensor'")
+        if 'panel' in miot_product:
+            reasons.append("MIoT产品为'panel'")
+        if 'purifier' in miot_product:
+            reasons.append("MIoT产品为'purifier'")
+        if 'router' in miot_product:
+            reasons.append("MIoT产品为'router'")
+    
+    if not reasons and device.get('is_miot_device', False):
+        return "标记为MIoT设备"
+    elif not reasons:
+        return "从设备特征推断"
+    
+    return '; '.join(reasons)
+
+def map_product_to_category(product):
+    """将product字段映射到category分类"""
+    category_mapping = {
+        'phone': '手机',
+        'computer': '电脑', 
+        'tablet': '平板',
+        'tv': '娱乐设备',
+        'camera': '智能家居',
+        'robot': '智能家居',
+        'gateway': '网络设备',
+        'router': '网络设备',
+        'light': '智能家居',
+        'fan': '智能家居',
+        'airconditioner': '智能家居',
+        'washer': '智能家居',
+        'dryer': '智能家居',
+        'dishwasher': '智能家居',
+        'plug': '智能家居',
+        'curtain': '智能家居',
+        'speaker': '智能家居',
+        'printer': '网络设备',
+        'nas': '网络设备',
+        'monitor': '娱乐设备',
+        'projector': '娱乐设备',
+        'game': '娱乐设备',
+        'security': '智能家居',
+        'sensor': '智能家居',
+        'switch': '智能家居',
+        'lock': '智能家居',
+        'doorbell': '智能家居',
+        'thermostat': '智能家居',
+        'vacuum': '智能家居',
+    }
+    
+    if not product:
+        return '其他'
+    
+    # 直接匹配
+    if product in category_mapping:
+        return category_mapping[product]
+    
+    # 模糊匹配
+    product_lower = product.lower()
+    for key, value in category_mapping.items():
+        if key in product_lower:
+            return value
+    
+    return '其他'
+
+def count_device_class(device):
+    """count_device_types 中单个设备的分类 (返回 (类型, 原因))"""
+    name = device.get('name', '') or device.get('originName', '未命名设备')
+    product = device.get('product', '').lower()
+    user_specified_product = device.get('userSpecifyProduct', '').lower()
+    
+    # 检查是否明确标记为IoT设备
+    if device.get('is_miot_device', False):
+        return 'iot', '标记为MIoT设备'
+        
+    # 检查产品类型
+    if product == 'phone' or user_specified_product == 'phone':
+        return 'phone', None
+    elif product == 'computer' or user_specified_product == 'computer':
+        return 'computer', None
+    elif product == 'tv' or user_specified_product == 'tv':
+        return 'tv', None
+    elif product == 'tablet' or user_specified_product == 'tablet':
+        return 'tablet', None
+    elif product == 'router' or user_specified_product == 'router':
+        # 路由器也归类为IoT设备
+        return 'iot', '网络设备归类为IoT'
+    else:
+        # 检查名称/型号中的IoT关键词
+        model = device.get('model', '').lower()
+        origin_name = device.get('originName', '').lower()
+        combined_name = name.lower() + ' ' + origin_name
+        
+        iot_keywords = [
+            'camera', 'light', 'curtain', 'speaker', 'fan', 'printer', 
+            'refrigerator', 'washer', 'dryer', 'robot', 'vacuum', 
+            'socket', 'plug', 'gateway', 'airer', 'lamp', 'bulb', 
+            'sensor', 'doorbell', 'cat eye', 'cateye', 'panel', 
+            'purifier', 'conditioner', 'ac', 'dishwasher', 'stereo', 'router'
+        ]
+        
+        for keyword in iot_keywords:
+            if keyword in model or keyword in combined_name:
+                return 'iot', f"找到关键词'{keyword}'"
+        
+        # 只有树莓派5和XTC_Q1A属于未知设备，其他都应该归类为IoT设备
+        if name == "树莓派5" or name == "XTC_Q1A":
+            return 'unknown', None
+        # 其他未明确分类的设备也归为IoT设备
+        return 'iot', '推断为IoT设备'
@@ -5,87 +5,33 @@
 支持新的图标优先级: neg480 > neg168 > bigIconUrl > iconUrl
 """
 
+import argparse
 import json
 import sys
 import os
+import time
 from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker
 from datetime import datetime
 
+# 复用后端 app 包中的工具模块 (容器中脚本与 app 位于同一目录)
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend')
+if os.path.isdir(os.path.join(BACKEND_DIR, 'app')):
+    sys.path.insert(0, BACKEND_DIR)
+
+from app.importer import IMPORT_WORKERS, diff_devices, import_devices
+from app.migrations import backfill_classification, backfill_mac_int, init_sync_state, rebuild_category_counts
+from app.models import DeviceEvent, DeviceMetricBlock, DeviceMetricSample, DevicePresence, SyncState
+from app.router_export import iter_devices
+from app.snapshot_diff import PresenceWriter
+from app.sync import next_version
+from app.telemetry import SampleWriter
+
 # 配置
 DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite:///./app/devices.db')
-MIWIFI_ICON_HOST = "https://s.miwifi.com/icon/"
 DEVICES_JSON_PATH = "/app/devices.json"
-
-def process_icon_url_with_priority(device_info):
-    """
-    新的图标优先级处理: neg480 > neg168 > bigIconUrl > iconUrl
-    neg480 和 neg168 通常是完整的第三方链接，不需要拼接host
-    """
-    # 按优先级检查图标
-    for field in ['neg480', 'neg168', 'bigIconUrl', 'iconUrl']:
-        icon_url = device_info.get(field)
-        if icon_url:
-            # neg480 和 neg168 通常是完整链接，直接返回
-            if field in ['neg480', 'neg168']:
-                return icon_url, field
-            
-            # bigIconUrl 和 iconUrl 可能需要补充host
-            if icon_url.startswith('http://') or icon_url.startswith('https://'):
-                return icon_url, field
-            else:
-                return MIWIFI_ICON_HOST + icon_url, field
-    
-    return None, 'none'
-
-def map_product_to_category(product):
-    """将product字段映射到category分类"""
-    category_mapping = {
-        'phone': '手机',
-        'computer': '电脑', 
-        'tablet': '平板',
-        'tv': '娱乐设备',
-        'camera': '智能家居',
-        'robot': '智能家居',
-        'gateway': '网络设备',
-        'router': '网络设备',
-        'light': '智能家居',
-        'fan': '智能家居',
-        'airconditioner': '智能家居',
-        'washer': '智能家居',
-        'dryer': '智能家居',
-        'dishwasher': '智能家居',
-        'plug': '智能家居',
-        'curtain': '智能家居',
-        'speaker': '智能家居',
-        'printer': '网络设备',
-        'nas': '网络设备',
-        'monitor': '娱乐设备',
-        'projector': '娱乐设备',
-        'game': '娱乐设备',
-        'security': '智能家居',
-        'sensor': '智能家居',
-        'switch': '智能家居',
-        'lock': '智能家居',
-        'doorbell': '智能家居',
-        'thermostat': '智能家居',
-        'vacuum': '智能家居',
-    }
-    
-    if not product:
-        return '其他'
-    
-    # 直接匹配
-    if product in category_mapping:
-        return category_mapping[product]
-    
-    # 模糊匹配
-    product_lower = product.lower()
-    for key, value in category_mapping.items():
-        if key in product_lower:
-            return value
-    
-    return '其他'
+# 流式导入时每处理多少个设备显示一次进度
+STREAM_PROGRESS_INTERVAL = 10000
 
 def create_database_tables(engine):
     """创建数据库表和新字段"""
@@ -106,7 +52,13 @@ def create_database_tables(engine):
                 ('model', 'VARCHAR'),
                 ('big_icon_url', 'VARCHAR'),
                 ('neg480', 'VARCHAR'),
-                ('neg168', 'VARCHAR')
+                ('neg168', 'VARCHAR'),
+                ('import_hash', 'VARCHAR'),
+                ('is_iot', 'BOOLEAN'),
+                ('device_class', 'VARCHAR'),
+                ('classification_reason', 'VARCHAR'),
+                ('version', 'INTEGER DEFAULT 0'),
+                ('mac_int', 'BIGINT')
             ]
             
             # 添加缺失的列
@@ -116,139 +68,168 @@ def create_database_tables(engine):
                     conn.execute(text(f"ALTER TABLE devices ADD COLUMN {col_name} {col_type}"))
                     conn.commit()
             
+            conn.execute(text('CREATE UNIQUE INDEX IF NOT EXISTS ix_devices_mac_int ON devices (mac_int)'))
+            conn.execute(text('CREATE INDEX IF NOT EXISTS ix_devices_is_iot ON devices (is_iot)'))
+            conn.execute(text('CREATE INDEX IF NOT EXISTS ix_devices_device_class ON devices (device_class)'))
+            backfill_mac_int(conn)
+            backfill_classification(conn)
+            conn.commit()
+            
+            # 遥测时序表和设备事件表 (后端启动时也会创建)
+            for model in (DeviceMetricSample, DeviceMetricBlock, DeviceEvent, DevicePresence):
+                model.__table__.create(bind=conn, checkfirst=True)
+            presence_columns = [row[1] for row in conn.execute(text("PRAGMA table_info(device_presence)"))]
+            if 'generation' not in presence_columns:
+                print("  添加新列: device_presence.generation")
+                conn.execute(text("ALTER TABLE device_presence ADD COLUMN generation INTEGER NOT NULL DEFAULT 0"))
+            conn.commit()
+            
+            # 增量同步所需的墓碑表 (后端启动时也会创建)
+            conn.execute(text('''
+                CREATE TABLE IF NOT EXISTS device_tombstones (
+                    mac VARCHAR PRIMARY KEY,
+                    version INTEGER NOT NULL,
+                    deleted_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                )
+            '''))
+            # 类别表 (后端启动时也会创建)
+            conn.execute(text('''
+                CREATE TABLE IF NOT EXISTS categories (
+                    id INTEGER PRIMARY KEY,
+                    name VARCHAR NOT NULL UNIQUE,
+                    device_count INTEGER NOT NULL DEFAULT 0,
+                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                )
+            '''))
+            conn.commit()
+            
+            # 同步版本计数器 (后端启动时也会创建)
+            SyncState.__table__.create(bind=conn, checkfirst=True)
+            init_sync_state(conn)
+            conn.commit()
+            
             print("✅ 数据库结构检查完成")
         except Exception as e:
             print(f"❌ 数据库结构更新失败: {e}")
             raise
 
-def import_devices_from_json():
-    """从JSON文件导入设备信息"""
+def import_devices_from_json(json_path=DEVICES_JSON_PATH, stream=False, dry_run=False, workers=IMPORT_WORKERS, snapshot_time=None):
+    """从JSON文件导入设备信息
+
+    stream=True 时逐个解析 devices 数组中的设备，内存占用与文件大小无关；
+    dry_run=True 时只在内存中比较内容指纹，输出新增/变化/未变化的统计，不写数据库；
+    workers > 1 时设备的转换在进程池中进行，写入仍由当前线程按块完成。
+    各设备的流量、速率、信号等计数作为 snapshot_time (默认为文件修改时间) 的快照写入遥测时序表，
+    并与上一次导入的快照比较，记录设备上线/离线/IP/频段/协议变化和路由器事件
+    """
     
     print(f"🔍 数据库路径: {DATABASE_URL}")
-    print(f"📄 JSON文件路径: {DEVICES_JSON_PATH}")
+    print(f"📄 JSON文件路径: {json_path}")
     
-    if not os.path.exists(DEVICES_JSON_PATH):
-        print(f"❌ 找不到文件 {DEVICES_JSON_PATH}")
+    if not os.path.exists(json_path):
+        print(f"❌ 找不到文件 {json_path}")
         return False
     
     # 创建数据库连接
     engine = create_engine(DATABASE_URL)
-    create_database_tables(engine)
+    if not dry_run:
+        create_database_tables(engine)
     
     SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
     session = SessionLocal()
     
+    json_file = open(json_path, 'r', encoding='utf-8')
     try:
         # 读取JSON文件
-        print(f"📖 读取设备信息文件...")
-        with open(DEVICES_JSON_PATH, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        devices_data = data.get('devices', [])
-        print(f"📊 找到 {len(devices_data)} 个设备")
+        if stream:
+            print(f"📖 流式读取设备信息文件...")
+            devices_data = iter_devices(json_file)
+            total = None
+            progress_interval = STREAM_PROGRESS_INTERVAL
+        else:
+            print(f"📖 读取设备信息文件...")
+            devices_data = json.load(json_file).get('devices', [])
+            total = len(devices_data)
+            progress_interval = 1000
+            print(f"📊 找到 {total} 个设备")
         
-        # 统计信息
-        imported_count = 0
-        updated_count = 0
-        skipped_count = 0
-        icon_stats = {'neg480': 0, 'neg168': 0, 'bigIconUrl': 0, 'iconUrl': 0, 'none': 0}
-        
-        for i, device_info in enumerate(devices_data):
-            if i % 50 == 0:  # 每50个设备显示一次进度
-                print(f"  处理进度: {i}/{len(devices_data)}")
-                
-            mac = device_info.get('mac')
-            if not mac:
-                skipped_count += 1
-                continue
-            
-            # 使用新的图标优先级处理
-            icon_url, icon_source = process_icon_url_with_priority(device_info)
-            icon_stats[icon_source] += 1
+        # 解析的同时收集遥测样本和快照状态，随每块设备一起写入 (内存占用与设备数无关)
+        if not dry_run:
+            if snapshot_time is None:
+                snapshot_time = int(os.path.getmtime(json_path))
+            samples = SampleWriter(session.connection(), snapshot_time)
+            presence = PresenceWriter(session.connection(), snapshot_time)
             
-            # 映射category
-            category = map_product_to_category(device_info.get('product'))
+            def collect_samples(devices):
+                for device_info in devices:
+                    samples.add(device_info)
+                    presence.add(device_info)
+                    yield device_info
             
-            # 检查设备是否已存在
-            result = session.execute(text('SELECT id FROM devices WHERE mac = :mac'), {'mac': mac})
-            existing = result.fetchone()
+            def flush_samples(stats):
+                samples.flush()
+                presence.flush()
             
-            if existing:
-                # 更新现有设备 (只更新空字段)
-                update_sql = '''
-                    UPDATE devices 
-                    SET origin_name = COALESCE(NULLIF(origin_name, ''), :origin_name),
-                        name = COALESCE(NULLIF(name, ''), :name),
-                        company = COALESCE(NULLIF(company, ''), :company),
-                        product = COALESCE(NULLIF(product, ''), :product),
-                        model = COALESCE(NULLIF(model, ''), :model),
-                        icon_url = COALESCE(NULLIF(icon_url, ''), :icon_url),
-                        big_icon_url = COALESCE(NULLIF(big_icon_url, ''), :big_icon_url),
-                        neg480 = COALESCE(NULLIF(neg480, ''), :neg480),
-                        neg168 = COALESCE(NULLIF(neg168, ''), :neg168),
-                        brand = COALESCE(NULLIF(brand, ''), :company),
-                        category = COALESCE(NULLIF(category, ''), :category),
-                        updated_at = datetime('now')
-                    WHERE mac = :mac
-                '''
-                session.execute(text(update_sql), {
-                    'mac': mac,
-                    'origin_name': device_info.get('originName'),
-                    'name': device_info.get('name'),
-                    'company': device_info.get('company'),
-                    'product': device_info.get('product'),
-                    'model': device_info.get('model'),
-                    'icon_url': icon_url,
-                    'big_icon_url': device_info.get('bigIconUrl'),
-                    'neg480': device_info.get('neg480'),
-                    'neg168': device_info.get('neg168'),
-                    'category': category
-                })
-                updated_count += 1
-            else:
-                # 插入新设备
-                insert_sql = '''
-                    INSERT INTO devices (mac, note, brand, category, icon_url, description,
-                                       origin_name, name, company, product, model, 
-                                       big_icon_url, neg480, neg168, 
-                                       created_at, updated_at)
-                    VALUES (:mac, :note, :brand, :category, :icon_url, :description,
-                            :origin_name, :name, :company, :product, :model,
-                            :big_icon_url, :neg480, :neg168,
-                            datetime('now'), datetime('now'))
-                '''
-                session.execute(text(insert_sql), {
-                    'mac': mac,
-                    'note': device_info.get('name'),
-                    'brand': device_info.get('company'),
-                    'category': category,
-                    'icon_url': icon_url,
-                    'description': f"{device_info.get('company', '')} {device_info.get('model', '')}".strip(),
-                    'origin_name': device_info.get('originName'),
-                    'name': device_info.get('name'),
-                    'company': device_info.get('company'),
-                    'product': device_info.get('product'),
-                    'model': device_info.get('model'),
-                    'big_icon_url': device_info.get('bigIconUrl'),
-                    'neg480': device_info.get('neg480'),
-                    'neg168': device_info.get('neg168')
-                })
-                imported_count += 1
+            devices_data = collect_samples(devices_data)
+        
+        started = time.perf_counter()
+        reported = [0]
         
-        # 提交更改
-        session.commit()
+        def report_progress(processed):
+            # 定期显示进度和处理速度 (每写入一块回调一次)
+            if processed - reported[0] < progress_interval:
+                return
+            reported[0] = processed
+            rate = processed / (time.perf_counter() - started)
+            print(f"  处理进度: {processed}/{total if total is not None else '?'} ({rate:.0f} 设备/秒)")
+        
+        if dry_run:
+            # 预演: 设备表的指纹读入内存后与导出记录做哈希连接，不写数据库
+            stats, icon_stats = diff_devices(
+                session.connection(), devices_data, on_progress=report_progress, workers=workers,
+            )
+            session.rollback()
+            print(f"\n🔎 预演完成 (未写入数据库)")
+        else:
+            # 本次导入写入的设备共用一个新的同步版本号 (在导入事务中分配)
+            version = next_version(session)
+            # 按块写入: 每块一次 executemany 写入临时表，再用集合语句更新指纹变化的设备、插入新设备
+            stats, icon_stats = import_devices(
+                session.connection(), devices_data, version, on_progress=report_progress, workers=workers,
+                on_chunk=flush_samples,
+            )
+            
+            # 有写入时重算类别设备数，然后提交更改
+            if stats['new'] or stats['changed']:
+                rebuild_category_counts(session.connection())
+            recorded = samples.finish()
+            events = presence.finish()
+            session.commit()
+            print(f"\n🎉 导入完成!")
         
-        print(f"\n🎉 导入完成!")
         print(f"📊 统计结果:")
-        print(f"  ✅ 新增设备: {imported_count}")
-        print(f"  🔄 更新设备: {updated_count}")
-        print(f"  ⏭️ 跳过设备: {skipped_count}")
-        print(f"  📱 总计处理: {imported_count + updated_count + skipped_count}")
+        print(f"  ✅ 新增设备: {stats['new']}")
+        print(f"  🔄 变化设备: {stats['changed']}")
+        print(f"  💤 未变化设备: {stats['unchanged']}")
+        if stats['duplicates']:
+            print(f"  🔁 重复MAC: {stats['duplicates']}")
+        print(f"  ⏭️ 跳过设备: {stats['skipped']}")
+        if not dry_run:
+            print(f"  📈 遥测样本: {recorded} (快照时间 {datetime.fromtimestamp(snapshot_time):%Y-%m-%d %H:%M:%S})")
+            print(
+                f"  📡 设备事件: 上线 {events['join']}，离线 {events['leave']}，IP变化 {events['ip']}，"
+                f"频段变化 {events['band']}，协议变化 {events['wifiprotocol']}，路由器事件 {events['router']}"
+            )
+        processed = stats['processed']
+        elapsed = time.perf_counter() - started
+        print(f"  📱 总计处理: {processed}")
+        print(f"  ⏱️ 耗时: {elapsed:.1f}s ({processed / elapsed if elapsed else 0:.0f} 设备/秒)")
         
         print(f"\n🖼️ 图标来源统计:")
-        for source, count in icon_stats.items():
+        for source in ('neg480', 'neg168', 'bigIconUrl', 'iconUrl', 'none'):
+            count = icon_stats[source]
             if count > 0:
-                percentage = (count / len(devices_data)) * 100
+                percentage = (count / processed) * 100
                 print(f"  {source}: {count}个 ({percentage:.1f}%)")
         
         return True
@@ -261,17 +242,30 @@ def import_devices_from_json():
         return False
     
     finally:
+        json_file.close()
         session.close()
 
 def main():
     """主函数"""
+    parser = argparse.ArgumentParser(description="从 devices.json 导入设备信息")
+    parser.add_argument("json_path", nargs="?", default=DEVICES_JSON_PATH, help="设备信息文件路径")
+    parser.add_argument("--stream", action="store_true", help="流式解析，适合很大的导出文件")
+    parser.add_argument("--workers", type=int, default=IMPORT_WORKERS, help="转换进程数 (默认 1，即不使用进程池)")
+    parser.add_argument("--dry-run", action="store_true", help="只比较内容指纹并输出新增/变化/未变化统计，不写数据库")
+    parser.add_argument("--snapshot-time", type=int, default=None, help="快照时间 (用于遥测和设备事件，Unix秒，默认为文件修改时间)")
+    args = parser.parse_args()
+
     print("=" * 60)
     print("🚀 NextGen 设备信息导入工具")
     print("=" * 60)
     
-    success = import_devices_from_json()
+    success = import_devices_from_json(
+        args.json_path, stream=args.stream, dry_run=args.dry_run, workers=args.workers, snapshot_time=args.snapshot_time,
+    )
     
-    if success:
+    if success and args.dry_run:
+        print("\n✅ 预演完成，去掉 --dry-run 执行导入")
+    elif success:
         print("\n✅ 导入成功!")
         print("\n💡 提示:")
         print("- 图标已按新优先级处理: neg480 > neg168 > bigIconUrl > iconUrl")